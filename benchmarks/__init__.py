@@ -0,0 +1,10 @@
+"""Benchmarks for the scheduling primitives of `coman`.
+
+Run them with `python -m benchmarks` from the root of the repository. See `python -m benchmarks --help`
+for the options, including saving the results to a JSON file and comparing two such files.
+
+Every scenario is run with a fixed random seed, so the amount of work done is the same from run
+to run and from version to version of the library. The results include the throughput (operations
+per second), the percentiles of the latency of individual operations (what counts as an operation
+depends on the scenario, see `benchmarks.scenarios`) and the peak memory allocated by the scenario.
+"""
@@ -0,0 +1,56 @@
+"""Command line interface of the benchmarks. Run `python -m benchmarks --help` for usage."""
+
+from benchmarks.runner import compare, format_result, run_scenario
+from benchmarks.scenarios import SCENARIOS
+
+import argparse
+import json
+import platform
+import sys
+from typing import List, Optional
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark coman scheduling primitives.')
+    parser.add_argument('scenarios', nargs='*', help=f'scenarios to run (default: all of {", ".join(SCENARIOS)})')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply the default sizes of the scenarios by this')
+    parser.add_argument('--repeat', type=int, default=5, help='the number of timed runs of each scenario')
+    parser.add_argument('--seed', type=int, default=0, help='the random seed')
+    parser.add_argument('--json', metavar='PATH', help='save the results to a JSON file')
+    parser.add_argument(
+        '--compare', nargs=2, metavar=('OLD', 'NEW'),
+        help='compare two JSON files with results instead of running the benchmarks',
+    )
+    parser.add_argument('--list', action='store_true', help='list the scenarios and exit')
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, info in SCENARIOS.items():
+            print(f'{name} (default size {info.default_size}): {" ".join(info.description.split())}')
+        return 0
+
+    if args.compare is not None:
+        with open(args.compare[0]) as old_file, open(args.compare[1]) as new_file:
+            old, new = json.load(old_file), json.load(new_file)
+        print('\n'.join(compare(old['scenarios'], new['scenarios'])))
+        return 0
+
+    names = args.scenarios or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(unknown)}')
+
+    results = {}
+    for name in names:
+        size = max(1, int(SCENARIOS[name].default_size * args.scale))
+        results[name] = run_scenario(name, size=size, repeat=args.repeat, seed=args.seed)
+        print(format_result(name, results[name]), flush=True)
+
+    if args.json is not None:
+        with open(args.json, 'w') as output_file:
+            json.dump({'python': platform.python_version(), 'scenarios': results}, output_file, indent=4)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""Running the benchmark scenarios and comparing the results."""
+
+from benchmarks.scenarios import SCENARIOS, ScenarioInfo
+
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+
+Result = Dict[str, Any]
+
+_PERCENTILES = (50, 90, 99)
+
+
+def _call(function: Callable[..., Any], *args: Any) -> Any:
+    return function(*args)
+
+
+class _LatencyRecorder:
+    def __init__(self) -> None:
+        self.latencies_ns: List[int] = []
+
+    def __call__(self, function: Callable[..., Any], *args: Any) -> Any:
+        start = time.perf_counter_ns()
+        result = function(*args)
+        self.latencies_ns.append(time.perf_counter_ns() - start)
+        return result
+
+
+def _percentile(sorted_values: List[int], percent: float) -> int:
+    index = min(len(sorted_values) - 1, max(0, round(percent / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(name: str, size: int, repeat: int = 5, seed: int = 0) -> Result:
+    """Run a scenario and return its results as a JSON-serializable dictionary.
+
+    The scenario is run `repeat` times to measure the throughput (the best run is reported along with
+    the median), once more with every operation timed to get the latency percentiles, and once more
+    under `tracemalloc` to get the peak memory usage.
+    """
+
+    info: ScenarioInfo = SCENARIOS[name]
+
+    durations: List[float] = []
+    num_ops = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        num_ops = info.function(size, random.Random(seed), _call)
+        durations.append(time.perf_counter() - start)
+
+    recorder = _LatencyRecorder()
+    gc.collect()
+    info.function(size, random.Random(seed), recorder)
+    latencies = sorted(recorder.latencies_ns)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        info.function(size, random.Random(seed), _call)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    result: Result = {
+        'size': size,
+        'seed': seed,
+        'repeat': repeat,
+        'ops': num_ops,
+        'best_seconds': min(durations),
+        'median_seconds': statistics.median(durations),
+        'ops_per_sec': num_ops / min(durations) if min(durations) > 0 else float('inf'),
+        'latency_unit': info.latency_unit,
+        'latency_ns': {f'p{percent}': _percentile(latencies, percent) for percent in _PERCENTILES} if latencies else {},
+        'peak_memory_bytes': peak_memory,
+    }
+    if latencies:
+        result['latency_ns']['max'] = latencies[-1]
+    return result
+
+
+def compare(old: Dict[str, Result], new: Dict[str, Result]) -> List[str]:
+    """Return the lines of a report comparing two sets of results (as produced by `run_scenario`)."""
+
+    lines = [f'{"scenario":<30} {"old ops/s":>14} {"new ops/s":>14} {"speedup":>8} {"old p99":>12} {"new p99":>12}']
+    for name in sorted(set(old) & set(new)):
+        old_result, new_result = old[name], new[name]
+        if old_result['size'] != new_result['size']:
+            lines.append(f'{name:<30} (sizes differ: {old_result["size"]} vs {new_result["size"]})')
+            continue
+        speedup = new_result['ops_per_sec'] / old_result['ops_per_sec']
+        lines.append(
+            f'{name:<30} {old_result["ops_per_sec"]:>14.0f} {new_result["ops_per_sec"]:>14.0f} {speedup:>7.2f}x'
+            f' {old_result["latency_ns"].get("p99", 0):>10}ns {new_result["latency_ns"].get("p99", 0):>10}ns'
+        )
+    return lines
+
+
+def format_result(name: str, result: Result) -> str:
+    """Return a human-readable summary of the results of a scenario."""
+
+    latency = ', '.join(f'{key} {value / 1000:.1f}us' for key, value in result['latency_ns'].items())
+    return (
+        f'{name} (size {result["size"]}): {result["ops_per_sec"]:.0f} ops/s '
+        f'(best {result["best_seconds"]:.3f}s, median {result["median_seconds"]:.3f}s), '
+        f'latency per {result["latency_unit"]}: {latency}, '
+        f'peak memory {result["peak_memory_bytes"] / 2**20:.1f} MiB'
+    )
@@ -0,0 +1,204 @@
+"""Benchmark scenarios.
+
+A scenario is a function taking the size of the workload, a seeded random number generator and
+a `Measure` callable, and returning the number of operations it has performed. Every call made
+through `measure` is one operation as far as the latency statistics are concerned, so the scenarios
+route exactly the calls they are meant to measure through it.
+"""
+
+from coman.coroutine_manager import CoroutineManager
+from coman.event_manager import EventSet
+
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Protocol
+
+
+class Measure(Protocol):
+    """A protocol of the function that calls (and, possibly, times) an operation."""
+
+    def __call__(self, function: Callable[..., Any], *args: Any) -> Any:
+        ...
+
+
+Scenario = Callable[[int, random.Random, Measure], int]
+
+
+@dataclass(frozen=True)
+class ScenarioInfo:
+    """A scenario along with its description."""
+
+    function: Scenario
+    default_size: int
+    latency_unit: str
+    description: str
+
+
+def sleepers(size: int, rng: random.Random, measure: Measure) -> int:
+    """`size` coroutines sleep three times for random durations, the time advancing in small steps."""
+
+    cm = CoroutineManager()
+
+    async def sleeper() -> None:
+        for _ in range(3):
+            await cm.sleep(rng.random())
+
+    for _ in range(size):
+        cm.start(sleeper())
+    while cm.next_deadline() is not None:
+        measure(cm.update, 0.01)
+    return 3 * size
+
+
+def coalesced_sleepers(size: int, rng: random.Random, measure: Measure) -> int:
+    """The same as `sleepers`, but with a timer slack of 0.05, so that the wake-ups are batched."""
+
+    cm = CoroutineManager(timer_slack=0.05)
+
+    async def sleeper() -> None:
+        for _ in range(3):
+            await cm.sleep(rng.random())
+
+    for _ in range(size):
+        cm.start(sleeper())
+    while cm.next_deadline() is not None:
+        measure(cm.update, 0.01)
+    return 3 * size
+
+
+def wake_up_chain(size: int, rng: random.Random, measure: Measure) -> int:
+    """A token is passed ten times around a ring of `size` coroutines, each waking the next one up."""
+
+    cm = CoroutineManager()
+    em = cm.event_manager
+    rounds = 10
+
+    async def stage(index: int) -> None:
+        for _ in range(rounds):
+            await cm.wait_for_event(('stage', index))
+            if index + 1 < size:
+                em.raise_event(('stage', index + 1))
+
+    for index in range(size):
+        cm.start(stage(index))
+    for _ in range(rounds):
+        measure(em.raise_event, ('stage', 0))
+    return rounds * size
+
+
+def gather_fan_out(size: int, rng: random.Random, measure: Measure) -> int:
+    """A coroutine gathers `size` children ten times, the children waiting for a common event."""
+
+    cm = CoroutineManager()
+    em = cm.event_manager
+    rounds = 10
+
+    async def child(index: int) -> int:
+        await cm.wait_for_event('go')
+        return index
+
+    async def parent() -> None:
+        await cm.gather([child(index) for index in range(size)])
+
+    for _ in range(rounds):
+        cm.start(parent())
+        measure(em.raise_event, 'go')
+    return rounds * size
+
+
+def selective_multisubscriptions(size: int, rng: random.Random, measure: Measure) -> int:
+    """`size` multisubscribers wait for any of 3 random events out of `size`, a tenth of them using opaque selectors.
+
+    Random events are raised until all the multisubscribers have been called.
+    """
+
+    em = CoroutineManager().event_manager
+    called = 0
+
+    def subscriber(event: Any) -> None:
+        nonlocal called
+        called += 1
+
+    for index in range(size):
+        events = EventSet(rng.randrange(size) for _ in range(3))
+        if index % 10 == 0:
+            em.multisubscribe(lambda event, events=events.events: event in events, subscriber)
+        else:
+            em.multisubscribe(events, subscriber)
+    num_raised = 0
+    while called < size:
+        measure(em.raise_event, rng.randrange(size))
+        num_raised += 1
+    return num_raised
+
+
+def timers(size: int, rng: random.Random, measure: Measure) -> int:
+    """`size` delayed events with random delays are scheduled, half of them are cancelled, and the rest expire."""
+
+    cm = CoroutineManager()
+    handles = [measure(cm.add_delayed_event, rng.random() * 10, index) for index in range(size)]
+    for handle in handles[::2]:
+        measure(handle.cancel)
+    while cm.next_deadline() is not None:
+        cm.update(0.1)
+    return size + len(handles[::2])
+
+
+def subscribe_and_raise(size: int, rng: random.Random, measure: Measure) -> int:
+    """`size` subscriptions to random events out of `size // 10`, followed by raising all the events.
+
+    Every subscriber call counts as an operation for the throughput.
+    """
+
+    em = CoroutineManager().event_manager
+    num_events = max(size // 10, 1)
+    calls = 0
+
+    def subscriber(event: Any) -> None:
+        nonlocal calls
+        calls += 1
+
+    for _ in range(size):
+        em.subscribe(('event', rng.randrange(num_events)), subscriber)
+    for index in range(num_events):
+        measure(em.raise_event, ('event', index))
+    assert calls == size
+    return calls
+
+
+def subscribe_and_raise_ids(size: int, rng: random.Random, measure: Measure) -> int:
+    """The same as `subscribe_and_raise`, but with interned events subscribed to and raised by their IDs."""
+
+    em = CoroutineManager().event_manager
+    num_events = max(size // 10, 1)
+    event_ids = [em.intern(('event', index)) for index in range(num_events)]
+    calls = 0
+
+    def subscriber(event: Any) -> None:
+        nonlocal calls
+        calls += 1
+
+    for _ in range(size):
+        em.subscribe_id(event_ids[rng.randrange(num_events)], subscriber)
+    for event_id in event_ids:
+        measure(em.raise_id, event_id)
+    assert calls == size
+    return calls
+
+
+SCENARIOS: Dict[str, ScenarioInfo] = {
+    'sleepers': ScenarioInfo(sleepers, 20000, 'update tick', sleepers.__doc__ or ''),
+    'coalesced_sleepers': ScenarioInfo(
+        coalesced_sleepers, 20000, 'update tick', coalesced_sleepers.__doc__ or '',
+    ),
+    'wake_up_chain': ScenarioInfo(wake_up_chain, 10000, 'round around the ring', wake_up_chain.__doc__ or ''),
+    'gather_fan_out': ScenarioInfo(gather_fan_out, 10000, 'gather', gather_fan_out.__doc__ or ''),
+    'selective_multisubscriptions': ScenarioInfo(
+        selective_multisubscriptions, 5000, 'raise_event', selective_multisubscriptions.__doc__ or '',
+    ),
+    'timers': ScenarioInfo(timers, 100000, 'add_delayed_event or cancel', timers.__doc__ or ''),
+    'subscribe_and_raise': ScenarioInfo(subscribe_and_raise, 100000, 'raise_event', subscribe_and_raise.__doc__ or ''),
+    'subscribe_and_raise_ids': ScenarioInfo(
+        subscribe_and_raise_ids, 100000, 'raise_id', subscribe_and_raise_ids.__doc__ or '',
+    ),
+}
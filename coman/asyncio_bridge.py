@@ -0,0 +1,211 @@
+"""Module that allows running a coroutine manager inside an asyncio event loop.
+
+`AsyncioDriver` calls `CoroutineManager.update` from the event loop exactly when there is
+something to do: a timer is set (with `loop.call_at`) for the earliest delayed event and rearmed
+whenever a new one is scheduled, so no polling is involved. Events posted from other threads
+with `EventManager.post_event` wake the event loop up as well. It also lets the coroutines managed
+by `coman` await asyncio futures, and asyncio code await the coroutines managed by `coman`.
+"""
+
+from coman.coroutine_manager import CoroutineManager, CoroutineType, CancelledError
+
+import asyncio
+from typing import Any, Awaitable, Optional
+
+
+class AsyncioDriver:
+    """Driver of a CoroutineManager running in an asyncio event loop.
+
+    Example:
+    ```
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        result = await driver.create_future(some_coman_coroutine())
+        driver.stop()
+
+    asyncio.run(main())
+    ```
+
+    While the driver is running, the coroutine manager must not be updated by other means. The time
+    of the coroutine manager follows the clock of the event loop (`loop.time()`).
+    """
+
+    def __init__(self, coroutine_manager: CoroutineManager, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Construct a driver.
+
+        Parameters:
+            coroutine_manager -- the coroutine manager to drive.
+            loop              -- the event loop to run in. If not given, the running event loop is
+                                 used (so, in this case, the driver must be constructed from a coroutine
+                                 or a callback run by the event loop).
+        """
+
+        self._coroutine_manager = coroutine_manager
+        self._loop = loop if loop is not None else asyncio.get_running_loop()
+        self._last_time = 0.0
+        self._timer_handle: Optional[asyncio.TimerHandle] = None
+        self._timer_when: Optional[float] = None
+        self._rearm_scheduled = False
+        self._post_wakeup_scheduled = False
+        self._running = False
+
+    @property
+    def coroutine_manager(self) -> CoroutineManager:
+        """Return the driven coroutine manager."""
+        return self._coroutine_manager
+
+    @property
+    def running(self) -> bool:
+        """Return True if the driver has been started and not stopped yet."""
+        return self._running
+
+    def start(self) -> None:
+        """Start driving the coroutine manager.
+
+        From this moment on, the coroutine manager assumes that the time passes at the pace of the event loop clock.
+        """
+
+        if self._running:
+            return
+        self._running = True
+        self._last_time = self._loop.time()
+        self._coroutine_manager.set_wakeup_callback(self._schedule_rearm)
+        # The coroutines resumed from outside of the driver (e.g. woken up by an event raised by asyncio code,
+        # or started by `create_future`) compute their deadlines from the current time of the event loop.
+        self._coroutine_manager.set_catch_up_callback(self._update)
+        self._coroutine_manager.event_manager.set_post_callback(self._schedule_post_wakeup)
+        self._rearm()
+
+    def stop(self) -> None:
+        """Stop driving the coroutine manager. The delayed events stay pending."""
+
+        if not self._running:
+            return
+        self._running = False
+        self._coroutine_manager.set_wakeup_callback(None)
+        self._coroutine_manager.set_catch_up_callback(None)
+        self._coroutine_manager.event_manager.set_post_callback(None)
+        self._disarm()
+
+    async def wait_for_future(self, awaitable: Awaitable[Any]) -> Any:
+        """Suspend the current coman coroutine until an asyncio future (or any other awaitable) completes.
+
+        Must be awaited from a coroutine started by the driven coroutine manager. Returns the result
+        of the awaitable or re-raises its exception. If the awaitable is cancelled, `asyncio.CancelledError`
+        is raised; if it is not caught, the future returned by `create_future` is cancelled.
+        """
+
+        future = asyncio.ensure_future(awaitable, loop=self._loop)
+        if not future.done():
+            event_manager = self._coroutine_manager.event_manager
+            event = event_manager.unique_event()
+            future.add_done_callback(lambda future: event_manager.raise_event(event))
+            await self._coroutine_manager.wait_for_event(event)
+        return future.result()
+
+    def create_future(self, coro: CoroutineType) -> 'asyncio.Future[Any]':
+        """Start a coroutine in the driven coroutine manager and return an asyncio future for its result.
+
+        The returned future can be awaited by asyncio code. If the coroutine raises an exception,
+        it is set on the future. Cancelling the future cancels the coroutine (see `Task.cancel`),
+        and vice versa.
+        """
+
+        future = self._loop.create_future()
+
+        async def wrapper() -> None:
+            try:
+                result = await coro
+            except CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except asyncio.CancelledError:
+                # The coroutine has been interrupted by a cancelled asyncio future (see `wait_for_future`).
+                if not future.done():
+                    future.cancel()
+            except Exception as exception:
+                if not future.done():
+                    future.set_exception(exception)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+        task = self._coroutine_manager.start(wrapper())
+        future.add_done_callback(lambda future: task.cancel() if future.cancelled() else None)
+        return future
+
+    def _schedule_rearm(self) -> None:
+        # Called by the coroutine manager when a delayed event is added. Many of them may be added
+        # at once, so the timer is rearmed only once, after the current callback returns.
+        if not self._rearm_scheduled:
+            self._rearm_scheduled = True
+            self._loop.call_soon(self._rearm)
+
+    def _schedule_post_wakeup(self) -> None:
+        # Called from arbitrary threads. The flag is only an optimization to avoid waking the event
+        # loop up for every single posted event, so a race on it is harmless.
+        if not self._post_wakeup_scheduled:
+            self._post_wakeup_scheduled = True
+            self._loop.call_soon_threadsafe(self._on_post_wakeup)
+
+    def _on_post_wakeup(self) -> None:
+        self._post_wakeup_scheduled = False
+        self._rearm()
+
+    def _rearm(self) -> None:
+        if not self._running:
+            self._rearm_scheduled = False
+            return
+        # The delayed events added during the update are taken into account right below.
+        self._rearm_scheduled = True
+        try:
+            self._update()
+        finally:
+            self._rearm_scheduled = False
+            # Even if a coroutine has raised an exception, the others must keep being woken up.
+            self._arm()
+
+    def _arm(self) -> None:
+        if self._coroutine_manager.backlog() > 0:
+            # The update has been interrupted by an exception, so the rest of the ready coroutines
+            # are resumed by the next one.
+            self._schedule_rearm()
+        deadline = self._coroutine_manager.next_deadline()
+        if deadline is None:
+            self._disarm()
+            return
+        when = self._last_time + (deadline - self._coroutine_manager.elapsed_time())
+        if when == self._timer_when:
+            return
+        self._disarm()
+        self._timer_when = when
+        self._timer_handle = self._loop.call_at(when, self._on_timer)
+
+    def _disarm(self) -> None:
+        if self._timer_handle is not None:
+            self._timer_handle.cancel()
+            self._timer_handle = None
+            self._timer_when = None
+
+    def _on_timer(self) -> None:
+        # The event loop may run the timer a bit early (within its clock resolution), in which case
+        # the coroutine manager is advanced to the exact time it has been armed for.
+        self._timer_handle = None
+        if self._timer_when is not None and self._timer_when > self._loop.time():
+            self._advance_to(self._timer_when)
+        self._timer_when = None
+        self._rearm()
+
+    def _update(self) -> None:
+        self._advance_to(self._loop.time())
+
+    def _advance_to(self, now: float) -> None:
+        if now > self._last_time:
+            time_delta = now - self._last_time
+            self._last_time = now
+            self._coroutine_manager.update(time_delta)
+        else:
+            self._coroutine_manager.update(0)
@@ -1,17 +1,270 @@
 """Main module responsible for the coroutine manager."""
 
-from coman.event_manager import EventManager, Event
-from coman.time_tracker import TimeTracker, FutureTimePoint
+from coman.event_manager import EventManager, Event, EventSet, TuplePattern, FieldPattern, Subscription
+from coman.instrumentation import Instrumentation
+from coman.time_tracker import TimeTracker
+from coman.timers import Timer, TimingWheel, _SleepTimer
 
 import heapq
+import math
+import time
+from collections import deque
 from collections.abc import Iterable as IterableABC
 from types import coroutine
-from typing import List, Coroutine, Generator, Iterable, Callable, Union, Tuple
+from typing import List, Coroutine, Generator, Iterable, Callable, Union, Tuple, Deque, Any, Optional, Dict, cast
 
 _YieldType = Union[Event, Iterable[Event], Callable[[Event], bool]]
-CoroutineType = Coroutine[_YieldType, None, None]
+# A suspended coroutine is resumed with the event that woke it up and the payload it was raised with
+# (or with None if it is being started).
+_SendType = Optional[Tuple[Event, Any]]
+CoroutineType = Coroutine[_YieldType, _SendType, Any]
 GeneratorType = Generator[_YieldType, None, None]
 
+# Yielded by `sleep` to ask the coroutine manager to put the current coroutine into the timer structure
+# directly. The duration is passed in `CoroutineManager._sleep_duration` rather than yielded along with
+# the marker to avoid allocating anything.
+_SLEEP = object()
+# Yielded by `wait_for_any` to ask the coroutine manager to wait for any of the events selected by
+# `CoroutineManager._wait_selector` for at most `CoroutineManager._wait_timeout` seconds.
+_WAIT = object()
+# Yielded by `CoroutineManager._park` to ask the coroutine manager to put the current task into
+# the queue of `CoroutineManager._parking`.
+_PARK = object()
+
+# Cancelled delayed events are not purged from the heap until there are more than this many of them
+# (the same goes for the cancelled tasks in the queues of parked tasks).
+_MIN_CANCELLED_TO_COMPACT = 64
+
+
+class CancelledError(BaseException):
+    """The exception thrown into a coroutine when its task is cancelled (see `Task.cancel`).
+
+    It derives from BaseException rather than Exception so that it is not caught by accident by
+    the code catching all the ordinary exceptions.
+    """
+
+
+class _Parking:
+    # A queue of tasks suspended until some other code wakes them up explicitly (used by the primitives
+    # implemented on top of the ready queue, such as `coman.channel.Channel`). A parked task has this
+    # object as its `_waiting`, which the cancellation resets, so the cancelled tasks are told apart
+    # lazily, just like the cancelled timers in the heap of delayed events.
+
+    __slots__ = ('coroutine_manager', 'tasks', 'num_cancelled')
+
+    def __init__(self, coroutine_manager: 'CoroutineManager') -> None:
+        self.coroutine_manager = coroutine_manager
+        self.tasks: Deque['Task'] = deque()
+        self.num_cancelled = 0
+
+    def __len__(self) -> int:
+        return len(self.tasks) - self.num_cancelled
+
+    def wake_one(self) -> bool:
+        # Move the longest parked task to the ready queue. Returns False if there are no parked tasks.
+        tasks = self.tasks
+        while len(tasks) > 0:
+            task = tasks.popleft()
+            if task._waiting is self:
+                task._waiting = None
+                self.coroutine_manager._schedule(task)
+                return True
+            self.num_cancelled -= 1
+        return False
+
+    def unsubscribe(self) -> bool:
+        # Called when a parked task is cancelled (see `CoroutineManager._cancel_wait`).
+        self.num_cancelled += 1
+        tasks = self.tasks
+        if self.num_cancelled > max(len(tasks) // 2, _MIN_CANCELLED_TO_COMPACT):
+            self.tasks = deque(task for task in tasks if task._waiting is self)
+            self.num_cancelled = 0
+        return True
+
+
+class Task:
+    """A handle to a coroutine started by a CoroutineManager, as returned by `CoroutineManager.start`.
+
+    It can be used to cancel the coroutine.
+    """
+
+    __slots__ = (
+        '_coroutine_manager',
+        '_coro',
+        '_waiting',
+        '_sleep',
+        '_value',
+        '_throw',
+        '_cancel_requested',
+        '_done',
+        '_cancelled',
+        '_priority',
+        '_bucket',
+    )
+
+    def __init__(self, coroutine_manager: 'CoroutineManager', coro: CoroutineType, priority: int = 0) -> None:
+        """Construct a Task. Should not be called explicitly.
+
+        Use `CoroutineManager.start` to create tasks.
+        """
+
+        self._coroutine_manager = coroutine_manager
+        self._coro = coro
+        # The subscription (or the queue of parked tasks) the coroutine is waiting for, if any.
+        self._waiting: Union[Subscription, _Parking, None] = None
+        # The delayed wake-up of the coroutine, if any: a Timer (if it is sleeping in a TimingWheel) or
+        # the sequence number of its entry in the heap of delayed events. The coroutine may be waiting for
+        # both a subscription and a delayed wake-up (see `CoroutineManager.wait_for_any`).
+        self._sleep: Union[Timer, int, None] = None
+        # The bucket of the delayed events the entry of the delayed wake-up is in, if any.
+        self._bucket: Optional[_TimerBucket] = None
+        # The value to send into the coroutine when it is resumed next time: the event it has been woken up by
+        # along with its payload.
+        self._value: Optional[Tuple[Event, Any]] = None
+        # The exception to throw into the coroutine when it is resumed next time.
+        self._throw: Optional[BaseException] = None
+        self._cancel_requested = False
+        self._done = False
+        self._cancelled = False
+        self._priority = priority
+
+    def __repr__(self) -> str:
+        return f'Task({self._coro!r}, done={self._done}, cancelled={self._cancelled})'
+
+    def __call__(self, event: Event) -> None:
+        # Tasks subscribe themselves to the events their coroutines wait for.
+        self._waiting = None
+        self._value = (event, self._coroutine_manager._event_manager._payload)
+        if self._sleep is not None:
+            # The timeout has lost the race.
+            self._coroutine_manager._cancel_sleep(self)
+        self._coroutine_manager._schedule(self)
+
+    @property
+    def coroutine(self) -> CoroutineType:
+        """Return the coroutine run by this task."""
+        return self._coro
+
+    @property
+    def priority(self) -> int:
+        """Return the priority of the coroutine (see `CoroutineManager.start`)."""
+        return self._priority
+
+    @property
+    def done(self) -> bool:
+        """Return True if the coroutine has finished (whether by returning, raising an exception or being cancelled)."""
+        return self._done
+
+    @property
+    def cancelled(self) -> bool:
+        """Return True if the coroutine has finished by letting the CancelledError thrown into it propagate."""
+        return self._cancelled
+
+    def cancel(self) -> bool:
+        """Cancel the coroutine.
+
+        The subscription or the delayed event the coroutine is waiting for is cancelled right away (in constant
+        time), and CancelledError is thrown into the coroutine. Just like any other resumption, this happens
+        after the current coroutine suspends if this method is called from a coroutine, and before this method
+        returns otherwise. If the coroutine is cancelling itself, the exception is thrown into it as soon as it
+        suspends. The coroutine may catch the exception to clean up (and even keep running, although this
+        is discouraged).
+
+        Returns True if the cancellation has been requested and False if the coroutine has already finished
+        or been cancelled (in which case nothing is done).
+
+        Unless the coroutine raises an exception other than CancelledError in response, this method does not
+        raise exceptions.
+        """
+
+        if self._done or self._cancel_requested:
+            return False
+        self._cancel_requested = True
+        self._throw = CancelledError()
+        if self._waiting is not None or self._sleep is not None:
+            self._coroutine_manager._cancel_wait(self)
+            self._coroutine_manager._schedule(self)
+        # Otherwise, the task is either in the ready queue or running, and the exception will be thrown
+        # into the coroutine when it is resumed.
+        return True
+
+
+class _TimerBucket:
+    # The delayed events (and the sleeping tasks) whose deadlines have been rounded to the same time
+    # point (see the `slack` parameter of `CoroutineManager.add_delayed_event`). A bucket takes a single
+    # entry in the heap of delayed events, and its own entries are handled in one go, in the order they
+    # have been added in. They are stored just like in the heap, so the cancelled ones are told apart
+    # the same way. The number of the pending ones is kept track of, so that a bucket containing only
+    # the cancelled ones is told apart as well.
+
+    __slots__ = ('deadline', 'entries', 'num_pending', 'in_heap')
+
+    def __init__(self, deadline: float) -> None:
+        self.deadline = deadline
+        self.entries: List['_BucketedEntry'] = []
+        self.num_pending = 0
+        # False once the bucket has been taken from the heap (to be handled or dropped).
+        self.in_heap = True
+
+
+_DelayedEntry = Tuple[float, int, Union[Timer, Task, _TimerBucket]]
+_BucketedEntry = Tuple[float, int, Union[Timer, Task]]
+
+
+def _is_pending(entry: _DelayedEntry) -> bool:
+    # Whether an entry of the heap of delayed events is still relevant. A sleeping task is pending
+    # unless it has been cancelled (in which case it does not wait for this entry anymore). A bucket
+    # is pending as long as any of its entries is.
+    target = entry[2]
+    if type(target) is Timer:
+        return target._pending
+    if type(target) is _TimerBucket:
+        return target.num_pending > 0
+    return cast(Task, target)._sleep == entry[1]
+
+
+def _round_deadline(deadline: float, slack: float) -> float:
+    # Round the deadline up to a multiple of the slack, so that the deadlines close to each other
+    # become exactly equal. A deadline which is a multiple already (up to a rounding error) is kept
+    # in its place, and so is a multiple of a decimal slack: e.g. 3 * 0.1 is 0.30000000000000004,
+    # which would not be reached by `update(0.3)`, so the product is cut to 15 significant digits.
+    quotient = deadline / slack
+    multiple = round(quotient)
+    if abs(quotient - multiple) >= 1e-9:
+        multiple = math.ceil(quotient)
+    return float(f'{multiple * slack:.15g}')
+
+
+class _Join:
+    # A countdown shared by the coroutines run by `CoroutineManager.gather`. The gathering coroutine
+    # waits for `event`, which is raised exactly once: either when the last of the gathered coroutines
+    # completes or when the first of them fails.
+
+    __slots__ = ('event_manager', 'event', 'remaining', 'results', 'exception')
+
+    def __init__(self, event_manager: EventManager, num_total: int) -> None:
+        self.event_manager = event_manager
+        self.event = event_manager.unique_event()
+        self.remaining = num_total
+        self.results: List[Any] = [None] * num_total
+        self.exception: Optional[BaseException] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.remaining == 0 or self.exception is not None
+
+    def complete(self, index: int, result: Any) -> None:
+        self.results[index] = result
+        self.remaining -= 1
+        if self.remaining == 0 and self.exception is None:
+            self.event_manager.raise_event(self.event)
+
+    def fail(self, exception: BaseException) -> None:
+        self.remaining -= 1
+        if self.exception is None:
+            self.exception = exception
+            self.event_manager.raise_event(self.event)
+
 
 class CoroutineManager:
     """Coroutine manager.
@@ -29,20 +282,192 @@ class CoroutineManager:
     and we want to retain some flexibility in changing it while not breaking the code that
     relies on some implementation-specific behavior. In future versions, however, the
     consequences of such usage of CoroutineManager may become more deterministic.
+
+    Each coroutine is run by a `Task`, which can be used to cancel it.
+
+    Coroutines are never resumed recursively. When an event wakes a coroutine up, the coroutine is
+    put into a ready queue, which is then drained in a flat loop by the outermost call into the
+    coroutine manager (`start`, `resume`, `update` or `EventManager.raise_event` called from outside
+    of any coroutine). Therefore, arbitrarily long chains of coroutines waking each other up
+    do not grow the call stack. There is a ready queue for each priority the coroutines have been
+    started with (see `start`), and the ones with higher priorities are drained first.
     """
 
-    def __init__(self) -> None:
-        """Construct a coroutine manager."""
+    def __init__(self, timing_wheel: Optional[TimingWheel] = None, timer_slack: float = 0.0) -> None:
+        """Construct a coroutine manager.
+
+        Parameters:
+            timing_wheel -- if given, the delayed events (including the ones used by `sleep`) are
+                            scheduled in this timing wheel instead of a binary heap. See the documentation
+                            for `TimingWheel` for the trade-offs.
+            timer_slack  -- the default slack of the delayed events, including the ones used by `sleep`
+                            and the timeouts (see `add_delayed_event`). 0 (the default) means that
+                            the deadlines are exact.
+
+        Raises ValueError if `timer_slack` is negative.
+        """
+
+        if timer_slack < 0:
+            raise ValueError('The timer slack must be non-negative')
+
         self._event_manager = EventManager()
+        self._event_manager._dispatch_callback = self._run_woken
         self._time_tracker = TimeTracker()
-        self._delayed_events: List[Tuple[FutureTimePoint, Event]] = []
+        # A heap of (deadline, sequence number, timer or sleeping task) tuples. The deadlines are
+        # stored as raw floats (rather than as FutureTimePoint's) so that the heap is ordered by plain
+        # tuple comparisons, and the sequence numbers make the entries with equal deadlines expire
+        # in FIFO order.
+        self._delayed_events: List[_DelayedEntry] = []
+        self._num_cancelled_delayed_events = 0
+        # The buckets of the delayed events with rounded deadlines which are still in the heap, by deadline,
+        # and the total number of entries in them.
+        self._timer_buckets: Dict[float, _TimerBucket] = {}
+        self._num_bucketed_delayed_events = 0
+        self._timer_slack = timer_slack
+        self._timing_wheel = timing_wheel
+        self._timer_counter = 0
+        self._sleep_duration = 0.0
+        self._sleep_slack: Optional[float] = None
+        self._wait_selector: _YieldType = None
+        self._wait_timeout: Optional[float] = None
+        self._parking: Optional[_Parking] = None
+        # The ready queue of the tasks with the default priority (0), and the ones for the other
+        # priorities, which only exist while they are non-empty.
+        self._ready: Deque[Task] = deque()
+        self._ready_queues: Dict[int, Deque[Task]] = {}
+        self._running = False
+        # Set while a budgeted `update` has left some work over, which only the next `update` (or `run_until`)
+        # may do, so that the budget is not overrun by the calls from outside of the coroutines.
+        self._backlog_held = False
+        # The task whose coroutine is being resumed at the moment, if any.
+        self._current_task: Optional[Task] = None
+        self._wakeup_callback: Optional[Callable[[], None]] = None
+        self._catch_up_callback: Optional[Callable[[], None]] = None
+        self._instrumentation: Optional[Instrumentation] = None
 
     @property
     def event_manager(self) -> EventManager:
         """Return the EventManager object used to handle events."""
         return self._event_manager
 
-    def update(self, time_delta: float) -> None:
+    def elapsed_time(self) -> float:
+        """Return the time (in seconds) the coroutine manager assumes to have passed since its construction."""
+        return self._time_tracker.elapsed_time()
+
+    def next_deadline(self) -> Optional[float]:
+        """Return the time point (in the same terms as `elapsed_time`) at which the earliest pending delayed event is due.
+
+        Returns None if there are no pending delayed events. The returned time point may have already
+        passed if `update` has not been called since then.
+        """
+
+        if self._timing_wheel is not None:
+            return self._timing_wheel.next_deadline()
+
+        delayed_events = self._delayed_events
+        # Cancelled delayed events at the top of the heap are not interesting, so take the chance
+        # to get rid of them.
+        while len(delayed_events) > 0 and not _is_pending(delayed_events[0]):
+            target = heapq.heappop(delayed_events)[2]
+            if type(target) is _TimerBucket:
+                self._drop_timer_bucket(target)
+            else:
+                self._num_cancelled_delayed_events -= 1
+        return delayed_events[0][0] if len(delayed_events) > 0 else None
+
+    def set_wakeup_callback(self, callback: Optional[Callable[[], None]]) -> None:
+        """Set a function to be called whenever a new delayed event is scheduled (None to unset).
+
+        This is meant for the code that drives the coroutine manager (calls `update`) on its own schedule,
+        such as `coman.asyncio_bridge.AsyncioDriver`: when the callback is called, `next_deadline` may have
+        changed. The callback must not call `update` or resume coroutines by itself, but it may arrange for
+        that to be done later.
+        """
+
+        self._wakeup_callback = callback
+
+    def set_catch_up_callback(self, callback: Optional[Callable[[], None]]) -> None:
+        """Set a function to be called before the coroutines are run from outside of `update` (None to unset).
+
+        That is, before `start`, `Task.cancel` or `EventManager.raise_event` called from outside of any
+        coroutine resume the coroutines made ready to run by them. This is meant for the code that keeps
+        the time of the coroutine manager in line with some clock, such as `coman.asyncio_bridge.AsyncioDriver`:
+        the callback may call `update` to advance the time to the current one (which resumes the coroutines
+        at once), so that they compute their deadlines from it.
+        """
+
+        self._catch_up_callback = callback
+
+    @property
+    def instrumentation(self) -> Optional[Instrumentation]:
+        """Return the enabled instrumentation or None if it is disabled."""
+        return self._instrumentation
+
+    def enable_instrumentation(self, instrumentation: Optional[Instrumentation] = None) -> Instrumentation:
+        """Start collecting statistics about the work done by this coroutine manager and its event manager.
+
+        The time spent in each resumption of a coroutine, each call to a subscriber and each call to `update`
+        is measured, and the evaluations of the (opaque) selectors are counted. See `Instrumentation` for
+        the details. Only the (multi)subscriptions made from now on are instrumented.
+
+        While the instrumentation is disabled (which is the default), it costs nothing: the instrumented
+        variants of the methods involved are only swapped in by this method.
+
+        Parameters:
+            instrumentation -- the instrumentation to collect the statistics into (e.g. one with callbacks).
+                               A new one is created if not given. If another one is already enabled,
+                               it is replaced.
+
+        Returns the enabled instrumentation. Does not raise any exceptions.
+        """
+
+        if self._instrumentation is not None:
+            self.disable_instrumentation()
+        if instrumentation is None:
+            instrumentation = Instrumentation()
+        instrumentation._gauges = self._instrumentation_gauges
+        self._instrumentation = instrumentation
+        # Instance attributes shadow the methods of the class, including for `_run`, which looks `_step` up.
+        self._step = instrumentation._wrap_step(CoroutineManager._step.__get__(self), self.backlog)  # type: ignore
+        self.update = instrumentation._wrap_update(CoroutineManager.update.__get__(self))  # type: ignore
+        self._event_manager._instrument(instrumentation)
+        return instrumentation
+
+    def disable_instrumentation(self) -> None:
+        """Stop collecting statistics and remove the overhead of the instrumentation.
+
+        The (multi)subscriptions made while the instrumentation was enabled still update its counters
+        when their subscribers are called. Does nothing if the instrumentation is not enabled.
+        """
+
+        if self._instrumentation is None:
+            return
+        self._instrumentation = None
+        del self._step
+        del self.update
+        self._event_manager._instrument(None)
+
+    def _instrumentation_gauges(self) -> Dict[str, int]:
+        if self._timing_wheel is not None:
+            timer_heap_size = len(self._timing_wheel)
+        else:
+            timer_heap_size = (
+                len(self._delayed_events) - len(self._timer_buckets) + self._num_bucketed_delayed_events
+                - self._num_cancelled_delayed_events
+            )
+        return {
+            'ready_queue_depth': self.backlog(),
+            'timer_heap_size': timer_heap_size,
+            'posted_events': len(self._event_manager._posted_events),
+        }
+
+    def update(
+        self,
+        time_delta: float,
+        *,
+        max_resumes: Optional[int] = None,
+        deadline_ns: Optional[int] = None,
+    ) -> None:
         """Update the internal state and sleeping coroutines assuming `time_delta` seconds have passed.
 
         This method gives the CoroutineManager some flexibility in that it is not bound to the real
@@ -54,40 +479,132 @@ class CoroutineManager:
         `update`).
 
         Parameters:
-            time_delta -- the amount of time (in seconds) CoroutineManager should assume to have passed
-                          since (a) the last call to `update`, if any, or (b) the call to `__init__`,
-                          if it is the first time `update` is called. Must be non-negative (this is
-                          currently unchecked but may raise an exception in future versions).
+            time_delta  -- the amount of time (in seconds) CoroutineManager should assume to have passed
+                           since (a) the last call to `update`, if any, or (b) the call to `__init__`,
+                           if it is the first time `update` is called. Must be non-negative (this is
+                           currently unchecked but may raise an exception in future versions).
+            max_resumes -- if given, the maximum number of coroutine resumptions to perform.
+            deadline_ns -- if given, the value of `time.monotonic_ns()` after which no more coroutines
+                           are resumed.
+
+        First, the events posted to the event manager from other threads (see `EventManager.post_event`)
+        are raised. Then, all the coroutines that become ready to run (including the ones woken up by
+        the posted events and by the delayed events that have just become due) are resumed before this
+        method returns.
+
+        If a budget (`max_resumes` and/or `deadline_ns`) is given, the method returns as soon as it is
+        spent. The coroutines that are ready to run but have not been resumed are left in the ready queue
+        and are resumed first, in the same order, by the next call to `update` (or `run_until`). Until then,
+        the other calls that would run the coroutines (e.g. `start` from outside of a coroutine) merely put
+        them into the ready queue as well. The number of the coroutines left over is returned by `backlog`. The delayed events that are due are handled regardless of the budget, since this
+        merely makes the coroutines waiting for them ready to run.
 
-        Unless an exception is raised by an event handler or a coroutine, this method does not raise
-        exceptions. If it does, it is a bug or a system/hardware failure (out of memory error, for example).
+        Raises ValueError if `max_resumes` is negative. Unless an exception is raised by an event handler
+        or a coroutine, this method does not raise other exceptions. If it does, it is a bug or
+        a system/hardware failure (out of memory error, for example).
         """
 
+        if max_resumes is not None and max_resumes < 0:
+            raise ValueError('The maximum number of resumptions must be non-negative')
         self._time_tracker.update(time_delta)
-        self._handle_delayed_events()
+        if max_resumes is None and deadline_ns is None:
+            self._run(handle_delayed_events=True)
+        else:
+            self._run_budgeted(max_resumes, deadline_ns)
+
+    def backlog(self) -> int:
+        """Return the number of coroutines which are ready to run but have not been resumed yet.
+
+        It is non-zero after `update` has run out of its budget (see `update`). Does not raise exceptions.
+        """
+
+        return len(self._ready) + sum(len(queue) for queue in self._ready_queues.values())
+
+    def run_until(self, time_point: float) -> None:
+        """Run the coroutines, advancing the time from one delayed event to the next, until `time_point`.
+
+        This is the discrete-event simulation counterpart of `update`: instead of advancing the time
+        by fixed steps, it jumps straight to the deadline of the earliest delayed event, handles exactly
+        the delayed events due at that instant (in the order they were added in, if there are several)
+        along with the coroutines they wake up, and repeats. Finally, the time is advanced to `time_point`,
+        and the events posted from other threads (see `EventManager.post_event`) are raised at that time.
+        The deadlines are reached exactly, with no rounding errors accumulated.
+
+        Parameters:
+            time_point -- the time point (in the same terms as `elapsed_time`) to run until. If it has
+                          already passed, only the coroutines (and the delayed events) which are ready
+                          to run at the moment are run.
 
-    async def sleep(self, duration: float) -> None:
+        Raises RuntimeError if called from a coroutine run by this coroutine manager. Otherwise, unless
+        an exception is raised by an event handler or a coroutine, this method does not raise exceptions.
+        """
+
+        self._run_until(time_point)
+
+    def run_until_idle(self) -> None:
+        """Run the coroutines, advancing the time from one delayed event to the next, until there are none left.
+
+        See `run_until` for details, except that the posted events are raised as soon as possible
+        rather than at the end. When this method returns, there are no pending delayed events,
+        and all the coroutines are either finished or waiting for events. This method does not return
+        if the coroutines keep scheduling delayed events forever (e.g. sleep in an endless loop).
+
+        Raises RuntimeError if called from a coroutine run by this coroutine manager. Otherwise, unless
+        an exception is raised by an event handler or a coroutine, this method does not raise exceptions.
+        """
+
+        self._run_until(None)
+
+    def _run_until(self, time_point: Optional[float]) -> None:
+        if self._running:
+            raise RuntimeError('The simulation cannot be run from a coroutine')
+        time_tracker = self._time_tracker
+        # When running until a time point, the posted events are raised once it has been reached,
+        # so that the coroutines woken up by them do not measure time from some earlier deadline.
+        raise_posted_events = time_point is None
+        self._run(handle_delayed_events=True, raise_posted_events=raise_posted_events)
+        while True:
+            deadline = self.next_deadline()
+            if deadline is None or (time_point is not None and deadline > time_point):
+                break
+            time_tracker.advance_to(deadline)
+            self._run(handle_delayed_events=True, raise_posted_events=raise_posted_events)
+        if time_point is not None:
+            if time_point > time_tracker.elapsed_time():
+                time_tracker.advance_to(time_point)
+            self._run(handle_delayed_events=True)
+
+    @coroutine
+    def sleep(self, duration: float, slack: Optional[float] = None) -> GeneratorType:
         """Suspend the current coroutine for a specified amount of time.
 
         The coroutine will be resumed after `duration` "seconds", as assumed by the CoroutineManager.
         See the documentation for `update` method for more information about time tracking here.
 
         If two or more coroutines call `sleep` in such a way that they should wake up at the same time,
-        no guarantees are given about the order in which they will be resumed.
+        they are resumed in the order they called `sleep` in.
+
+        The coroutine is put into the structure holding the delayed events directly, so no events
+        are involved, and the event manager is not used.
 
         Parameters:
             duration -- the amount of time (in seconds) after which the coroutine will be resumed.
                         Must be non-negative (this is currently unchecked but may raise an exception
                         in future versions).
+            slack    -- the amount of time (in seconds) the coroutine may be resumed late by, so that it is
+                        resumed along with the other ones due around the same time (see `add_delayed_event`).
+                        If not given, the default slack of the coroutine manager is used.
 
-        Does not raise any exceptions.
+        Raises ValueError if `slack` is negative. Otherwise, does not raise any exceptions.
         """
 
-        event = self.event_manager.unique_event()
-        self.add_delayed_event(delay=duration, event=event)
-        await self.wait_for_event(event)
+        if slack is not None and slack < 0:
+            raise ValueError('The timer slack must be non-negative')
+        self._sleep_duration = duration
+        self._sleep_slack = slack
+        yield _SLEEP
 
-    async def wait_for_event(self, event: Event) -> None:
+    async def wait_for_event(self, event: Event) -> Tuple[Event, Any]:
         """Suspend the current coroutine until a specified event is raised in the event manager.
 
         The current coroutine will be resumed when this event is raised in the event manager
@@ -98,23 +615,104 @@ class CoroutineManager:
 
         Parameters:
             event -- the event to wait for. See the documentation for `EventManager` for more information.
+                     It may also be a declarative selector (`EventSet`, `TuplePattern` or `FieldPattern`),
+                     in which case the coroutine is resumed when any event it matches is raised.
+
+        Returns the raised event and its payload (see `EventManager.raise_event`) as a tuple.
 
         Does not raise any exceptions.
         """
 
         # A workaround around a Mypy's alleged inability to work properly with
         # generator-based coroutines
-        await self._wait_for_event_impl(event)  # type: ignore
+        return await self._wait_for_event_impl(event)
 
     @coroutine
-    def _wait_for_event_impl(self, event: Event) -> GeneratorType:
-        yield event
+    def _wait_for_event_impl(self, event: Event) -> Generator[_YieldType, Tuple[Event, Any], Tuple[Event, Any]]:
+        return (yield event)
+
+    @coroutine
+    def wait_for_any(
+        self,
+        events: Iterable[Event],
+        timeout: Optional[float] = None,
+    ) -> Generator[_YieldType, Optional[Tuple[Event, Any]], Optional[Tuple[Event, Any]]]:
+        """Suspend the current coroutine until any of the specified events is raised or the timeout expires.
+
+        Whichever of them comes first, the other one is cancelled right away: no subscriptions or delayed
+        events are left behind.
+
+        Parameters:
+            events  -- the events to wait for.
+            timeout -- the maximum amount of time (in seconds) to wait for. If not given, the coroutine
+                       waits for as long as it takes.
+
+        Returns the event that has been raised and its payload (see `EventManager.raise_event`) as a tuple,
+        or None if the timeout has expired.
+
+        Does not raise any exceptions.
+        """
+
+        self._wait_selector = EventSet(events)
+        self._wait_timeout = timeout
+        return (yield _WAIT)
+
+    @coroutine
+    def _park(self, parking: _Parking) -> GeneratorType:
+        # Suspend the current coroutine until `parking.wake_one` picks it.
+        self._parking = parking
+        yield _PARK
+
+    async def wait_for_all(self, events: Iterable[Event], timeout: Optional[float] = None) -> bool:
+        """Suspend the current coroutine until all of the specified events are raised or the timeout expires.
+
+        The events may be raised in any order. Once all of them have been raised or the timeout has expired,
+        all the remaining subscriptions (or the delayed event of the timeout) are cancelled right away.
+
+        Parameters:
+            events  -- the events to wait for.
+            timeout -- the maximum amount of time (in seconds) to wait for. If not given, the coroutine
+                       waits for as long as it takes.
+
+        Returns True if all of the events have been raised and False if the timeout has expired first.
+
+        Does not raise any exceptions.
+        """
 
-    def start(self, coro: CoroutineType) -> None:
+        events = set(events)
+        if len(events) == 0:
+            return True
+        # Just like in `gather`, the coroutine is resumed once, rather than once for each of the events.
+        all_raised = self.event_manager.unique_event()
+        remaining = len(events)
+
+        def on_raised(event: Event) -> None:
+            nonlocal remaining
+            remaining -= 1
+            if remaining == 0:
+                self.event_manager.raise_event(all_raised)
+
+        subscriptions = [self.event_manager.subscribe(event, on_raised) for event in events]
+        try:
+            raised = await self.wait_for_any([all_raised], timeout)
+        finally:
+            # Timed out or cancelled.
+            for subscription in subscriptions:
+                subscription.unsubscribe()
+        return raised is not None
+
+    def start(self, coro: CoroutineType, priority: int = 0) -> Task:
         """Start running a coroutine.
 
         Parameters:
-            coro -- a coroutine as returned by an async function.
+            coro     -- a coroutine as returned by an async function.
+            priority -- the priority of the coroutine. Whenever several coroutines are ready to run,
+                        the ones with the highest priority are resumed first, and the ones with equal
+                        priorities in the order they have become ready in. This applies to every
+                        resumption of the coroutine, e.g. when it is woken up by an event along with
+                        many other coroutines, or when it is left over by a budgeted `update`.
+
+        Returns the Task running the coroutine, which can be used to cancel it.
 
         Example:
         ```
@@ -124,15 +722,25 @@ class CoroutineManager:
         cm = CoroutineManager()
         cm.start(foo())             # Notice that `foo` is called
         ```
+
+        The coroutine is run just like by `resume`.
         """
 
-        self.resume(coro)
+        task = Task(self, coro, priority)
+        self._schedule(task)
+        return task
 
     def resume(self, coro: CoroutineType) -> None:
         """Resume a suspended coroutine started by this coroutine manager.
 
-        Mostly used internally, but, to provide a little more flexibility, available
-        in the public API.
+        Equivalent to `start`, except that the Task is not returned. Kept for compatibility.
+
+        The coroutine is put into the ready queue. If this method is called from a coroutine
+        (or from an event subscriber called while coroutines are being run), it will be resumed
+        after the current one suspends. If it is called from an event subscriber otherwise, it is
+        resumed once the event has been dispatched. Otherwise, it is resumed (along with any coroutines
+        it wakes up) before this method returns, unless a budgeted `update` has left some coroutines
+        over, in which case it is resumed after them by the next `update`.
 
         Parameters:
             coro -- coroutine object. See the documentation for `start` method for details and an example.
@@ -141,24 +749,195 @@ class CoroutineManager:
         raise exceptions.
         """
 
+        self.start(coro)
+
+    def _schedule(self, task: Task) -> None:
+        self._make_ready(task)
+        # If an event is being raised, the task is resumed after it has been dispatched (see `_run_woken`).
+        if not self._running and self._event_manager._dispatch_depth == 0 and not self._backlog_held:
+            self._run_from_outside()
+
+    def _run_woken(self) -> None:
+        # Called by the event manager when an event raised from outside of the coroutines has been dispatched,
+        # so that all the coroutines woken up by it are resumed in the order of their priorities.
+        if not self._running and not self._backlog_held and (len(self._ready) > 0 or len(self._ready_queues) > 0):
+            self._run_from_outside()
+
+    def _run_from_outside(self) -> None:
+        if self._catch_up_callback is not None:
+            self._catch_up_callback()
+        self._run()
+
+    def _make_ready(self, task: Task) -> None:
+        priority = task._priority
+        if priority == 0:
+            self._ready.append(task)
+            return
+        queue = self._ready_queues.get(priority, None)
+        if queue is None:
+            queue = self._ready_queues[priority] = deque()
+        queue.append(task)
+
+    def _pop_prioritized(self) -> Task:
+        # Take the next task to resume when there are tasks with non-default priorities. There are only
+        # a few distinct priorities in practice, so finding the highest one is cheap.
+        queues = self._ready_queues
+        priority = max(queues)
+        if priority < 0 and len(self._ready) > 0:
+            return self._ready.popleft()
+        queue = queues[priority]
+        task = queue.popleft()
+        if len(queue) == 0:
+            del queues[priority]
+        return task
+
+    def _run(self, handle_delayed_events: bool = False, raise_posted_events: Optional[bool] = None) -> None:
+        # The run loop. Resumes the ready coroutines until there are none left. If asked to (which is
+        # the case when called from `update`), also raises the posted events (unless `raise_posted_events`
+        # is False) and handles the delayed events that have become due; resuming a coroutine may add
+        # new delayed events which are due already (e.g. `sleep(0)`), hence the outer loop.
+        if raise_posted_events is None:
+            raise_posted_events = handle_delayed_events
+        self._running = True
+        try:
+            ready = self._ready
+            queues = self._ready_queues
+            step = self._step
+            if raise_posted_events:
+                self._event_manager.raise_posted_events()
+            while True:
+                if handle_delayed_events:
+                    self._handle_delayed_events()
+                if len(ready) == 0 and len(queues) == 0:
+                    self._backlog_held = False
+                    break
+                while True:
+                    if len(queues) > 0:
+                        step(self._pop_prioritized())
+                    elif len(ready) > 0:
+                        step(ready.popleft())
+                    else:
+                        break
+        finally:
+            self._running = False
+
+    def _run_budgeted(self, max_resumes: Optional[int], deadline_ns: Optional[int]) -> None:
+        # The variant of `_run(handle_delayed_events=True)` used by a budgeted `update`. It is kept
+        # separate so that the unbudgeted run loop does not pay for the checks.
+        self._running = True
+        try:
+            ready = self._ready
+            queues = self._ready_queues
+            step = self._step
+            # Never reaches zero if there is no limit.
+            resumes_left = max_resumes if max_resumes is not None else -1
+            self._event_manager.raise_posted_events()
+            while True:
+                self._handle_delayed_events()
+                if len(ready) == 0 and len(queues) == 0:
+                    self._backlog_held = False
+                    break
+                while len(ready) > 0 or len(queues) > 0:
+                    if resumes_left == 0 or (deadline_ns is not None and time.monotonic_ns() >= deadline_ns):
+                        self._backlog_held = True
+                        return
+                    resumes_left -= 1
+                    step(self._pop_prioritized() if len(queues) > 0 else ready.popleft())
+        finally:
+            self._running = False
+
+    def _step(self, task: Task) -> None:
+        if task._done:
+            return
+        self._current_task = task
         try:
-            requested_event_selector = coro.send(None)
+            exception = task._throw
+            if exception is None:
+                requested_event_selector = task._coro.send(task._value)
+            else:
+                task._throw = None
+                requested_event_selector = task._coro.throw(exception)
         except StopIteration:
+            task._done = True
+            return
+        except CancelledError:
+            task._done = True
+            if not task._cancel_requested:
+                raise
+            task._cancelled = True
+            return
+        except BaseException:
+            task._done = True
+            raise
+        finally:
+            self._current_task = None
+
+        if task._throw is not None:
+            # The task has been cancelled while running, so it is not suspended.
+            self._make_ready(task)
             return
 
-        resumer = lambda event: self.resume(coro)
+        task._value = None
+        if requested_event_selector is _SLEEP:
+            self._schedule_sleeper(task, self._sleep_duration, self._sleep_slack)
+        elif requested_event_selector is _PARK:
+            parking = self._parking
+            assert parking is not None
+            task._waiting = parking
+            parking.tasks.append(task)
+        elif requested_event_selector is _WAIT:
+            task._waiting = self._subscribe_task(task, self._wait_selector)
+            if self._wait_timeout is not None:
+                self._schedule_sleeper(task, self._wait_timeout, None)
+        else:
+            task._waiting = self._subscribe_task(task, requested_event_selector)
+
+    def _subscribe_task(self, task: Task, requested_event_selector: _YieldType) -> Subscription:
+        # The task itself is the subscriber resuming the coroutine.
+        # The declarative selectors are hashable, so they have to be told apart from the events first.
+        if isinstance(requested_event_selector, (EventSet, TuplePattern, FieldPattern)):
+            return self.event_manager.multisubscribe(selector=requested_event_selector, subscriber=task)
         if isinstance(requested_event_selector, Event):
-            self.event_manager.subscribe(event=requested_event_selector, subscriber=resumer)
-        elif callable(requested_event_selector):
-            self.event_manager.multisubscribe(selector=requested_event_selector, subscriber=resumer)
+            return self.event_manager.subscribe(event=requested_event_selector, subscriber=task)
+        if callable(requested_event_selector):
+            return self.event_manager.multisubscribe(selector=requested_event_selector, subscriber=task)
+        assert isinstance(requested_event_selector, IterableABC)
+        events_set = EventSet(requested_event_selector)
+        return self.event_manager.multisubscribe(selector=events_set, subscriber=task)
+
+    def _cancel_wait(self, task: Task) -> None:
+        waiting = task._waiting
+        if waiting is not None:
+            # Reset first: a queue of parked tasks tells the cancelled ones by it.
+            task._waiting = None
+            waiting.unsubscribe()
+        if task._sleep is not None:
+            self._cancel_sleep(task)
+
+    def _cancel_sleep(self, task: Task) -> None:
+        sleep = task._sleep
+        task._sleep = None
+        if isinstance(sleep, Timer):
+            sleep.cancel()
         else:
-            assert isinstance(requested_event_selector, IterableABC)
-            events_set = set(requested_event_selector)
-            selector_function = lambda event: event in events_set
-            self.event_manager.multisubscribe(selector=selector_function, subscriber=resumer)
+            # The entry in the heap of delayed events is left there, just like the ones of the cancelled timers.
+            self._cancel_delayed_entry(task._bucket)
+
+    def _wake_sleeper(self, task: Task) -> None:
+        # Called when the delayed wake-up of a task is due. If the task has been waiting for an event
+        # as well, the event has lost the race.
+        task._sleep = None
+        if task._waiting is not None:
+            task._waiting.unsubscribe()
+            task._waiting = None
+        self._make_ready(task)
 
     @coroutine
-    def gather(self, coroutines: List[CoroutineType]) -> GeneratorType:
+    def gather(
+        self,
+        coroutines: List[CoroutineType],
+        priority: Optional[int] = None,
+    ) -> Generator[_YieldType, None, List[Any]]:
         """Create a coroutine that runs multiple coroutines in parallel.
 
         The coroutines will not be run at the same time in the strict sense since there is no
@@ -200,45 +979,204 @@ class CoroutineManager:
         resumed afterward is governed by the functions that are used for their suspension (e.g.
         `wait_for_event` or `sleep`). Consult their documentation for details.
 
+        The gathering coroutine is resumed exactly once, when the last of the coroutines completes,
+        so the cost of gathering is linear in the number of coroutines.
+
         Parameters:
             coroutines -- the list of coroutines to run in parallel.
+            priority   -- the priority to run them with (see `start`). If not given, they inherit the priority
+                          of the gathering coroutine (or get the default one if it is not run by this manager).
+
+        Returns the list of the values returned by the coroutines (in the same order as the coroutines
+        reside in the `coroutines` list).
 
-        Unless a coroutine raises an exception or there is a bug in the code, this method does
-        not raise any exceptions.
+        If any of the coroutines raises an exception, the gathering coroutine is resumed immediately,
+        and the first such exception is re-raised from it. The remaining coroutines are not stopped
+        and continue running on their own. An exception not derived from Exception (such as
+        `asyncio.CancelledError`) is propagated from the coroutine as well, just like if it was not
+        gathered. Otherwise, unless there is a bug in the code, this method
+        does not raise any exceptions.
         """
 
-        num_total = len(coroutines)
-        num_completed = 0
-        completion_events = [self.event_manager.unique_event() for i in range(num_total)]
+        if priority is None:
+            current_task = self._current_task
+            priority = current_task._priority if current_task is not None else 0
+        join = _Join(self.event_manager, len(coroutines))
+        for index, coro in enumerate(coroutines):
+            self.start(self._join_child(join, index, coro), priority)
 
-        def increase_completed(event: Event) -> None:
-            del event
-            nonlocal num_completed
-            num_completed += 1
+        # The coroutines are normally run after the current one suspends, but they might have
+        # already finished if `gather` was not called from a coroutine started by this manager.
+        if not join.finished:
+            yield join.event
 
-        for event in completion_events:
-            self.event_manager.subscribe(event=event, subscriber=increase_completed)
+        if join.exception is not None:
+            raise join.exception
+        return join.results
 
-        for coro, event in zip(coroutines, completion_events):
-            async def wrapped(coro: CoroutineType, completion_event: Event) -> None:
-                await coro
-                self.event_manager.raise_event(completion_event)
+    async def _join_child(self, join: _Join, index: int, coro: CoroutineType) -> None:
+        try:
+            result = await coro
+        except Exception as exception:
+            join.fail(exception)
+        except BaseException as exception:
+            # E.g. `asyncio.CancelledError` (see `AsyncioDriver.wait_for_future`). The gathering coroutine
+            # is resumed with it all the same, but it is not swallowed here.
+            join.fail(exception)
+            raise
+        else:
+            join.complete(index, result)
 
-            self.start(wrapped(coro, event))
+    def _handle_delayed_events(self) -> None:
+        if self._timing_wheel is not None:
+            expired = self._timing_wheel.advance(self._time_tracker.elapsed_time())
+            index = 0
+            try:
+                while index < len(expired):
+                    timer = expired[index]
+                    index += 1
+                    # An earlier event's subscriber might have cancelled it.
+                    if not timer._pending:
+                        continue
+                    timer._pending = False
+                    if isinstance(timer, _SleepTimer):
+                        self._wake_sleeper(timer.task)
+                    else:
+                        self.event_manager.raise_event(timer._event)
+            finally:
+                # If an event subscriber has raised an exception, put the rest back for the next time
+                # (they are due already, so they are handled first).
+                for timer in expired[index:]:
+                    if timer._pending:
+                        self._timing_wheel.schedule(timer)
+            return
 
-        while num_completed < num_total:
-            yield completion_events
+        delayed_events = self._delayed_events
+        now = self._time_tracker.elapsed_time()
+        while len(delayed_events) > 0 and delayed_events[0][0] <= now:
+            entry = heapq.heappop(delayed_events)           # Earliest delayed event, already due
+            target = entry[2]
+            if type(target) is Timer:
+                if not target._pending:                     # Skip it if it has been cancelled
+                    self._num_cancelled_delayed_events -= 1
+                    continue
+                target._pending = False
+                self.event_manager.raise_event(target._event)   # Otherwise, process it
+            elif type(target) is _TimerBucket:              # A batch of them: process them all
+                self._handle_timer_bucket(target)
+            elif cast(Task, target)._sleep == entry[1]:     # A sleeping task: it is ready to run now
+                self._wake_sleeper(cast(Task, target))
+            else:                                           # A cancelled sleep
+                self._num_cancelled_delayed_events -= 1
 
-    def _handle_delayed_events(self) -> None:
-        while len(self._delayed_events) > 0:
-            time_point, event = self._delayed_events[0]     # Earliest delayed event
-            if not time_point.has_passed():                 # Stop if the time for it still hasn't come
-                break
+    def _handle_timer_bucket(self, bucket: _TimerBucket) -> None:
+        # The bucket is unregistered first, so the delayed events added in the process (even the ones due
+        # at the same time) go to a new one.
+        del self._timer_buckets[bucket.deadline]
+        bucket.in_heap = False
+        entries = bucket.entries
+        self._num_bucketed_delayed_events -= len(entries)
+        # The entries cancelled so far are no longer in the heap, and the ones cancelled in the process
+        # are not counted at all (see `_cancel_delayed_entry`), so that compacting the heap in the meantime
+        # does not make the count go wrong.
+        self._num_cancelled_delayed_events -= len(entries) - bucket.num_pending
+        index = 0
+        try:
+            while index < len(entries):
+                entry = entries[index]
+                index += 1
+                if not _is_pending(entry):
+                    continue
+                target = entry[2]
+                if isinstance(target, Task):
+                    self._wake_sleeper(target)
+                    continue
+                target._pending = False
+                self.event_manager.raise_event(target._event)
+        finally:
+            if index < len(entries):
+                # An event subscriber has raised an exception, so keep the rest for the next time.
+                for entry in entries[index:]:
+                    if _is_pending(entry):
+                        self._add_to_timer_bucket(entry)
 
-            self.event_manager.raise_event(event)           # Otherwise, process it
-            heapq.heappop(self._delayed_events)             # Remove the processed event from the heap
+    def _drop_timer_bucket(self, bucket: _TimerBucket) -> None:
+        # Called when a bucket containing only the cancelled entries is taken from the top of the heap.
+        del self._timer_buckets[bucket.deadline]
+        bucket.in_heap = False
+        self._num_bucketed_delayed_events -= len(bucket.entries)
+        self._num_cancelled_delayed_events -= len(bucket.entries)
 
-    def add_delayed_event(self, delay: float, event: Event) -> None:
+    def _add_to_timer_bucket(self, entry: _BucketedEntry) -> None:
+        deadline = entry[0]
+        bucket = self._timer_buckets.get(deadline, None)
+        if bucket is None:
+            bucket = self._timer_buckets[deadline] = _TimerBucket(deadline)
+            heapq.heappush(self._delayed_events, (deadline, entry[1], bucket))
+        bucket.entries.append(entry)
+        bucket.num_pending += 1
+        entry[2]._bucket = bucket
+        self._num_bucketed_delayed_events += 1
+
+    def _schedule_sleeper(self, task: Task, duration: float, slack: Optional[float]) -> None:
+        if slack is None:
+            slack = self._timer_slack
+        deadline = self._time_tracker.elapsed_time() + duration
+        if slack:
+            deadline = _round_deadline(deadline, slack)
+        sequence = self._timer_counter
+        self._timer_counter += 1
+        if self._timing_wheel is not None:
+            timer = _SleepTimer(self._timing_wheel, task, deadline, sequence)
+            self._timing_wheel.schedule(timer)
+            task._sleep = timer
+        else:
+            # The exact deadlines equal to the one of a bucket go to the bucket too, to keep the FIFO order.
+            if slack or (len(self._timer_buckets) > 0 and deadline in self._timer_buckets):
+                self._add_to_timer_bucket((deadline, sequence, task))
+            else:
+                heapq.heappush(self._delayed_events, (deadline, sequence, task))
+                task._bucket = None
+            task._sleep = sequence
+        if self._wakeup_callback is not None:
+            self._wakeup_callback()
+
+    def _cancel_timer(self, timer: Timer) -> None:
+        self._cancel_delayed_entry(timer._bucket)
+
+    def _cancel_delayed_entry(self, bucket: Optional[_TimerBucket]) -> None:
+        if bucket is not None:
+            bucket.num_pending -= 1
+            if not bucket.in_heap:
+                # The bucket is being handled at the moment, and the entry is simply skipped.
+                return
+        self._count_cancelled_delayed_event()
+
+    def _count_cancelled_delayed_event(self) -> None:
+        # Cancelled timers (and sleeps) stay in the heap until they reach its top, but once they make up
+        # the majority of it, the heap is rebuilt without them.
+        self._num_cancelled_delayed_events += 1
+        delayed_events = self._delayed_events
+        num_delayed_events = len(delayed_events) + self._num_bucketed_delayed_events
+        if self._num_cancelled_delayed_events > max(num_delayed_events // 2, _MIN_CANCELLED_TO_COMPACT):
+            if self._num_bucketed_delayed_events > 0:
+                self._compact_timer_buckets()
+            delayed_events[:] = [entry for entry in delayed_events if _is_pending(entry)]
+            heapq.heapify(delayed_events)
+            self._num_cancelled_delayed_events = 0
+
+    def _compact_timer_buckets(self) -> None:
+        # The buckets left empty are unregistered (they are not pending, so they are dropped from the heap
+        # along with the other cancelled entries).
+        num_bucketed_delayed_events = 0
+        for bucket in self._timer_buckets.values():
+            bucket.entries[:] = [entry for entry in bucket.entries if _is_pending(entry)]
+            num_bucketed_delayed_events += len(bucket.entries)
+        self._num_bucketed_delayed_events = num_bucketed_delayed_events
+        for deadline in [deadline for deadline, bucket in self._timer_buckets.items() if len(bucket.entries) == 0]:
+            self._timer_buckets.pop(deadline).in_heap = False
+
+    def add_delayed_event(self, delay: float, event: Event, slack: Optional[float] = None) -> Timer:
         """Schedule an event to be raised after a specified amount of time.
 
         Mostly used internally, but in order to allow for greater flexibility, this method
@@ -247,9 +1185,43 @@ class CoroutineManager:
         Parameters:
             delay -- the amount of time (in seconds) after which the event will be raised.
             event -- the event to raise.
+            slack -- the amount of time (in seconds) the event may be raised late by. If not given,
+                     the default slack of the coroutine manager is used (see `__init__`).
+
+        Returns a Timer that can be used to cancel the delayed event. Cancelled events are discarded
+        lazily, but they never make up more than about a half of the heap of delayed events.
+
+        Delayed events which are due at the same time are raised in the order they were added in.
 
-        Unless there is a bug in the code or a hardware/system failure, this method does not
-        raise any exceptions.
+        If the slack is non-zero, the deadline is rounded up to a multiple of it, so that the delayed
+        events (and the sleeping coroutines) due around the same time share the same deadline. Unless
+        a timing wheel is used, the ones sharing a deadline are stored in a single entry of the heap,
+        which is much cheaper than a separate entry for each of them, and are handled in one go (still
+        in the order they were added in, along with the ones without a slack due at the same time).
+
+        Raises ValueError if `slack` is negative. Unless there is a bug in the code or a hardware/system
+        failure, this method does not raise other exceptions.
         """
 
-        heapq.heappush(self._delayed_events, (self._time_tracker.after(delay), event))
+        if slack is None:
+            slack = self._timer_slack
+        elif slack < 0:
+            raise ValueError('The timer slack must be non-negative')
+        deadline = self._time_tracker.elapsed_time() + delay
+        if slack:
+            deadline = _round_deadline(deadline, slack)
+        sequence = self._timer_counter
+        self._timer_counter += 1
+        if self._timing_wheel is not None:
+            timer = Timer(self._timing_wheel, event, deadline, sequence)
+            self._timing_wheel.schedule(timer)
+        else:
+            timer = Timer(self, event, deadline, sequence)
+            # The exact deadlines equal to the one of a bucket go to the bucket too, to keep the FIFO order.
+            if slack or (len(self._timer_buckets) > 0 and deadline in self._timer_buckets):
+                self._add_to_timer_bucket((deadline, sequence, timer))
+            else:
+                heapq.heappush(self._delayed_events, (deadline, sequence, timer))
+        if self._wakeup_callback is not None:
+            self._wakeup_callback()
+        return timer
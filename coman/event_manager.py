@@ -1,10 +1,13 @@
 """Module responsible for the event manager."""
 
-from coman.util import consume_deque
-
+import abc
+import itertools
 from collections import deque
 from dataclasses import dataclass
-from typing import Generic, TypeVar, Dict, Callable, Any, Protocol, Hashable, Tuple, List, Deque
+from typing import Generic, TypeVar, Dict, Callable, Any, Protocol, Hashable, Tuple, List, Deque, Iterable, FrozenSet, Optional, TYPE_CHECKING, cast
+
+if TYPE_CHECKING:
+    from coman.instrumentation import Instrumentation
 
 
 Event = Hashable
@@ -24,11 +27,291 @@ class EventSelector(Protocol):
         ...
 
 
-_Multisubscription = Tuple[EventSelector, Subscriber]
+class EventSet:
+    """An event selector matching the events from a finite set.
+
+    It behaves like any other `EventSelector` (i.e. `EventSet(events)(event)` is True if and only
+    if `event` is in `events`), but EventManager recognizes selectors of this type and indexes
+    the multisubscriptions using them by event. Raising an event then only touches the
+    multisubscriptions that actually wait for it instead of calling every selector in turn.
+    """
+
+    __slots__ = ('_events',)
+
+    def __init__(self, events: Iterable[Event]) -> None:
+        """Construct an EventSet from an iterable of events."""
+        self._events = frozenset(events)
+
+    def __repr__(self) -> str:
+        return f'EventSet({set(self._events)!r})'
+
+    def __call__(self, event: Event) -> bool:
+        return event in self._events
+
+    @property
+    def events(self) -> FrozenSet[Event]:
+        """Return the set of events matched by this selector."""
+        return self._events
+
+
+class Subscription(abc.ABC):
+    """A handle to a (multi)subscription, as returned by the subscribing methods of EventManager.
+
+    It can be used to cancel the (multi)subscription before the subscriber is called.
+    """
+
+    __slots__ = ('_event_manager', '_event', '_subscriber', '_active')
+
+    def __init__(self, event_manager: 'EventManager', event: Optional[Event], subscriber: Subscriber) -> None:
+        """Construct a Subscription. Should not be called explicitly.
+
+        Use `EventManager.subscribe`, `EventManager.subscribe_persistent` or `EventManager.multisubscribe`
+        to create subscriptions.
+        """
+
+        self._event_manager = event_manager
+        self._event = event
+        self._subscriber = subscriber
+        self._active = True
+
+    def __repr__(self) -> str:
+        return f'Subscription(event={self._event!r}, active={self._active})'
+
+    @property
+    def event(self) -> Optional[Event]:
+        """Return the event the subscription is for (None for a multisubscription)."""
+        return self._event
+
+    @property
+    def active(self) -> bool:
+        """Return True if the subscription has neither been cancelled nor (for a one-shot one) fired yet."""
+        return self._active
+
+    def unsubscribe(self) -> bool:
+        """Cancel the subscription, so that the subscriber will not be called anymore.
+
+        It takes effect immediately, even if the event is being raised at the moment. Takes constant
+        time (except for the multisubscriptions using an `EventSet` selector, which are removed from
+        the entry of each of its events).
+
+        Returns True if the subscription was active and False if it has already been cancelled or
+        fired (in which case nothing is done).
+        """
+
+        if not self._active:
+            return False
+        self._active = False
+        self._detach()
+        return True
+
+    @abc.abstractmethod
+    def _detach(self) -> None:
+        # Remove the cancelled subscription from wherever the event manager keeps it.
+        ...
+
+
+class _OneShotSubscription(Subscription):
+    __slots__ = ()
+
+    def _detach(self) -> None:
+        self._event_manager._remove_subscription(self)
+
+
+_SubscriptionT = TypeVar('_SubscriptionT', bound=Subscription)
+
+
+def _active_subscriptions(
+    subscriptions: Dict[_SubscriptionT, None],
+    new_subscriptions: Optional[Dict[_SubscriptionT, None]],
+) -> Dict[_SubscriptionT, None]:
+    # The subscriptions which have been taken away to be called but have not been called (or cancelled),
+    # followed by the ones which have been created in the meantime.
+    remaining = {subscription: None for subscription in subscriptions if subscription._active}
+    if new_subscriptions is not None:
+        remaining.update(new_subscriptions)
+    return remaining
+
+
+class _PersistentSubscription(Subscription):
+    __slots__ = ()
+
+    def _detach(self) -> None:
+        self._event_manager._remove_persistent_subscription(self)
+
+
+class _ScannedMultisubscription(Subscription):
+    # A multisubscription with an opaque selector, stored in the group of the multisubscriptions
+    # sharing the selector (see `_SelectorGroup`).
+
+    __slots__ = ('group',)
+
+    def __init__(self, event_manager: 'EventManager', group: '_SelectorGroup', subscriber: Subscriber) -> None:
+        super().__init__(event_manager, None, subscriber)
+        self.group = group
+
+    def _detach(self) -> None:
+        self._event_manager._remove_scanned_multisubscription(self)
+
+
+class _SelectorGroup:
+    # The multisubscriptions with the same opaque selector (or with the same key declared by the
+    # caller of `multisubscribe`). The selector is called once per event for the whole group, and
+    # if it matches, all the subscribers in the group are called.
+
+    __slots__ = ('key', 'selector', 'subscriptions')
+
+    def __init__(self, key: Hashable, selector: EventSelector) -> None:
+        self.key = key
+        self.selector = selector
+        self.subscriptions: Dict[_ScannedMultisubscription, None] = {}
+
 
+# Used in place of the group key for the unhashable selectors, which are then grouped by identity.
+_UNHASHABLE = object()
 
-def _call_subscriber(subscriber: Subscriber, event: Event) -> None:
-    subscriber(event)
+
+def _selector_key(selector: EventSelector) -> Hashable:
+    # The key the multisubscriptions with an opaque selector are grouped by when no key is declared.
+    try:
+        hash(selector)
+    except TypeError:
+        return (_UNHASHABLE, id(selector))
+    return cast(Hashable, selector)
+
+
+class _Any:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return 'ANY'
+
+
+ANY: Any = _Any()
+"""A wildcard for `TuplePattern` matching any element."""
+
+# The signature of a pattern: the positions (for a TuplePattern) or the names (for a FieldPattern)
+# of the fields it constrains, along with the minimum length of the tuples it matches (0 for
+# a FieldPattern). The patterns with the same signature are indexed together by their field values.
+_PatternSignature = Tuple[Tuple[Any, ...], int]
+_PatternKey = Tuple[Hashable, ...]
+
+# Returned by `getattr` when a FieldPattern is matched against an event lacking the field.
+_MISSING = object()
+
+
+class TuplePattern:
+    """An event selector matching the tuple events starting with the given elements.
+
+    For example, `TuplePattern('unit_died', ANY, 3)` matches `('unit_died', 'archer', 3)` and
+    `('unit_died', 'knight', 3, 'poisoned')`, but not `('unit_died', 'archer', 2)` or `('unit_died',)`.
+    `ANY` matches any element. Instances of the subclasses of `tuple` (e.g. named tuples) are matched
+    too.
+
+    It behaves like any other `EventSelector`, but EventManager recognizes selectors of this type
+    and indexes the multisubscriptions using them by the values of the constrained elements. Raising
+    an event then costs a single dictionary lookup per distinct combination of constrained positions
+    (and the minimum length) rather than a call to every selector.
+    """
+
+    __slots__ = ('_elements', '_signature', '_key')
+
+    def __init__(self, *elements: Hashable) -> None:
+        """Construct a TuplePattern from the expected leading elements (`ANY` for a wildcard)."""
+        self._elements = elements
+        positions = tuple(position for position, element in enumerate(elements) if element is not ANY)
+        self._signature: _PatternSignature = (positions, len(elements))
+        self._key: _PatternKey = tuple(elements[position] for position in positions)
+
+    def __repr__(self) -> str:
+        return f'TuplePattern{self._elements!r}'
+
+    def __call__(self, event: Event) -> bool:
+        return isinstance(event, tuple) and _extract_tuple_key(self._signature, event) == self._key
+
+
+class FieldPattern:
+    """An event selector matching the events of a given type with the given attribute values.
+
+    For example, `FieldPattern(UnitDied, team=3)` matches `UnitDied(unit='archer', team=3)`,
+    where `UnitDied` is, say, a frozen dataclass. The type of the event must be exactly `event_type`
+    (not a subclass of it).
+
+    It behaves like any other `EventSelector`, but EventManager recognizes selectors of this type
+    and indexes the multisubscriptions using them by the values of the constrained attributes. Raising
+    an event then costs a single dictionary lookup per distinct set of constrained attributes of
+    its type rather than a call to every selector.
+    """
+
+    __slots__ = ('_event_type', '_signature', '_key')
+
+    def __init__(self, event_type: type, **fields: Hashable) -> None:
+        """Construct a FieldPattern.
+
+        Parameters:
+            event_type -- the type of the matched events.
+            fields     -- the expected values of the attributes of the matched events.
+        """
+
+        self._event_type = event_type
+        names = tuple(sorted(fields))
+        self._signature: _PatternSignature = (names, 0)
+        self._key: _PatternKey = tuple(fields[name] for name in names)
+
+    def __repr__(self) -> str:
+        fields = ''.join(f', {name}={value!r}' for name, value in zip(self._signature[0], self._key))
+        return f'FieldPattern({self._event_type.__qualname__}{fields})'
+
+    def __call__(self, event: Event) -> bool:
+        return type(event) is self._event_type and _extract_field_key(self._signature, event) == self._key
+
+
+def _extract_tuple_key(signature: _PatternSignature, event: Tuple[Any, ...]) -> Optional[_PatternKey]:
+    positions, length = signature
+    if len(event) < length:
+        return None
+    return tuple(event[position] for position in positions)
+
+
+def _extract_field_key(signature: _PatternSignature, event: Event) -> Optional[_PatternKey]:
+    key = tuple(getattr(event, name, _MISSING) for name in signature[0])
+    return None if _MISSING in key else key
+
+
+class _IndexedMultisubscription(Subscription):
+    # A multisubscription whose selector is an EventSet. The same object is stored in the index
+    # entry of every event from the set; it becomes inactive once it has been called, so that
+    # the remaining index entries can be told apart from the live ones.
+
+    __slots__ = ('events',)
+
+    def __init__(self, event_manager: 'EventManager', events: FrozenSet[Event], subscriber: Subscriber) -> None:
+        super().__init__(event_manager, None, subscriber)
+        self.events = events
+
+    def _detach(self) -> None:
+        self._event_manager._unindex_multisubscription(self)
+
+
+class _PatternMultisubscription(Subscription):
+    # A multisubscription whose selector is a TuplePattern or a FieldPattern.
+
+    __slots__ = ('event_type', 'signature', 'key')
+
+    def __init__(
+        self,
+        event_manager: 'EventManager',
+        event_type: type,
+        signature: _PatternSignature,
+        key: _PatternKey,
+        subscriber: Subscriber,
+    ) -> None:
+        super().__init__(event_manager, None, subscriber)
+        self.event_type = event_type
+        self.signature = signature
+        self.key = key
+
+    def _detach(self) -> None:
+        self._event_manager._unindex_pattern_multisubscription(self)
 
 
 class UniqueEvent:
@@ -37,6 +320,8 @@ class UniqueEvent:
     However, a UniqueEvent may equal some other UniqueEvent created by other EventManager than
     the creator of this one."""
 
+    __slots__ = ('_nonce', '_hash')
+
     def __init__(self, nonce: int) -> None:
         """Construct a UniqueEvent with a specified nonce.
 
@@ -47,17 +332,19 @@ class UniqueEvent:
         to construct instances of UniqueEvent.
         """
         self._nonce = nonce
+        # This 64-bit pseudorandom number is to distinguish between
+        # `hash(UniqueEvent(nonce))` and `hash(('UniqueEvent', nonce))`.
+        # The hash is computed once since unique events are mostly used as dictionary keys.
+        self._hash = hash(('UniqueEvent', nonce)) ^ 0x67B59A64ECBF4986
 
     def __repr__(self) -> str:
         return f'UniqueEvent({self._nonce})'
 
     def __eq__(self, other: object) -> bool:
-        return isinstance(other, UniqueEvent) and self._nonce == other._nonce
+        return self is other or (isinstance(other, UniqueEvent) and self._nonce == other._nonce)
 
     def __hash__(self) -> int:
-        # This 64-bit pseudorandom number is to distinguish between
-        # `hash(UniqueEvent(nonce))` and `hash(('UniqueEvent', nonce))`
-        return hash(('UniqueEvent', self._nonce)) ^ 0x67B59A64ECBF4986
+        return self._hash
 
 
 class EventManager:
@@ -75,8 +362,8 @@ class EventManager:
 
     (2) Raise an event. This operation calls all the subscribers for a specific event and
         removes them from the subscription list. If it is necessary to handle an event repeatedly,
-        one can re-subscribe for this event every time when the subscriber is called,
-        but it is one-shot subscribtion that is desired most commonly.
+        one can use a persistent subscription (see `subscribe_persistent`), but it is one-shot
+        subscribtion that is desired most commonly.
 
     For more information, see the methods' documentation.
     """
@@ -91,11 +378,50 @@ class EventManager:
         the functionality of EventManager and not CoroutineManager.
         """
 
-        self._subscriptions: Dict[Event, Deque[Subscriber]] = {}
-        self._multisubscriptions: List[_Multisubscription] = []
+        # Dictionaries are used as ordered sets so that the subscriptions can be cancelled in constant time.
+        self._subscriptions: Dict[Event, Dict[_OneShotSubscription, None]] = {}
+        # The persistent subscriptions are dispatched by iterating over a tuple snapshot, which is not
+        # disturbed by the subscribers (un)subscribing in the process. The snapshot of an event is dropped
+        # whenever its subscriptions change and is taken again the next time the event is raised.
+        self._persistent_subscriptions: Dict[Event, Dict[_PersistentSubscription, None]] = {}
+        self._persistent_snapshots: Dict[Event, Tuple[_PersistentSubscription, ...]] = {}
+        # The multisubscriptions with opaque selectors, grouped by the selector (or by the key declared
+        # in `multisubscribe`) so that each selector is called once per event however many coroutines
+        # wait on it.
+        self._multisubscriptions: Dict[Hashable, _SelectorGroup] = {}
+        self._indexed_multisubscriptions: Dict[Event, Dict[_IndexedMultisubscription, None]] = {}
+        # The multisubscriptions using TuplePattern and FieldPattern selectors, indexed by the type
+        # of the matched events (`tuple` for TuplePattern), then by the signature of the pattern, then
+        # by the values of the constrained fields.
+        self._pattern_multisubscriptions: Dict[
+            type,
+            Dict[_PatternSignature, Dict[_PatternKey, Dict[_PatternMultisubscription, None]]],
+        ] = {}
         self._counter = 0
+        # The registry of the interned events (see `intern`). The one-shot subscriptions to the interned
+        # events are stored in a table indexed by their IDs rather than in `self._subscriptions`.
+        self._event_ids: Dict[Event, int] = {}
+        self._events_by_id: List[Event] = []
+        self._id_subscriptions: List[Optional[Dict[_OneShotSubscription, None]]] = []
+        # The groups of multisubscriptions taken away by `raise_events` (the ones matched by the following
+        # events of the batch and the ones matched by none) while the other subscribers of an event are called
+        # (or the coroutines woken up by it are resumed). They are given back if one of those subscribers
+        # (or coroutines) raises another event (see `_unpark_groups`).
+        self._parked_groups: Optional[Tuple[Dict[int, List[_SelectorGroup]], List[_SelectorGroup]]] = None
+        # The payload of the event being raised at the moment (see `raise_event`).
+        self._payload: Any = None
+        # The number of the events being raised at the moment (more than one if the subscribers raise events),
+        # and the function to call once an event raised from outside of any subscriber has been dispatched.
+        # The latter is set by CoroutineManager to resume the coroutines woken up by the event in the order
+        # of their priorities rather than one by one from their subscribers.
+        self._dispatch_depth = 0
+        self._dispatch_callback: Optional[Callable[[], None]] = None
+        # Appending to and popping from a deque are atomic, so no locks are needed to let
+        # any number of threads post events while the owning thread raises them.
+        self._posted_events: Deque[Event] = deque()
+        self._post_callback: Optional[Callable[[], None]] = None
 
-    def subscribe(self, event: Event, subscriber: Subscriber) -> None:
+    def subscribe(self, event: Event, subscriber: Subscriber) -> Subscription:
         """Subscribe to a single event.
 
         `subscriber` will be called when the event `event` is raised. The subscription acts
@@ -109,12 +435,130 @@ class EventManager:
             event      -- the event to subscribe to.
             subscriber -- the function or callable object to call when `event` is raised.
 
+        Returns the handle that can be used to cancel the subscription.
+
         Unless there is a bug, thit method does not throw exceptions.
         """
 
-        self._subscriptions.setdefault(event, deque()).append(subscriber)
+        subscription = _OneShotSubscription(self, event, subscriber)
+        if len(self._event_ids) > 0:
+            event_id = self._event_ids.get(event, None)
+            if event_id is not None:
+                self._add_id_subscription(event_id, subscription)
+                return subscription
+        self._subscriptions.setdefault(event, {})[subscription] = None
+        return subscription
+
+    def intern(self, event: Event) -> int:
+        """Return the ID of an event, assigning it if the event has not been interned yet.
+
+        The IDs are small non-negative integers, assigned densely in the order the events are interned
+        in. They can be used with `subscribe_id` and `raise_id`, which do not hash the event and index
+        a table instead of probing a dictionary. An interned event stays interned (and keeps its ID) for
+        the lifetime of the event manager, and its ID is never freed, so only the events raised over and over
+        are worth interning (unlike, for example, the unique events, which are normally raised once).
+
+        Once an event has been interned, `subscribe` and `raise_event` keep working for it as before and
+        are interchangeable with their ID-based counterparts, e.g. `subscribe_id(intern(event), ...)`
+        subscribes to the event raised by `raise_event(event)`.
+
+        Unless there is a system/hardware failure, this method does not raise exceptions.
+        """
+
+        event_id = self._event_ids.get(event, None)
+        if event_id is None:
+            event_id = len(self._events_by_id)
+            self._event_ids[event] = event_id
+            self._events_by_id.append(event)
+            # Move the existing subscriptions to the table.
+            self._id_subscriptions.append(self._subscriptions.pop(event, None))
+        return event_id
+
+    def event_of(self, event_id: int) -> Event:
+        """Return the interned event with a given ID.
+
+        Raises IndexError if there is no such event.
+        """
+
+        return self._events_by_id[event_id]
+
+    def subscribe_id(self, event_id: int, subscriber: Subscriber) -> Subscription:
+        """Subscribe to a single interned event given its ID.
+
+        Works just like `subscribe`, but does not hash the event.
+
+        Parameters:
+            event_id   -- the ID of the event to subscribe to, as returned by `intern`.
+            subscriber -- the function or callable object to call when the event is raised.
+
+        Returns the handle that can be used to cancel the subscription.
+
+        Raises IndexError if there is no interned event with the given ID.
+        """
+
+        subscription = _OneShotSubscription(self, self._events_by_id[event_id], subscriber)
+        self._add_id_subscription(event_id, subscription)
+        return subscription
 
-    def multisubscribe(self, selector: EventSelector, subscriber: Subscriber) -> None:
+    def _add_id_subscription(self, event_id: int, subscription: _OneShotSubscription) -> None:
+        subscriptions = self._id_subscriptions[event_id]
+        if subscriptions is None:
+            subscriptions = self._id_subscriptions[event_id] = {}
+        subscriptions[subscription] = None
+
+    def _remove_subscription(self, subscription: _OneShotSubscription) -> None:
+        # The subscriptions being called at the moment have already been taken out of the dictionary,
+        # in which case there is nothing to remove.
+        event = subscription._event
+        event_id = self._event_ids.get(event, None) if len(self._event_ids) > 0 else None
+        if event_id is not None:
+            id_subscriptions = self._id_subscriptions[event_id]
+            if id_subscriptions is not None:
+                id_subscriptions.pop(subscription, None)
+                if len(id_subscriptions) == 0:
+                    self._id_subscriptions[event_id] = None
+            return
+        subscriptions = self._subscriptions.get(event, None)
+        if subscriptions is not None:
+            subscriptions.pop(subscription, None)
+            if len(subscriptions) == 0:
+                del self._subscriptions[event]
+
+    def subscribe_persistent(self, event: Event, subscriber: Subscriber) -> Subscription:
+        """Subscribe to every occurrence of a single event.
+
+        Unlike with `subscribe`, the subscription is not cancelled after `subscriber` has been called:
+        it is called each time `event` is raised until the subscription is cancelled with
+        `Subscription.unsubscribe`. This is cheaper than resubscribing from the subscriber every time.
+
+        Parameters:
+            event      -- the event to subscribe to.
+            subscriber -- the function or callable object to call when `event` is raised.
+
+        Returns the handle that can be used to cancel the subscription.
+
+        Unless there is a bug, this method does not throw exceptions.
+        """
+
+        subscription = _PersistentSubscription(self, event, subscriber)
+        self._persistent_subscriptions.setdefault(event, {})[subscription] = None
+        self._persistent_snapshots.pop(event, None)
+        return subscription
+
+    def _remove_persistent_subscription(self, subscription: _PersistentSubscription) -> None:
+        event = subscription._event
+        subscriptions = self._persistent_subscriptions[event]
+        del subscriptions[subscription]
+        if len(subscriptions) == 0:
+            del self._persistent_subscriptions[event]
+        self._persistent_snapshots.pop(event, None)
+
+    def multisubscribe(
+        self,
+        selector: EventSelector,
+        subscriber: Subscriber,
+        key: Optional[Hashable] = None,
+    ) -> Subscription:
         """Subscribe to multiple events.
 
         `subscriber` will be called when any event such that `selector(event) == True` is raised.
@@ -127,21 +571,99 @@ class EventManager:
         to handle each of them exactly once. If it is your case, you should call `subscribe`
         for each event in this set instead of using `multisubscribe`.
 
+        If `selector` is an `EventSet`, the multisubscription is indexed by each of its events, so
+        it costs nothing when unrelated events are raised. Likewise, the multisubscriptions using
+        `TuplePattern` and `FieldPattern` selectors are indexed by the values they expect. Other selectors
+        are opaque and have to be called on every raised event, so prefer the declarative ones whenever
+        possible.
+
+        The multisubscriptions with the same opaque selector (i.e. an equal one, which for functions means
+        the same function object) are grouped together: the selector is called once per raised event for
+        the whole group, and if it matches, all the subscribers in the group are called. A group can also
+        be formed by the multisubscriptions declaring the same `key`, in which case their selectors are
+        assumed to be equivalent and only one of them is called.
+
         See the class documentation for more information.
 
         Parameters:
             selector   -- a function that takes an event and returns True if `subscriber` should
                           handle this event and False otherwise.
             subscriber -- a function to be called when a matching event is raised.
+            key        -- an optional hashable value identifying the selector, used instead of the selector
+                          itself to group the multisubscriptions. Ignored for the declarative selectors.
+                          The multisubscriptions with an unhashable selector and no key are not grouped.
 
-        Unless there is a system/hardware failure (such as a memory allocation error), this method
-        does not raise any exceptions.
+        Returns the handle that can be used to cancel the multisubscription.
+
+        Raises TypeError if `key` is given for an opaque selector and is not hashable.
         """
 
-        self._multisubscriptions.append((selector, subscriber))
+        if isinstance(selector, EventSet):
+            return self._index_multisubscription(selector.events, subscriber)
+        if isinstance(selector, TuplePattern):
+            return self._index_pattern_multisubscription(
+                _PatternMultisubscription(self, tuple, selector._signature, selector._key, subscriber),
+            )
+        if isinstance(selector, FieldPattern):
+            return self._index_pattern_multisubscription(
+                _PatternMultisubscription(self, selector._event_type, selector._signature, selector._key, subscriber),
+            )
+        group_key = _selector_key(selector) if key is None else key
+        group = self._multisubscriptions.get(group_key, None)
+        if group is None:
+            group = self._multisubscriptions[group_key] = _SelectorGroup(group_key, selector)
+        multisubscription = _ScannedMultisubscription(self, group, subscriber)
+        group.subscriptions[multisubscription] = None
+        return multisubscription
+
+    def _remove_scanned_multisubscription(self, multisubscription: _ScannedMultisubscription) -> None:
+        group = multisubscription.group
+        group.subscriptions.pop(multisubscription, None)
+        # While the multisubscriptions are being scanned, the groups are not in `self._multisubscriptions`,
+        # and the empty ones are dropped afterwards.
+        if len(group.subscriptions) == 0 and self._multisubscriptions.get(group.key, None) is group:
+            del self._multisubscriptions[group.key]
+
+    def _index_pattern_multisubscription(self, multisubscription: _PatternMultisubscription) -> Subscription:
+        by_signature = self._pattern_multisubscriptions.setdefault(multisubscription.event_type, {})
+        by_key = by_signature.setdefault(multisubscription.signature, {})
+        by_key.setdefault(multisubscription.key, {})[multisubscription] = None
+        return multisubscription
 
-    def raise_event(self, event: Event) -> None:
-        """Raise an event.
+    def _unindex_pattern_multisubscription(self, multisubscription: _PatternMultisubscription) -> None:
+        by_signature = self._pattern_multisubscriptions.get(multisubscription.event_type, None)
+        if by_signature is None:
+            return
+        by_key = by_signature.get(multisubscription.signature, None)
+        if by_key is None:
+            return
+        multisubscriptions = by_key.get(multisubscription.key, None)
+        if multisubscriptions is None:
+            return
+        multisubscriptions.pop(multisubscription, None)
+        if len(multisubscriptions) == 0:
+            del by_key[multisubscription.key]
+            if len(by_key) == 0:
+                del by_signature[multisubscription.signature]
+                if len(by_signature) == 0:
+                    del self._pattern_multisubscriptions[multisubscription.event_type]
+
+    def _index_multisubscription(self, events: FrozenSet[Event], subscriber: Subscriber) -> Subscription:
+        multisubscription = _IndexedMultisubscription(self, events, subscriber)
+        for event in events:
+            self._indexed_multisubscriptions.setdefault(event, {})[multisubscription] = None
+        return multisubscription
+
+    def _unindex_multisubscription(self, multisubscription: _IndexedMultisubscription) -> None:
+        for event in multisubscription.events:
+            multisubscriptions = self._indexed_multisubscriptions.get(event, None)
+            if multisubscriptions is not None:
+                multisubscriptions.pop(multisubscription, None)
+                if len(multisubscriptions) == 0:
+                    del self._indexed_multisubscriptions[event]
+
+    def raise_event(self, event: Event, payload: Any = None) -> None:
+        """Raise an event, optionally carrying a payload.
 
         All subscribers for this event are called and deleted from the subscription list.
         All multisubscribers whose `selector`s (see `multisubscribe`'s docs) return True on
@@ -150,66 +672,519 @@ class EventManager:
         and should not be relied on (even though the current implementation may give some guarantees
         about this order, we retain the possibility to change it).
 
+        The (multi)subscribers can get the payload from `payload` while they are being called. The coroutines
+        waiting for the event get it as the result of the wait (see `CoroutineManager.wait_for_event`).
+
         See the class documentation for more information.
 
         Parameters:
-            event -- the event to raise.
+            event   -- the event to raise.
+            payload -- arbitrary data to deliver along with the event.
 
         Unless a (multi)subscriber that is called raises an exception, there is a bug in the code
         or there is a system/hardware failure, this method does not raise exceptions.
         """
 
-        # TODO: maybe refactor this function.
+        if self._parked_groups is not None:
+            self._unpark_groups()
+        # The subscribers may raise other events, hence the payload is restored afterwards.
+        previous_payload = self._payload
+        self._payload = payload
+        self._dispatch_depth += 1
+        try:
+            self._call_subscribers(event)
+            self._call_persistent_subscribers(event)
+            self._call_indexed_multisubscribers(event)
+            if len(self._pattern_multisubscriptions) > 0:
+                self._call_pattern_multisubscribers(event)
+            # The other multisubscriptions have selectors that have to be called one by one.
+            if len(self._multisubscriptions) > 0:
+                self._call_multisubscribers(event)
+        finally:
+            self._payload = previous_payload
+            self._dispatch_depth -= 1
+        if self._dispatch_depth == 0 and self._dispatch_callback is not None:
+            self._dispatch_callback()
 
-        # Deal with ordinary subscriptions.
+    def raise_id(self, event_id: int, payload: Any = None) -> None:
+        """Raise an interned event given its ID, optionally carrying a payload.
 
-        # Get the subscribers for the event in question.
-        subscribers = self._subscriptions.get(event, None)
-        # If there is no, do nothing here.
-        if subscribers is not None:
-            # Otherwise, delete all the subscribers existing at the current moment, calling each
-            # of them in the process. That is, each subscriber for this event is called and then deleted.
-            # If any of them cause new subscriptions for this event to appear, the new subscribers
-            # will not be deleted or called: only they (if any) will remain in the `subscribers` deque.
-            consume_deque(subscribers, (lambda sub: _call_subscriber(sub, event)), consume_new_elements=False)
-            # After this, delete the entry of the `self._subscriptions` dictionary if it became empty.
-            if len(subscribers) == 0:
-                del self._subscriptions[event]
+        Works just like `raise_event`, but does not hash the event unless there are subscriptions
+        that need it (persistent subscriptions or multisubscriptions of any kind).
+
+        Parameters:
+            event_id -- the ID of the event to raise, as returned by `intern`.
+            payload  -- arbitrary data to deliver along with the event.
+
+        Raises IndexError if there is no interned event with the given ID. Otherwise, unless
+        a (multi)subscriber that is called raises an exception, this method does not raise exceptions.
+        """
+
+        event = self._events_by_id[event_id]
+        if self._parked_groups is not None:
+            self._unpark_groups()
+        previous_payload = self._payload
+        self._payload = payload
+        self._dispatch_depth += 1
+        try:
+            self._call_id_subscribers(event_id, event)
+            if len(self._persistent_subscriptions) > 0:
+                self._call_persistent_subscribers(event)
+            if len(self._indexed_multisubscriptions) > 0:
+                self._call_indexed_multisubscribers(event)
+            if len(self._pattern_multisubscriptions) > 0:
+                self._call_pattern_multisubscribers(event)
+            if len(self._multisubscriptions) > 0:
+                self._call_multisubscribers(event)
+        finally:
+            self._payload = previous_payload
+            self._dispatch_depth -= 1
+        if self._dispatch_depth == 0 and self._dispatch_callback is not None:
+            self._dispatch_callback()
+
+    @property
+    def payload(self) -> Any:
+        """Return the payload of the event being raised at the moment (see `raise_event`).
+
+        Only meaningful when called from a (multi)subscriber. The events raised by `raise_events`
+        (including the posted ones) carry no payload.
+        """
+
+        return self._payload
+
+    def raise_events(self, events: Iterable[Event]) -> None:
+        """Raise several events, one after another.
+
+        The outcome is the same as if `raise_event` was called for each event in turn (including
+        the subscriptions made by the (multi)subscribers being considered for the following events),
+        but the whole batch is dispatched in a single pass over the multisubscriptions: the selector
+        of each group of multisubscriptions (see `multisubscribe`) is called at most once per event
+        and no more after it has matched one of them (unless a subscriber raises another event, in which
+        case the selectors are called again from the event being handled on). Therefore, the selectors
+        should not depend on any state that the subscribers called in the process may change.
+
+        Parameters:
+            events -- the events to raise, in order.
+
+        Unless a (multi)subscriber that is called raises an exception, there is a bug in the code
+        or there is a system/hardware failure, this method does not raise exceptions.
+        """
+
+        self._raise_batch(list(events))
+
+    def _raise_batch(self, events: List[Event], num_started: Optional[List[int]] = None) -> None:
+        # If `num_started` is given, its only item is kept equal to the number of events whose dispatch
+        # has started, so that the caller knows which ones have not been raised if an exception is raised.
+        if self._parked_groups is not None:
+            self._unpark_groups()
+        previous_payload = self._payload
+        self._payload = None
+        self._dispatch_depth += 1
+        try:
+            self._raise_events(events, num_started)
+        finally:
+            self._payload = previous_payload
+            self._dispatch_depth -= 1
+
+    def _raise_events(self, events: List[Event], num_started: Optional[List[int]]) -> None:
+
+        # Groups of multisubscriptions (the ones that have to be scanned) matched by the event at each index.
+        matched_groups: Dict[int, List[_SelectorGroup]] = {}
+        # The ones that have been checked against all the events in the batch but did not match.
+        remaining_groups: List[_SelectorGroup] = []
+        # The ones being checked at the moment.
+        new_groups: Dict[Hashable, _SelectorGroup] = {}
+
+        try:
+            for index, event in enumerate(events):
+                if num_started is not None:
+                    num_started[0] = index + 1
+                # If the subscribers called next raise another event, the groups which have been taken away
+                # have to be considered for it, just like they would be if the events were raised one by one.
+                if len(remaining_groups) > 0 or len(matched_groups) > 0:
+                    self._parked_groups = (matched_groups, remaining_groups)
+                self._call_subscribers(event)
+                self._call_persistent_subscribers(event)
+                self._call_indexed_multisubscribers(event)
+                if len(self._pattern_multisubscriptions) > 0:
+                    self._call_pattern_multisubscribers(event)
+                self._parked_groups = None
+
+                # The groups that have not been considered yet (i.e. the ones existing before the call if it
+                # is the first event, and the ones created since the previous event was considered otherwise)
+                # are matched against this and the following events, stopping at the first match.
+                if len(self._multisubscriptions) > 0:
+                    new_groups = self._multisubscriptions
+                    self._multisubscriptions = {}
+                    for group in new_groups.values():
+                        if len(group.subscriptions) == 0:
+                            continue
+                        selector = group.selector
+                        for matching_index in range(index, len(events)):
+                            if selector(events[matching_index]):
+                                matched_groups.setdefault(matching_index, []).append(group)
+                                break
+                        else:
+                            remaining_groups.append(group)
+                    new_groups = {}
+
+                # Removed afterwards, so that the groups are not lost if a subscriber raises an exception.
+                for group in matched_groups.get(index, ()):
+                    self._call_group(group, event)
+                matched_groups.pop(index, None)
+
+                # Just like after `raise_event`, let the coroutines woken up by the event run before the next
+                # one is raised. They may raise events as well, hence the groups are parked again.
+                if self._dispatch_depth == 1 and self._dispatch_callback is not None:
+                    if len(remaining_groups) > 0 or len(matched_groups) > 0:
+                        self._parked_groups = (matched_groups, remaining_groups)
+                    self._dispatch_callback()
+                    self._parked_groups = None
+        finally:
+            self._parked_groups = None
+            # Just like in `_call_multisubscribers`, keep the groups that did not match and the ones
+            # created while handling the last event. If a selector or a subscriber has raised an exception,
+            # the groups that have not been called or checked yet are kept too (the ones which have been
+            # called are empty and are dropped, and the ones which have been checked already are listed
+            # twice, which is harmless).
+            for groups in matched_groups.values():
+                remaining_groups.extend(groups)
+            remaining_groups.extend(new_groups.values())
+            self._merge_groups(remaining_groups)
+
+    def _unpark_groups(self) -> None:
+        # Give the groups taken away by `raise_events` back to `self._multisubscriptions`. The batch then
+        # considers them anew (along with the groups created in the meantime) from the current event on.
+        parked_groups = self._parked_groups
+        assert parked_groups is not None
+        self._parked_groups = None
+        matched_groups, remaining_groups = parked_groups
+        groups = remaining_groups[:]
+        for matched in matched_groups.values():
+            groups.extend(matched)
+        matched_groups.clear()
+        remaining_groups.clear()
+        self._merge_groups(groups)
+
+    def post_event(self, event: Event) -> None:
+        """Post an event to be raised later by the thread owning the event manager.
+
+        Unlike the other methods of EventManager, this one can be called from any thread. The event
+        is merely put into an inbox, and no subscribers are called. The posted events are raised
+        (in the order they were posted in) by `raise_posted_events`, which is called by
+        `CoroutineManager.update` if the event manager belongs to a coroutine manager.
+
+        Parameters:
+            event -- the event to post.
+
+        Unless the post callback (see `set_post_callback`) raises an exception, this method does not
+        raise exceptions.
+        """
+
+        self._posted_events.append(event)
+        callback = self._post_callback
+        if callback is not None:
+            callback()
 
-        # Now deal with multisubscriptions. TODO: maybe put this into a separate function?
+    def raise_posted_events(self) -> int:
+        """Raise the events posted with `post_event` so far.
 
-        # A snapshot of currently existing multisubscriptions. The iteration will be done over this
-        # copy so that new multisubscriptions that may appear during the iteration will not interfere
+        The events are raised as a batch (see `raise_events`). Events posted while this method is running
+        are left for the next call, and so are the ones not raised yet if a subscriber raises an exception.
+        Must be called from the thread owning the event manager.
+
+        Returns the number of the events raised.
+
+        Unless a (multi)subscriber that is called raises an exception, this method does not raise exceptions.
+        """
+
+        posted_events = self._posted_events
+        num_events = len(posted_events)
+        if num_events == 0:
+            return 0
+        events = [posted_events.popleft() for _ in range(num_events)]
+        num_started = [0]
+        try:
+            self._raise_batch(events, num_started)
+        finally:
+            # If a subscriber has raised an exception, the events that have not been raised yet are
+            # put back in front of the ones posted in the meantime, to be raised by the next call.
+            posted_events.extendleft(reversed(events[num_started[0]:]))
+        return num_events
+
+    def set_post_callback(self, callback: Optional[Callable[[], None]]) -> None:
+        """Set a function to be called after each call to `post_event` (None to unset).
+
+        The callback is called from the thread that has posted the event, so it must be thread-safe.
+        It is meant to wake up the thread owning the event manager (e.g. the one running an asyncio
+        event loop or a real-time loop) so that it raises the posted events.
+        """
+
+        self._post_callback = callback
+
+    def _call_subscribers(self, event: Event) -> None:
+        if len(self._event_ids) > 0:
+            event_id = self._event_ids.get(event, None)
+            if event_id is not None:
+                self._call_id_subscribers(event_id, event)
+                return
+        # Take away all the subscriptions for the event in question, if there are any.
+        subscriptions = self._subscriptions.pop(event, None)
+        if subscriptions is not None:
+            # Call each of them. If any of the subscribers cause new subscriptions for this event
+            # to appear, they go into a fresh entry of `self._subscriptions` and are not called this time.
+            try:
+                for subscription in subscriptions:
+                    # It might have been cancelled by one of the preceding subscribers.
+                    if subscription._active:
+                        subscription._active = False
+                        subscription._subscriber(event)
+            except BaseException:
+                # A subscriber has raised an exception, so put the ones which have not been called back.
+                remaining = _active_subscriptions(subscriptions, self._subscriptions.get(event, None))
+                if len(remaining) > 0:
+                    self._subscriptions[event] = remaining
+                raise
+
+    def _call_id_subscribers(self, event_id: int, event: Event) -> None:
+        # Just like `_call_subscribers`, but for an interned event.
+        id_subscriptions = self._id_subscriptions
+        subscriptions = id_subscriptions[event_id]
+        if subscriptions is not None:
+            id_subscriptions[event_id] = None
+            try:
+                for subscription in subscriptions:
+                    if subscription._active:
+                        subscription._active = False
+                        subscription._subscriber(event)
+            except BaseException:
+                remaining = _active_subscriptions(subscriptions, id_subscriptions[event_id])
+                if len(remaining) > 0:
+                    id_subscriptions[event_id] = remaining
+                raise
+
+    def _call_persistent_subscribers(self, event: Event) -> None:
+        subscriptions = self._persistent_snapshots.get(event, None)
+        if subscriptions is None:
+            current = self._persistent_subscriptions.get(event, None)
+            if current is None:
+                return
+            subscriptions = self._persistent_snapshots[event] = tuple(current)
+        for subscription in subscriptions:
+            # It might have been cancelled by one of the preceding subscribers.
+            if subscription._active:
+                subscription._subscriber(event)
+
+    def _call_indexed_multisubscribers(self, event: Event) -> None:
+        # Take away all the indexed multisubscriptions (the ones created with an EventSet selector)
+        # waiting for this event. Just like with the ordinary subscriptions, those created while their
+        # subscribers are being called will go into a fresh entry and will not be called this time.
+        indexed_multisubscriptions = self._indexed_multisubscriptions.pop(event, None)
+        if indexed_multisubscriptions is not None:
+            try:
+                for multisubscription in indexed_multisubscriptions:
+                    # It might have already been called if a subscriber has raised another event
+                    # from the same set, or it might have been cancelled.
+                    if not multisubscription._active:
+                        continue
+                    multisubscription._active = False
+                    # Remove it from the entries of the other events it has been waiting for.
+                    self._unindex_multisubscription(multisubscription)
+                    multisubscription._subscriber(event)
+            except BaseException:
+                # A subscriber has raised an exception, so put the ones which have not been called back.
+                remaining = _active_subscriptions(
+                    indexed_multisubscriptions, self._indexed_multisubscriptions.get(event, None),
+                )
+                if len(remaining) > 0:
+                    self._indexed_multisubscriptions[event] = remaining
+                raise
+
+    def _call_pattern_multisubscribers(self, event: Event) -> None:
+        event_type = type(event)
+        if isinstance(event, tuple):
+            self._call_pattern_multisubscribers_of(tuple, event, _extract_tuple_key)
+            if event_type is tuple:
+                return
+        self._call_pattern_multisubscribers_of(event_type, event, _extract_field_key)
+
+    def _call_pattern_multisubscribers_of(
+        self,
+        event_type: type,
+        event: Event,
+        extract_key: Callable[[_PatternSignature, Any], Optional[_PatternKey]],
+    ) -> None:
+        by_signature = self._pattern_multisubscriptions.get(event_type, None)
+        if by_signature is None:
+            return
+        # The matching subscribers are taken away before any of them is called, so the multisubscriptions
+        # created by them go into fresh entries and are not called this time.
+        matched: List[_PatternMultisubscription] = []
+        emptied: List[_PatternSignature] = []
+        for signature, by_key in by_signature.items():
+            key = extract_key(signature, event)
+            if key is None:
+                continue
+            try:
+                multisubscriptions = by_key.pop(key, None)
+            except TypeError:
+                # Some of the fields are unhashable, so they cannot be equal to what the patterns expect.
+                continue
+            if multisubscriptions is not None:
+                matched.extend(multisubscriptions)
+                if len(by_key) == 0:
+                    emptied.append(signature)
+        for signature in emptied:
+            del by_signature[signature]
+        if len(by_signature) == 0:
+            del self._pattern_multisubscriptions[event_type]
+        index = 0
+        try:
+            while index < len(matched):
+                multisubscription = matched[index]
+                index += 1
+                # It might have been cancelled by one of the preceding subscribers.
+                if multisubscription._active:
+                    multisubscription._active = False
+                    multisubscription._subscriber(event)
+        finally:
+            if index < len(matched):
+                self._restore_pattern_multisubscriptions(event_type, matched[index:])
+
+    def _restore_pattern_multisubscriptions(
+        self,
+        event_type: type,
+        multisubscriptions: List[_PatternMultisubscription],
+    ) -> None:
+        # A subscriber has raised an exception, so index the ones which have not been called again, in front
+        # of the ones which have been created in the meantime.
+        restored: Dict[Tuple[_PatternSignature, _PatternKey], Dict[_PatternMultisubscription, None]] = {}
+        for multisubscription in multisubscriptions:
+            if multisubscription._active:
+                restored.setdefault((multisubscription.signature, multisubscription.key), {})[multisubscription] = None
+        if len(restored) == 0:
+            return
+        by_signature = self._pattern_multisubscriptions.setdefault(event_type, {})
+        for (signature, key), entry in restored.items():
+            by_key = by_signature.setdefault(signature, {})
+            by_key[key] = _active_subscriptions(entry, by_key.get(key, None))
+
+    def _call_multisubscribers(self, event: Event) -> None:
+        # A snapshot of currently existing groups of multisubscriptions. The iteration will be done over
+        # this copy so that new multisubscriptions that may appear during the iteration will not interfere
         # with the process.
-        multisubscriptions_copy = self._multisubscriptions
-        # We temporarily clear the `self._multisubscriptions` list so that after the iteration
-        # only newly created multisubscriptions (if any) will live there. This is important because
-        # each of the currently existing multisubscription may or may not be deleted in this process,
-        # and the ones that persist are stored separately. This is all done to simplify this unobvious
-        # process.
-        self._multisubscriptions = []
-        # The storage for multisubscriptions that are not deleted in the process.
-        remaining_multisubscriptions: List[_Multisubscription] = []
+        groups_copy = self._multisubscriptions
+        # We temporarily clear `self._multisubscriptions` so that after the iteration only newly created
+        # multisubscriptions (if any) will live there. This is important because each of the currently
+        # existing groups may or may not be deleted in this process, and the ones that persist are stored
+        # separately. This is all done to simplify this unobvious process.
+        self._multisubscriptions = {}
+        # The storage for groups that are not deleted in the process.
+        remaining_groups: List[_SelectorGroup] = []
 
         # Now, the process begins.
-        for selector, subscriber in multisubscriptions_copy:
-            # For each multisubscription (consisting of an event selector and a subscriber function)
-            # decide whether to call the subscriber (and delete it) or to leave it intact (and retain it
-            # in the list of multisubscriptions).
-            if selector(event):
-                # Call & delete (it isn't present in `self._multisubscriptions` or
-                # `remaining_multisubscriptions`, and we are not adding it to any of them)
-                subscriber(event)
-            else:
-                # Retain (store in a separate buffer for now)
-                remaining_multisubscriptions.append((selector, subscriber))
-        # After the process has finished, we have the following:
-        #      `multisubscriptions_copy`: unchanged, but now unnecessary.
-        #     `self._multisubscriptions`: newly created multisubscriptions (if any).
-        # `remaining_multisubscriptions`: old multisubscriptions that haven't been called.
-        # We need to retain old and new multisubscriptions (the order is not important,
-        # but we maintain it in this implementation), so we simply join two of these lists.
-        self._multisubscriptions = remaining_multisubscriptions + self._multisubscriptions
+        try:
+            for group in groups_copy.values():
+                # Groups left empty (including by the preceding subscribers cancelling their multisubscriptions)
+                # are dropped.
+                if len(group.subscriptions) == 0:
+                    continue
+                # For each group (consisting of an event selector and the subscriptions sharing it) decide
+                # whether to call the subscribers (and delete the group) or to leave it intact (and retain it).
+                if group.selector(event):
+                    self._call_group(group, event)
+                else:
+                    remaining_groups.append(group)
+        except BaseException:
+            # A selector or a subscriber has raised an exception. Keep all the groups which have not been
+            # called (the ones which have been are empty and are dropped).
+            self._merge_groups(list(groups_copy.values()))
+            raise
+        # After the process has finished, `self._multisubscriptions` contains the newly created
+        # multisubscriptions (if any), and `remaining_groups` the old ones that haven't been called.
+        # We need to retain both of them.
+        self._merge_groups(remaining_groups)
+
+    def _call_group(self, group: _SelectorGroup, event: Event) -> None:
+        # The group is emptied first so that the subscribers cancelling the multisubscriptions from it
+        # do not disturb the iteration. The cancelled ones are then skipped.
+        subscriptions = group.subscriptions
+        group.subscriptions = {}
+        try:
+            for multisubscription in subscriptions:
+                if multisubscription._active:
+                    multisubscription._active = False
+                    multisubscription._subscriber(event)
+        except BaseException:
+            # A subscriber has raised an exception, so put the ones which have not been called back.
+            group.subscriptions.update(
+                (multisubscription, None) for multisubscription in subscriptions if multisubscription._active
+            )
+            raise
+
+    def _merge_groups(self, remaining_groups: List[_SelectorGroup]) -> None:
+        # Combine the groups retained after a scan with the ones created in the process. The groups
+        # with the same key are merged, since the order of the subscribers is not important. Several
+        # of the retained groups may share a key too (`raise_events` retains the groups created while
+        # handling one event of the batch along with the old ones), and a group may be listed twice.
+        groups: Dict[Hashable, _SelectorGroup] = {}
+        for group in itertools.chain(remaining_groups, self._multisubscriptions.values()):
+            if len(group.subscriptions) == 0:
+                continue
+            existing_group = groups.get(group.key, None)
+            if existing_group is None:
+                groups[group.key] = group
+                continue
+            if existing_group is group:
+                continue
+            existing_group.subscriptions.update(group.subscriptions)
+            for multisubscription in group.subscriptions:
+                multisubscription.group = existing_group
+            group.subscriptions = {}
+        self._multisubscriptions = groups
+
+    def _instrument(self, instrumentation: Optional['Instrumentation']) -> None:
+        # Used by `CoroutineManager.enable_instrumentation`. The instrumented variants of the methods
+        # subscribing to events are set as instance attributes shadowing the methods, so they cost
+        # nothing unless the instrumentation is enabled. The declarative selectors are left as they are
+        # so that the multisubscriptions are still indexed.
+        if instrumentation is None:
+            self.__dict__.pop('subscribe', None)
+            self.__dict__.pop('subscribe_id', None)
+            self.__dict__.pop('subscribe_persistent', None)
+            self.__dict__.pop('multisubscribe', None)
+            return
+
+        subscribe = EventManager.subscribe.__get__(self)
+        subscribe_id = EventManager.subscribe_id.__get__(self)
+        subscribe_persistent = EventManager.subscribe_persistent.__get__(self)
+        multisubscribe = EventManager.multisubscribe.__get__(self)
+
+        def instrumented_subscribe(event: Event, subscriber: Subscriber) -> Subscription:
+            return subscribe(event, instrumentation._wrap_subscriber(subscriber))
+
+        def instrumented_subscribe_id(event_id: int, subscriber: Subscriber) -> Subscription:
+            return subscribe_id(event_id, instrumentation._wrap_subscriber(subscriber))
+
+        def instrumented_subscribe_persistent(event: Event, subscriber: Subscriber) -> Subscription:
+            return subscribe_persistent(event, instrumentation._wrap_subscriber(subscriber))
+
+        def instrumented_multisubscribe(
+            selector: EventSelector,
+            subscriber: Subscriber,
+            key: Optional[Hashable] = None,
+        ) -> Subscription:
+            if isinstance(selector, (EventSet, TuplePattern, FieldPattern)):
+                return multisubscribe(selector, instrumentation._wrap_subscriber(subscriber), key)
+            # The wrapper is different every time, so the multisubscriptions are grouped by the original.
+            group_key = _selector_key(selector) if key is None else key
+            wrapped_selector = instrumentation._wrap_selector(selector)
+            return multisubscribe(wrapped_selector, instrumentation._wrap_subscriber(subscriber), group_key)
+
+        self.subscribe = instrumented_subscribe  # type: ignore
+        self.subscribe_id = instrumented_subscribe_id  # type: ignore
+        self.subscribe_persistent = instrumented_subscribe_persistent  # type: ignore
+        self.multisubscribe = instrumented_multisubscribe  # type: ignore
 
     def unique_event(self) -> Event:
         """Returns an event that equals no other event (in the context of this EventManager, at least).
@@ -0,0 +1,195 @@
+"""Module with the optional instrumentation of the coroutine and event managers.
+
+Instrumentation is enabled with `CoroutineManager.enable_instrumentation`. While it is disabled,
+it costs nothing: the instrumented variants of the hot methods are only swapped in (as instance
+attributes shadowing the methods of the class) when it is enabled and removed when it is disabled.
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Protocol
+
+
+class ResumeCallback(Protocol):
+    """A protocol of the function called after each resumption of a coroutine."""
+
+    def __call__(self, coro: Any, duration_ns: int) -> None:
+        ...
+
+
+class SubscriberCallCallback(Protocol):
+    """A protocol of the function called after each call to a subscriber made by the event manager."""
+
+    def __call__(self, subscriber: Any, event: Any, duration_ns: int) -> None:
+        ...
+
+
+class UpdateCallback(Protocol):
+    """A protocol of the function called after each call to `CoroutineManager.update`."""
+
+    def __call__(self, time_delta: float, duration_ns: int) -> None:
+        ...
+
+
+@dataclass(frozen=True)
+class InstrumentationSnapshot:
+    """The values of the counters and gauges collected by an Instrumentation at some moment.
+
+    Coroutines are identified by the qualified names of their functions, and subscribers are
+    identified by their qualified names (or the qualified names of their types).
+    """
+
+    resumes: Dict[str, int]
+    resume_time_ns: Dict[str, int]
+    subscriber_calls: Dict[str, int]
+    subscriber_time_ns: Dict[str, int]
+    selector_evaluations: int
+    updates: int
+    update_time_ns: int
+    max_update_time_ns: int
+    max_ready_queue_depth: int
+    ready_queue_depth: int
+    timer_heap_size: int
+    posted_events: int
+
+
+def _name_of(function: Any) -> str:
+    name = getattr(function, '__qualname__', None)
+    return name if isinstance(name, str) else type(function).__qualname__
+
+
+class Instrumentation:
+    """Counters and timers of the work done by a coroutine manager and its event manager.
+
+    Only the subscriptions (and multisubscriptions) made while the instrumentation is enabled
+    are instrumented. Timing is done with `time.perf_counter_ns`.
+    """
+
+    def __init__(
+        self,
+        on_resume: Optional[ResumeCallback] = None,
+        on_subscriber_call: Optional[SubscriberCallCallback] = None,
+        on_update: Optional[UpdateCallback] = None,
+    ) -> None:
+        """Construct an instrumentation.
+
+        Parameters:
+            on_resume          -- if given, called with a coroutine and the duration (in nanoseconds)
+                                  of its resumption (until it suspended or finished).
+            on_subscriber_call -- if given, called with a subscriber, the event it has been called for
+                                  and the duration of the call.
+            on_update          -- if given, called with the `time_delta` passed to `CoroutineManager.update`
+                                  and the duration of the call.
+        """
+
+        self._on_resume = on_resume
+        self._on_subscriber_call = on_subscriber_call
+        self._on_update = on_update
+        # Set by the coroutine manager this instrumentation is enabled for.
+        self._gauges: Callable[[], Dict[str, int]] = lambda: {}
+        # The wrappers keep references to these dictionaries, so they are cleared rather than replaced.
+        self._resumes: Dict[str, int] = {}
+        self._resume_time_ns: Dict[str, int] = {}
+        self._subscriber_calls: Dict[str, int] = {}
+        self._subscriber_time_ns: Dict[str, int] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """Reset all the counters."""
+
+        self._resumes.clear()
+        self._resume_time_ns.clear()
+        self._subscriber_calls.clear()
+        self._subscriber_time_ns.clear()
+        self._selector_evaluations = 0
+        self._updates = 0
+        self._update_time_ns = 0
+        self._max_update_time_ns = 0
+        self._max_ready_queue_depth = 0
+
+    def snapshot(self) -> InstrumentationSnapshot:
+        """Return the current values of the counters along with the current sizes of the queues."""
+
+        gauges = self._gauges()
+        return InstrumentationSnapshot(
+            resumes=dict(self._resumes),
+            resume_time_ns=dict(self._resume_time_ns),
+            subscriber_calls=dict(self._subscriber_calls),
+            subscriber_time_ns=dict(self._subscriber_time_ns),
+            selector_evaluations=self._selector_evaluations,
+            updates=self._updates,
+            update_time_ns=self._update_time_ns,
+            max_update_time_ns=self._max_update_time_ns,
+            max_ready_queue_depth=self._max_ready_queue_depth,
+            ready_queue_depth=gauges.get('ready_queue_depth', 0),
+            timer_heap_size=gauges.get('timer_heap_size', 0),
+            posted_events=gauges.get('posted_events', 0),
+        )
+
+    def _wrap_step(self, step: Callable[[Any], None], backlog: Callable[[], int]) -> Callable[[Any], None]:
+        resumes = self._resumes
+        resume_time_ns = self._resume_time_ns
+        perf_counter_ns = time.perf_counter_ns
+
+        def instrumented_step(task: Any) -> None:
+            # `task` has already been taken from the ready queue.
+            depth = backlog() + 1
+            if depth > self._max_ready_queue_depth:
+                self._max_ready_queue_depth = depth
+            coro = task._coro
+            start = perf_counter_ns()
+            try:
+                step(task)
+            finally:
+                duration_ns = perf_counter_ns() - start
+                name = _name_of(coro)
+                resumes[name] = resumes.get(name, 0) + 1
+                resume_time_ns[name] = resume_time_ns.get(name, 0) + duration_ns
+                if self._on_resume is not None:
+                    self._on_resume(coro, duration_ns)
+
+        return instrumented_step
+
+    def _wrap_update(self, update: Callable[..., None]) -> Callable[..., None]:
+        perf_counter_ns = time.perf_counter_ns
+
+        def instrumented_update(time_delta: float, **budget: Any) -> None:
+            start = perf_counter_ns()
+            try:
+                update(time_delta, **budget)
+            finally:
+                duration_ns = perf_counter_ns() - start
+                self._updates += 1
+                self._update_time_ns += duration_ns
+                if duration_ns > self._max_update_time_ns:
+                    self._max_update_time_ns = duration_ns
+                if self._on_update is not None:
+                    self._on_update(time_delta, duration_ns)
+
+        return instrumented_update
+
+    def _wrap_subscriber(self, subscriber: Callable[[Any], None]) -> Callable[[Any], None]:
+        name = _name_of(subscriber)
+        subscriber_calls = self._subscriber_calls
+        subscriber_time_ns = self._subscriber_time_ns
+        perf_counter_ns = time.perf_counter_ns
+
+        def instrumented_subscriber(event: Any) -> None:
+            start = perf_counter_ns()
+            try:
+                subscriber(event)
+            finally:
+                duration_ns = perf_counter_ns() - start
+                subscriber_calls[name] = subscriber_calls.get(name, 0) + 1
+                subscriber_time_ns[name] = subscriber_time_ns.get(name, 0) + duration_ns
+                if self._on_subscriber_call is not None:
+                    self._on_subscriber_call(subscriber, event, duration_ns)
+
+        return instrumented_subscriber
+
+    def _wrap_selector(self, selector: Callable[[Any], bool]) -> Callable[[Any], bool]:
+        def instrumented_selector(event: Any) -> bool:
+            self._selector_evaluations += 1
+            return selector(event)
+
+        return instrumented_selector
@@ -0,0 +1,288 @@
+"""Module responsible for running coroutine managers in several processes.
+
+A single CoroutineManager runs on a single core. `CoroutineManagerPool` splits the work between
+several worker processes (shards), each running its own CoroutineManager (and, thus, having its own
+EventManager and TimeTracker). Coroutines and events are routed to the shards by keys: every key
+is owned by exactly one shard, and the events raised for a key are delivered to the event manager
+of the shard owning it, regardless of where they were raised.
+
+Since coroutine objects cannot be sent to other processes, coroutines are started by passing
+a (picklable) async function and its (picklable) arguments, and the events have to be picklable too.
+"""
+
+from coman.coroutine_manager import CoroutineManager
+from coman.event_manager import Event
+
+import multiprocessing
+import multiprocessing.connection
+import pickle
+import traceback
+import zlib
+from typing import Any, Callable, Coroutine, Hashable, List, Optional, Sequence, Tuple
+
+
+ShardKey = Hashable
+ShardRouter = Callable[[ShardKey, int], int]
+
+_RoutedEvent = Tuple[ShardKey, Event]
+
+
+def default_shard_of(key: ShardKey, num_shards: int) -> int:
+    """Return the index of the shard owning `key`.
+
+    Integer keys are distributed round-robin. Other keys are distributed by a checksum of their
+    pickled representation, which (unlike `hash`) is the same in all the processes.
+    """
+
+    if isinstance(key, int):
+        return key % num_shards
+    return zlib.crc32(pickle.dumps(key, protocol=4)) % num_shards
+
+
+class ShardError(Exception):
+    """An exception raised by the pool when a coroutine or an event handler has failed in a worker process."""
+
+
+class Shard:
+    """The part of the pool living in a worker process.
+
+    An instance of this class is passed as the first argument to the functions started with
+    `CoroutineManagerPool.start`. It gives access to the coroutine manager of the shard and
+    allows raising events for keys owned by other shards.
+    """
+
+    def __init__(self, index: int, num_shards: int, shard_of: ShardRouter) -> None:
+        """Construct a Shard. Should not be called explicitly: shards are created by the pool."""
+        self._index = index
+        self._num_shards = num_shards
+        self._shard_of = shard_of
+        self._coroutine_manager = CoroutineManager()
+        self._outgoing_events: List[_RoutedEvent] = []
+        self._reports: List[Any] = []
+
+    @property
+    def index(self) -> int:
+        """Return the index of this shard."""
+        return self._index
+
+    @property
+    def num_shards(self) -> int:
+        """Return the total number of shards in the pool."""
+        return self._num_shards
+
+    @property
+    def coroutine_manager(self) -> CoroutineManager:
+        """Return the coroutine manager of this shard."""
+        return self._coroutine_manager
+
+    def owns(self, key: ShardKey) -> bool:
+        """Return True if `key` is owned by this shard."""
+        return self._shard_of(key, self._num_shards) == self._index
+
+    def raise_event(self, key: ShardKey, event: Event) -> None:
+        """Raise an event in the shard owning `key`.
+
+        If it is this shard, the event is raised right away. Otherwise, it is forwarded to its owner
+        and raised there during the current (or, if there is none, the next) call to
+        `CoroutineManagerPool.update`.
+        """
+
+        if self.owns(key):
+            self._coroutine_manager.event_manager.raise_event(event)
+        else:
+            self._outgoing_events.append((key, event))
+
+    def report(self, value: Any) -> None:
+        """Send a (picklable) value to the main process. It can be retrieved with `CoroutineManagerPool.reports`."""
+        self._reports.append(value)
+
+
+def _worker_main(
+    connection: multiprocessing.connection.Connection,
+    index: int,
+    num_shards: int,
+    shard_of: ShardRouter,
+) -> None:
+    shard = Shard(index, num_shards, shard_of)
+    coroutine_manager = shard.coroutine_manager
+    error: Optional[str] = None
+
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            # The main process has gone away.
+            break
+        command = message[0]
+        if command == 'stop':
+            break
+        try:
+            if command == 'start':
+                _, function, args = message
+                coroutine_manager.start(function(shard, *args))
+            elif command == 'update':
+                _, time_delta, events = message
+                # Posted events are raised by `update` before it handles the delayed events.
+                for event in events:
+                    coroutine_manager.event_manager.post_event(event)
+                coroutine_manager.update(time_delta)
+        except Exception:
+            if error is None:
+                error = traceback.format_exc()
+        if command == 'update':
+            connection.send((error, shard._outgoing_events, shard._reports))
+            error = None
+            shard._outgoing_events = []
+            shard._reports = []
+
+    connection.close()
+
+
+class CoroutineManagerPool:
+    """A pool of coroutine managers running in worker processes.
+
+    Example:
+    ```
+    async def agent(shard, agent_id):
+        await shard.coroutine_manager.sleep(1)
+        shard.raise_event(key=agent_id + 1, event=('greeting', agent_id + 1))
+
+    with CoroutineManagerPool(num_shards=4) as pool:
+        for agent_id in range(1000):
+            pool.start(agent_id, agent, agent_id)
+        pool.update(1)
+    ```
+
+    All the shards share the same notion of time: `update` advances all of them at once.
+    """
+
+    def __init__(
+        self,
+        num_shards: int,
+        shard_of: ShardRouter = default_shard_of,
+        context: Optional[Any] = None,
+    ) -> None:
+        """Construct a pool and start the worker processes.
+
+        Parameters:
+            num_shards -- the number of worker processes. Must be positive.
+            shard_of   -- a function taking a key and the number of shards and returning the index of
+                          the shard owning the key. Must be picklable and return the same result in all
+                          the processes. The default one is `default_shard_of`.
+            context    -- the multiprocessing context to create the processes with. The default context
+                          is used if not given.
+
+        Raises ValueError if `num_shards` is not positive.
+        """
+
+        if num_shards <= 0:
+            raise ValueError('The number of shards must be positive')
+
+        if context is None:
+            context = multiprocessing.get_context()
+        self._num_shards = num_shards
+        self._shard_of = shard_of
+        self._connections: List[multiprocessing.connection.Connection] = []
+        self._processes: List[Any] = []
+        self._pending_events: List[List[Event]] = [[] for _ in range(num_shards)]
+        self._reports: List[Any] = []
+        self._closed = False
+
+        for index in range(num_shards):
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(
+                target=_worker_main,
+                args=(child_connection, index, num_shards, shard_of),
+                daemon=True,
+            )
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+
+    def __enter__(self) -> 'CoroutineManagerPool':
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def num_shards(self) -> int:
+        """Return the number of shards in the pool."""
+        return self._num_shards
+
+    def shard_of(self, key: ShardKey) -> int:
+        """Return the index of the shard owning `key`."""
+        return self._shard_of(key, self._num_shards)
+
+    def start(self, key: ShardKey, function: Callable[..., Coroutine[Any, None, Any]], *args: Any) -> None:
+        """Start a coroutine in the shard owning `key`.
+
+        The coroutine is created in the worker process as `function(shard, *args)`, where `shard` is
+        the `Shard` object of the worker. `function` and `args` must be picklable.
+        """
+
+        self._connections[self.shard_of(key)].send(('start', function, args))
+
+    def raise_event(self, key: ShardKey, event: Event) -> None:
+        """Raise an event in the shard owning `key`.
+
+        The event is delivered on the next call to `update`, before the time is advanced.
+        """
+
+        self._pending_events[self.shard_of(key)].append(event)
+
+    def update(self, time_delta: float) -> None:
+        """Advance the time in all the shards by `time_delta` seconds.
+
+        See `CoroutineManager.update` for details. The events raised for the keys owned by other shards
+        are forwarded until there are no more of them, so, when this method returns, all the shards have
+        done everything they had to do by this moment.
+
+        Raises ShardError if a coroutine or an event handler in any of the shards has raised an exception.
+        """
+
+        targets: Sequence[int] = range(self._num_shards)
+        while True:
+            pending_events = self._pending_events
+            self._pending_events = [[] for _ in range(self._num_shards)]
+            for index in targets:
+                self._connections[index].send(('update', time_delta, pending_events[index]))
+
+            errors: List[str] = []
+            for index in targets:
+                error, outgoing_events, reports = self._connections[index].recv()
+                if error is not None:
+                    errors.append(f'Shard {index}:\n{error}')
+                for key, event in outgoing_events:
+                    self._pending_events[self.shard_of(key)].append(event)
+                self._reports.extend(reports)
+            if len(errors) > 0:
+                raise ShardError('\n'.join(errors))
+
+            # The time has been advanced already; only the forwarded events remain to be delivered.
+            time_delta = 0
+            targets = [index for index in range(self._num_shards) if len(self._pending_events[index]) > 0]
+            if len(targets) == 0:
+                break
+
+    def reports(self) -> List[Any]:
+        """Return (and forget) the values reported by the shards (see `Shard.report`) so far."""
+        reports = self._reports
+        self._reports = []
+        return reports
+
+    def close(self) -> None:
+        """Stop the worker processes. The pool cannot be used afterwards."""
+
+        if self._closed:
+            return
+        self._closed = True
+        for connection in self._connections:
+            try:
+                connection.send(('stop',))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
@@ -0,0 +1,184 @@
+"""Module that allows running a coroutine manager in real time, without an event loop.
+
+`RealTimeDriver` blocks the calling thread until the next delayed event is due or an event is posted
+from another thread (see `EventManager.post_event`), so an idle coroutine manager uses no CPU. The time
+is taken from an integer nanosecond clock (`time.monotonic_ns` by default), and the coroutine manager is
+advanced with `CoroutineManager.run_until`, so the delayed events are handled at their exact deadlines
+and no rounding errors are accumulated however long it runs.
+"""
+
+from coman.coroutine_manager import CoroutineManager
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+
+# The weight of the latest measurement in the running estimate of how much the thread oversleeps.
+_OVERSLEEP_SMOOTHING = 0.125
+
+
+@dataclass(frozen=True)
+class LatenessStatistics:
+    """Statistics of how late the delayed events have been handled by a RealTimeDriver.
+
+    The lateness of a tick is the time between the deadline the driver has been waiting for and
+    the moment it has started handling it.
+    """
+
+    ticks: int
+    total_lateness_ns: int
+    max_lateness_ns: int
+    last_lateness_ns: int
+
+    @property
+    def mean_lateness_ns(self) -> float:
+        """Return the average lateness of a tick (0 if there have been none)."""
+        return self.total_lateness_ns / self.ticks if self.ticks > 0 else 0.0
+
+
+class RealTimeDriver:
+    """Driver of a CoroutineManager running in real time in the current thread.
+
+    Example:
+    ```
+    cm = CoroutineManager()
+    driver = RealTimeDriver(cm)
+    cm.start(main(cm, driver))      # `main` calls `driver.stop()` when it is done
+    driver.run()
+    ```
+
+    While the driver is running, the coroutine manager must not be updated by other means.
+
+    To wake up precisely, the driver keeps an estimate of how much the operating system oversleeps,
+    wakes up that much earlier and spins for the rest of the time (but for no longer than `max_spin`).
+    """
+
+    def __init__(
+        self,
+        coroutine_manager: CoroutineManager,
+        clock_ns: Callable[[], int] = time.monotonic_ns,
+        max_spin: float = 0.001,
+    ) -> None:
+        """Construct a driver.
+
+        Parameters:
+            coroutine_manager -- the coroutine manager to drive.
+            clock_ns          -- a monotonic clock returning the time in nanoseconds.
+            max_spin          -- the maximum amount of time (in seconds) to spin for before a deadline.
+                                 0 disables spinning.
+        """
+
+        self._coroutine_manager = coroutine_manager
+        self._clock_ns = clock_ns
+        self._max_spin_ns = round(max_spin * 1e9)
+        # The value of the clock corresponding to the time 0 of the coroutine manager.
+        self._origin_ns = 0
+        self._oversleep_ns = 0.0
+        self._wakeup = threading.Event()
+        self._stop_requested = False
+        self._running = False
+        self.reset_statistics()
+
+    @property
+    def coroutine_manager(self) -> CoroutineManager:
+        """Return the driven coroutine manager."""
+        return self._coroutine_manager
+
+    @property
+    def running(self) -> bool:
+        """Return True if `run` is running at the moment."""
+        return self._running
+
+    def statistics(self) -> LatenessStatistics:
+        """Return the lateness statistics collected so far."""
+
+        return LatenessStatistics(
+            ticks=self._ticks,
+            total_lateness_ns=self._total_lateness_ns,
+            max_lateness_ns=self._max_lateness_ns,
+            last_lateness_ns=self._last_lateness_ns,
+        )
+
+    def reset_statistics(self) -> None:
+        """Reset the lateness statistics."""
+
+        self._ticks = 0
+        self._total_lateness_ns = 0
+        self._max_lateness_ns = 0
+        self._last_lateness_ns = 0
+
+    def stop(self) -> None:
+        """Make `run` return as soon as possible. Can be called from any thread, including the coroutines."""
+
+        self._stop_requested = True
+        self._wakeup.set()
+
+    def run(self, until: Optional[float] = None) -> None:
+        """Drive the coroutine manager until `stop` is called or until the time `until`.
+
+        The time of the coroutine manager continues from where it was (it does not jump when `run`
+        is called, and it does not pass while `run` is not running).
+
+        Parameters:
+            until -- the time point (in the same terms as `CoroutineManager.elapsed_time`) to run until.
+                     If not given, the driver runs until `stop` is called.
+
+        Raises RuntimeError if the driver is running already. Otherwise, unless an exception is raised by
+        an event handler or a coroutine, this method does not raise exceptions.
+        """
+
+        if self._running:
+            raise RuntimeError('The driver is running already')
+        coroutine_manager = self._coroutine_manager
+        event_manager = coroutine_manager.event_manager
+        self._running = True
+        self._stop_requested = False
+        self._origin_ns = self._clock_ns() - round(coroutine_manager.elapsed_time() * 1e9)
+        event_manager.set_post_callback(self._wakeup.set)
+        try:
+            while not self._stop_requested:
+                # Cleared before the posted events are raised, so that none posted afterwards are missed.
+                self._wakeup.clear()
+                now = (self._clock_ns() - self._origin_ns) / 1e9
+                if until is not None and now > until:
+                    now = until
+                coroutine_manager.run_until(now)
+                if self._stop_requested or (until is not None and now >= until):
+                    break
+                deadline = coroutine_manager.next_deadline()
+                if until is not None and (deadline is None or deadline > until):
+                    deadline = until
+                self._wait_until(deadline)
+        finally:
+            event_manager.set_post_callback(None)
+            self._running = False
+
+    def _wait_until(self, deadline: Optional[float]) -> None:
+        if deadline is None:
+            self._wakeup.wait()
+            return
+
+        deadline_ns = self._origin_ns + round(deadline * 1e9)
+        remaining_ns = deadline_ns - self._clock_ns()
+        # Wake up early by the expected oversleep (if it can be spun off).
+        early_ns = min(round(self._oversleep_ns), self._max_spin_ns)
+        if remaining_ns > early_ns:
+            wake_ns = deadline_ns - early_ns
+            if self._wakeup.wait((wake_ns - self._clock_ns()) / 1e9):
+                # An event has been posted.
+                return
+            oversleep_ns = max(self._clock_ns() - wake_ns, 0)
+            self._oversleep_ns += (oversleep_ns - self._oversleep_ns) * _OVERSLEEP_SMOOTHING
+
+        while self._clock_ns() < deadline_ns:
+            if self._wakeup.is_set():
+                return
+
+        lateness_ns = max(self._clock_ns() - deadline_ns, 0)
+        self._ticks += 1
+        self._total_lateness_ns += lateness_ns
+        self._last_lateness_ns = lateness_ns
+        if lateness_ns > self._max_lateness_ns:
+            self._max_lateness_ns = lateness_ns
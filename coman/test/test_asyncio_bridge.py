@@ -0,0 +1,263 @@
+from coman.asyncio_bridge import AsyncioDriver
+from coman.coroutine_manager import CoroutineManager, CancelledError
+
+import asyncio
+import threading
+
+import pytest
+
+
+def test_asyncio_driver_sleep():
+    arr = []
+
+    async def coman_main(cm):
+        arr.append('start')
+        await cm.sleep(0.05)
+        arr.append('slept')
+        await cm.sleep(0.05)
+        return 'done'
+
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        result = await driver.create_future(coman_main(cm))
+        elapsed = loop.time() - start
+        driver.stop()
+        assert not driver.running
+        return result, elapsed
+
+    result, elapsed = asyncio.run(main())
+    assert result == 'done'
+    assert arr == ['start', 'slept']
+    assert 0.09 <= elapsed < 0.5
+
+
+def test_asyncio_driver_wait_for_future():
+    arr = []
+
+    async def coman_main(cm, driver, future):
+        arr.append('waiting')
+        value = await driver.wait_for_future(future)
+        arr.append(('got', value))
+        await cm.sleep(0.01)
+        arr.append('slept')
+        with pytest.raises(ValueError):
+            await driver.wait_for_future(failing())
+        raise KeyError('oops')
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise ValueError()
+
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        coman_future = driver.create_future(coman_main(cm, driver, future))
+        await asyncio.sleep(0.01)
+        assert arr == ['waiting']
+        future.set_result(42)
+        with pytest.raises(KeyError):
+            await coman_future
+        driver.stop()
+
+    asyncio.run(main())
+    assert arr == ['waiting', ('got', 42), 'slept']
+
+
+def test_asyncio_driver_is_idle_without_timers():
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        assert driver._timer_handle is None
+        timer = cm.add_delayed_event(delay=10, event='e')
+        await asyncio.sleep(0)
+        assert driver._timer_handle is not None
+        timer.cancel()
+        cm.add_delayed_event(delay=0, event='f')
+        await asyncio.sleep(0)
+        assert driver._timer_handle is None
+        driver.stop()
+
+    asyncio.run(main())
+
+
+def test_asyncio_driver_wakes_up_on_posted_events():
+    arr = []
+
+    async def coman_main(cm):
+        await cm.wait_for_event('posted')
+        arr.append('woken')
+
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        future = driver.create_future(coman_main(cm))
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, lambda: threading.Thread(target=cm.event_manager.post_event, args=('posted',)).start())
+        await asyncio.wait_for(future, timeout=5)
+        driver.stop()
+
+    asyncio.run(main())
+    assert arr == ['woken']
+
+
+def test_asyncio_driver_cancel_future():
+    arr = []
+
+    async def coman_main(cm):
+        try:
+            await cm.sleep(10)
+        finally:
+            arr.append('cleaned up')
+
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        coman_future = driver.create_future(coman_main(cm))
+        await asyncio.sleep(0.01)
+        coman_future.cancel()
+        await asyncio.sleep(0)
+        assert cm.next_deadline() is None
+        driver.stop()
+
+    asyncio.run(main())
+    assert arr == ['cleaned up']
+
+
+def test_asyncio_driver_sleep_after_idling():
+    async def coman_main(cm):
+        await cm.sleep(0.05)
+
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        await asyncio.sleep(0.1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await driver.create_future(coman_main(cm))
+        elapsed = loop.time() - start
+        driver.stop()
+        return elapsed
+
+    assert asyncio.run(main()) >= 0.04
+
+
+def test_asyncio_driver_sleep_after_waiting_for_future():
+    async def coman_main(cm, driver, future):
+        await driver.wait_for_future(future)
+        start = cm.elapsed_time()
+        await cm.sleep(0.05)
+        return start
+
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        coman_future = driver.create_future(coman_main(cm, driver, future))
+        await asyncio.sleep(0.1)
+        future.set_result(None)
+        start = loop.time()
+        woken_at = await coman_future
+        elapsed = loop.time() - start
+        driver.stop()
+        return woken_at, elapsed
+
+    woken_at, elapsed = asyncio.run(main())
+    assert woken_at >= 0.09
+    assert elapsed >= 0.04
+
+
+def test_asyncio_driver_keeps_running_after_exception():
+    arr = []
+
+    async def bad(cm):
+        await cm.sleep(0.01)
+        raise KeyError('oops')
+
+    async def good(cm):
+        await cm.sleep(0.05)
+        arr.append('good')
+
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        loop = asyncio.get_running_loop()
+        errors = []
+        loop.set_exception_handler(lambda loop, context: errors.append(context['exception']))
+        cm.start(bad(cm))
+        future = driver.create_future(good(cm))
+        await asyncio.wait_for(future, timeout=5)
+        driver.stop()
+        return errors
+
+    errors = asyncio.run(main())
+    assert arr == ['good']
+    assert len(errors) == 1 and isinstance(errors[0], KeyError)
+
+
+def test_asyncio_driver_cancelled_awaited_future():
+    async def coman_main(driver, future):
+        await driver.wait_for_future(future)
+
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        future = asyncio.get_running_loop().create_future()
+        coman_future = driver.create_future(coman_main(driver, future))
+        await asyncio.sleep(0.01)
+        future.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(coman_future, timeout=5)
+        assert coman_future.cancelled()
+        driver.stop()
+
+    asyncio.run(main())
+
+
+def test_asyncio_driver_sleep_after_external_raise_and_cancel():
+    async def woken(cm):
+        await cm.wait_for_event('go')
+        await cm.sleep(0.05)
+
+    async def cancelled(cm):
+        try:
+            await cm.wait_for_event('never')
+        except CancelledError:
+            await cm.sleep(0.05)
+
+    async def main():
+        cm = CoroutineManager()
+        driver = AsyncioDriver(cm)
+        driver.start()
+        loop = asyncio.get_running_loop()
+        woken_future = driver.create_future(woken(cm))
+        task = cm.start(cancelled(cm))
+        await asyncio.sleep(0.1)
+        start = loop.time()
+        cm.event_manager.raise_event('go')
+        task.cancel()
+        assert cm.elapsed_time() >= 0.09
+        await woken_future
+        elapsed = loop.time() - start
+        while not task.done:
+            await asyncio.sleep(0.01)
+        driver.stop()
+        return elapsed, loop.time() - start
+
+    woken_elapsed, cancelled_elapsed = asyncio.run(main())
+    assert woken_elapsed >= 0.04
+    assert cancelled_elapsed >= 0.04
@@ -0,0 +1,112 @@
+from coman.channel import Channel
+from coman.coroutine_manager import CoroutineManager
+
+import pytest
+
+
+def test_channel_backpressure():
+    cm = CoroutineManager()
+    channel = Channel(cm, capacity=2)
+    log = []
+
+    async def producer():
+        for i in range(5):
+            await channel.put(i)
+            log.append(('put', i))
+
+    async def consumer():
+        while True:
+            value = await channel.get()
+            log.append(('got', value))
+            await cm.sleep(1)
+
+    cm.start(producer())
+    assert log == [('put', 0), ('put', 1)]
+    assert len(channel) == 2
+    cm.start(consumer())
+    assert log[2:] == [('got', 0), ('put', 2)]
+    for _ in range(4):
+        cm.update(1)
+    assert [entry for entry in log if entry[0] == 'got'] == [('got', i) for i in range(5)]
+    assert len(channel) == 0
+    cm.update(1)
+    assert len(channel._getters) == 1
+
+
+def test_channel_get_many():
+    cm = CoroutineManager()
+    channel = Channel(cm, capacity=4)
+    batches = []
+
+    async def consumer():
+        while True:
+            batches.append(await channel.get_many(3))
+
+    async def producer():
+        for i in range(10):
+            await channel.put(i)
+
+    cm.start(consumer())
+    cm.start(producer())
+    assert sum(batches, []) == list(range(10))
+    assert all(0 < len(batch) <= 3 for batch in batches)
+
+    with pytest.raises(ValueError):
+        cm.start(channel.get_many(0))
+
+
+def test_channel_put_nowait():
+    cm = CoroutineManager()
+    channel = Channel(cm, capacity=1)
+    log = []
+
+    async def consumer():
+        log.append(await channel.get())
+
+    cm.start(consumer())
+    assert channel.put_nowait('foo')
+    assert log == ['foo']
+    assert channel.put_nowait('bar')
+    assert not channel.put_nowait('baz')
+
+    with pytest.raises(ValueError):
+        Channel(cm, capacity=0)
+
+
+def test_channel_cancel_woken_getter():
+    cm = CoroutineManager()
+    channel = Channel(cm, capacity=1)
+    log = []
+
+    async def consumer(name):
+        log.append((name, await channel.get()))
+
+    async def main():
+        first = cm.start(consumer('first'))
+        cm.start(consumer('second'))
+        await cm.sleep(0)
+        # Wakes `first` up, which is then cancelled before it gets a chance to take the value.
+        channel.put_nowait('foo')
+        first.cancel()
+
+    cm.start(main())
+    cm.update(0)
+    assert log == [('second', 'foo')]
+
+
+def test_channel_cancel_parked():
+    cm = CoroutineManager()
+    channel = Channel(cm, capacity=1)
+
+    async def consumer():
+        await channel.get()
+
+    tasks = [cm.start(consumer()) for _ in range(200)]
+    for task in tasks:
+        task.cancel()
+    assert all(task.cancelled for task in tasks)
+    # The cancelled tasks are purged once they make up the majority of the queue.
+    assert len(channel._getters.tasks) < 100
+    assert len(channel._getters) == 0
+    assert channel.put_nowait('foo')
+    assert len(channel) == 1
@@ -1,4 +1,11 @@
-from coman.coroutine_manager import CoroutineManager
+from coman.coroutine_manager import CoroutineManager, CancelledError
+from coman.event_manager import TuplePattern, ANY
+from coman.timers import TimingWheel
+
+import asyncio
+import threading
+
+import pytest
 
 
 def test_delayed_events():
@@ -218,3 +225,770 @@ def test_gather():
         'g.3',
         'g.4',
     ]
+
+
+def test_long_wake_up_chain():
+    cm = CoroutineManager()
+    n = 10000
+    arr = []
+
+    async def stage(i):
+        await cm.wait_for_event(('stage', i))
+        arr.append(i)
+        cm.event_manager.raise_event(('stage', i + 1))
+
+    for i in range(n):
+        cm.start(stage(i))
+
+    cm.event_manager.raise_event(('stage', 0))
+    assert arr == list(range(n))
+
+
+def test_sleep_zero_in_update():
+    cm = CoroutineManager()
+    arr = []
+
+    async def foo():
+        await cm.sleep(1)
+        arr.append(1)
+        await cm.sleep(0)
+        arr.append(2)
+
+    cm.start(foo())
+    cm.update(1)
+    assert arr == [1, 2]
+
+
+def test_gather_results():
+    cm = CoroutineManager()
+    arr = []
+
+    async def square(x):
+        await cm.sleep(10 - x)
+        return x * x
+
+    async def gatherer():
+        arr.append(await cm.gather([square(x) for x in range(10)]))
+        arr.append(await cm.gather([]))
+
+    cm.start(gatherer())
+    assert arr == []
+    cm.update(5)
+    assert arr == []
+    cm.update(5)
+    assert arr == [[x * x for x in range(10)], []]
+
+
+def test_gather_exception():
+    cm = CoroutineManager()
+    arr = []
+
+    async def fail(delay, message):
+        await cm.sleep(delay)
+        arr.append(message)
+        raise ValueError(message)
+
+    async def succeed():
+        await cm.sleep(3)
+        arr.append('succeeded')
+
+    async def gatherer():
+        try:
+            await cm.gather([fail(2, 'first'), succeed(), fail(1, 'second')])
+        except ValueError as e:
+            arr.append(('caught', str(e)))
+
+    cm.start(gatherer())
+    cm.update(1)
+    assert arr == ['second', ('caught', 'second')]
+    cm.update(2)
+    assert arr == ['second', ('caught', 'second'), 'first', 'succeeded']
+
+
+def test_gather_base_exception():
+    cm = CoroutineManager()
+    arr = []
+
+    async def cancelled():
+        await cm.sleep(1)
+        raise asyncio.CancelledError()
+
+    async def succeed():
+        await cm.sleep(2)
+        arr.append('succeeded')
+
+    async def gatherer():
+        try:
+            await cm.gather([cancelled(), succeed()])
+        except asyncio.CancelledError:
+            arr.append('cancelled')
+
+    cm.start(gatherer())
+    # Propagated from the coroutine, but the gathering one is resumed all the same.
+    with pytest.raises(asyncio.CancelledError):
+        cm.update(1)
+    cm.run_until_idle()
+    assert arr == ['cancelled', 'succeeded']
+    assert cm.event_manager._subscriptions == {}
+
+
+def test_gather_wide():
+    cm = CoroutineManager()
+    n = 20000
+    arr = []
+
+    async def child(i):
+        await cm.wait_for_event('go')
+        return i
+
+    async def gatherer():
+        arr.append(sum(await cm.gather([child(i) for i in range(n)])))
+
+    cm.start(gatherer())
+    cm.event_manager.raise_event('go')
+    assert arr == [n * (n - 1) // 2]
+
+
+def test_cancel_delayed_event():
+    cm = CoroutineManager()
+    arr = []
+
+    for event in ['a', 'b', 'c']:
+        cm.event_manager.subscribe(event=event, subscriber=arr.append)
+
+    a = cm.add_delayed_event(delay=1, event='a')
+    b = cm.add_delayed_event(delay=1, event='b')
+    c = cm.add_delayed_event(delay=2, event='c')
+    assert b.cancel()
+    assert not b.cancel()
+    assert b.event == 'b' and not b.pending
+    cm.update(1)
+    assert arr == ['a']
+    assert not a.pending and not a.cancel()
+    cm.update(1)
+    assert arr == ['a', 'c']
+    assert not c.pending
+    assert cm._delayed_events == []
+
+
+def test_cancelled_delayed_events_are_compacted():
+    cm = CoroutineManager()
+    timers = [cm.add_delayed_event(delay=i, event=i) for i in range(1, 1001)]
+    for timer in timers[:900]:
+        timer.cancel()
+    assert len(cm._delayed_events) < 200
+    assert sum(entry[2].pending for entry in cm._delayed_events) == 100
+    arr = []
+    cm.event_manager.multisubscribe(selector=lambda event: True, subscriber=arr.append)
+    cm.update(1000)
+    assert arr == [901]
+
+
+def test_timing_wheel_backend():
+    cm = CoroutineManager(timing_wheel=TimingWheel(resolution=0.5, levels=2, slot_bits=3))
+    arr = []
+
+    async def foo():
+        arr.append(1)
+        await cm.sleep(2)
+        arr.append(2)
+        await cm.sleep(0.3)
+        arr.append(3)
+        await cm.sleep(1000)
+        arr.append(4)
+
+    cm.start(foo())
+    timer = cm.add_delayed_event(delay=1, event='never')
+    cm.event_manager.subscribe(event='never', subscriber=arr.append)
+    timer.cancel()
+    cm.update(1.9)
+    assert arr == [1]
+    cm.update(0.1)
+    assert arr == [1, 2]
+    cm.update(0.3)
+    assert arr == [1, 2, 3]
+    cm.update(999.9)
+    assert arr == [1, 2, 3]
+    cm.update(0.1)
+    assert arr == [1, 2, 3, 4]
+
+
+def test_timing_wheel_subscriber_exception():
+    cm = CoroutineManager(timing_wheel=TimingWheel(resolution=0.5))
+    arr = []
+
+    def fail(event):
+        raise RuntimeError(event)
+
+    cm.event_manager.subscribe('a', fail)
+    cm.event_manager.subscribe('b', arr.append)
+    cm.add_delayed_event(1, 'a')
+    cm.add_delayed_event(1, 'b')
+    with pytest.raises(RuntimeError):
+        cm.update(1)
+    assert arr == []
+    # The timers which have not been handled are kept.
+    cm.update(0)
+    assert arr == ['b']
+    assert len(cm._timing_wheel) == 0
+
+
+def test_sleep_fifo_order():
+    cm = CoroutineManager()
+    arr = []
+
+    async def sleeper(i, duration):
+        await cm.sleep(duration)
+        arr.append(i)
+
+    for i in range(100):
+        cm.start(sleeper(i, 1 + (i % 3)))
+
+    cm.update(5)
+    assert arr == [i for i in range(100) if i % 3 == 0] + \
+        [i for i in range(100) if i % 3 == 1] + \
+        [i for i in range(100) if i % 3 == 2]
+
+
+def test_update_raises_posted_events():
+    cm = CoroutineManager()
+    arr = []
+
+    async def foo():
+        await cm.wait_for_event('posted')
+        arr.append(1)
+
+    cm.start(foo())
+    thread = threading.Thread(target=cm.event_manager.post_event, args=('posted',))
+    thread.start()
+    thread.join()
+    assert arr == []
+    cm.update(0)
+    assert arr == [1]
+
+
+def test_sleep_does_not_use_event_manager():
+    for cm in [CoroutineManager(), CoroutineManager(timing_wheel=TimingWheel(resolution=0.1))]:
+        arr = []
+
+        async def foo():
+            await cm.sleep(1)
+            arr.append(1)
+
+        cm.start(foo())
+        assert cm.event_manager._subscriptions == {}
+        assert cm.event_manager._counter == 0
+        assert cm.next_deadline() == 1
+        cm.update(1)
+        assert arr == [1]
+        assert cm.next_deadline() is None
+
+
+def test_wait_for_pattern():
+    cm = CoroutineManager()
+    log = []
+
+    async def waiter():
+        await cm.wait_for_event(TuplePattern('unit_died', ANY, 3))
+        log.append('team 3')
+
+    cm.start(waiter())
+    cm.event_manager.raise_event(('unit_died', 'archer', 2))
+    assert log == []
+    cm.event_manager.raise_event(('unit_died', 'archer', 3))
+    assert log == ['team 3']
+
+
+def test_cancel_waiting_task():
+    cm = CoroutineManager()
+    log = []
+
+    async def waiter():
+        try:
+            await cm.wait_for_event('foo')
+        except CancelledError:
+            log.append('cancelled')
+            raise
+        log.append('not reached')
+
+    task = cm.start(waiter())
+    assert not task.done
+    assert task.cancel()
+    assert task.done and task.cancelled
+    assert not task.cancel()
+    assert log == ['cancelled']
+    assert cm.event_manager._subscriptions == {}
+    cm.event_manager.raise_event('foo')
+    assert log == ['cancelled']
+
+
+def test_cancel_sleeping_task():
+    for timing_wheel in [None, TimingWheel()]:
+        cm = CoroutineManager(timing_wheel=timing_wheel)
+        log = []
+
+        async def sleeper():
+            try:
+                await cm.sleep(1)
+            except CancelledError:
+                # Clean up and keep going.
+                await cm.sleep(2)
+                log.append('cleaned up')
+
+        task = cm.start(sleeper())
+        task.cancel()
+        assert not task.done
+        cm.update(1.5)
+        assert log == []
+        cm.update(0.5)
+        assert log == ['cleaned up']
+        assert task.done and not task.cancelled
+        assert cm.next_deadline() is None
+
+
+def test_cancel_self_and_ready_task():
+    cm = CoroutineManager()
+    log = []
+    tasks = []
+
+    async def cancelling_self():
+        tasks[0].cancel()
+        log.append('still running')
+        await cm.wait_for_event('foo')
+        log.append('not reached')
+
+    async def cancelled_while_ready():
+        await cm.wait_for_event('bar')
+        log.append('not reached')
+
+    async def waker():
+        cm.event_manager.raise_event('bar')
+        tasks[1].cancel()
+
+    async def main():
+        # The tasks started from a coroutine are run after it suspends.
+        tasks.append(cm.start(cancelling_self()))
+        tasks.append(cm.start(cancelled_while_ready()))
+        cm.start(waker())
+
+    cm.start(main())
+    assert tasks[0].cancelled
+    assert tasks[1].cancelled
+    assert log == ['still running']
+
+
+def test_wait_for_any():
+    for timing_wheel in [None, TimingWheel()]:
+        cm = CoroutineManager(timing_wheel=timing_wheel)
+        log = []
+
+        async def waiter():
+            log.append(await cm.wait_for_any(['foo', 'bar'], timeout=5))
+            log.append(await cm.wait_for_any(['foo', 'bar'], timeout=5))
+            log.append(await cm.wait_for_any(['foo']))
+
+        cm.start(waiter())
+        cm.event_manager.raise_event('bar', 42)
+        assert log == [('bar', 42)]
+        # The timeout of the first wait has been cancelled.
+        assert cm.next_deadline() == 5
+        cm.update(5)
+        assert log == [('bar', 42), None]
+        # Only the third wait remains.
+        assert list(cm.event_manager._indexed_multisubscriptions) == ['foo']
+        assert cm.next_deadline() is None
+        cm.event_manager.raise_event('foo')
+        assert log == [('bar', 42), None, ('foo', None)]
+
+
+def test_wait_for_any_does_not_leak():
+    cm = CoroutineManager()
+
+    async def waiter():
+        for _ in range(1000):
+            await cm.wait_for_any(['foo'], timeout=10)
+
+    cm.start(waiter())
+    for _ in range(1000):
+        cm.event_manager.raise_event('foo')
+    # The cancelled timeouts are purged from the heap once they make up the majority of it.
+    assert len(cm._delayed_events) < 200
+
+
+def test_wait_for_all():
+    cm = CoroutineManager()
+    log = []
+
+    async def waiter():
+        log.append(await cm.wait_for_all(['foo', 'bar', 'baz']))
+        log.append(await cm.wait_for_all(['foo', 'bar'], timeout=1))
+        log.append(await cm.wait_for_all([]))
+
+    cm.start(waiter())
+    cm.event_manager.raise_event('baz')
+    cm.event_manager.raise_event('foo')
+    cm.event_manager.raise_event('foo')
+    assert log == []
+    cm.event_manager.raise_event('bar')
+    assert log == [True]
+    cm.event_manager.raise_event('bar')
+    cm.update(1)
+    assert log == [True, False, True]
+    assert cm.event_manager._subscriptions == {}
+    assert cm.event_manager._indexed_multisubscriptions == {}
+
+
+def test_cancel_wait_for_any():
+    cm = CoroutineManager()
+
+    async def waiter():
+        await cm.wait_for_any(['foo'], timeout=1)
+
+    task = cm.start(waiter())
+    task.cancel()
+    assert task.cancelled
+    assert cm.next_deadline() is None
+    assert cm.event_manager._indexed_multisubscriptions == {}
+
+
+def test_event_payloads():
+    cm = CoroutineManager()
+    log = []
+
+    async def waiter():
+        log.append(await cm.wait_for_event('foo'))
+        log.append(await cm.wait_for_event(TuplePattern('unit_died')))
+        await cm.sleep(1)
+        log.append(await cm.wait_for_event('foo'))
+
+    def nested(event):
+        # The payload of the outer event is restored after the inner one has been raised.
+        log.append(cm.event_manager.payload)
+        cm.event_manager.raise_event('bar', 'inner')
+        log.append(cm.event_manager.payload)
+
+    cm.start(waiter())
+    cm.event_manager.subscribe('foo', nested)
+    cm.event_manager.raise_event('foo', 'outer')
+    # The coroutine is resumed after all the subscribers have been called.
+    assert log == ['outer', 'outer', ('foo', 'outer')]
+    cm.event_manager.raise_event(('unit_died', 'archer'), {'team': 3})
+    assert log[-1] == (('unit_died', 'archer'), {'team': 3})
+    assert cm.event_manager.payload is None
+    cm.update(1)
+    cm.event_manager.raise_events(['foo'])
+    assert log[-1] == ('foo', None)
+
+
+def test_run_until():
+    for timing_wheel in [None, TimingWheel()]:
+        cm = CoroutineManager(timing_wheel=timing_wheel)
+        log = []
+
+        async def ticker(name, period):
+            while True:
+                await cm.sleep(period)
+                log.append((name, cm.elapsed_time()))
+
+        cm.start(ticker('a', 0.1))
+        cm.start(ticker('b', 0.3))
+        cm.run_until(0.65)
+        # The deadlines are reached exactly, and the ties are resolved in FIFO order.
+        assert [name for name, _ in log] == ['a', 'a', 'b', 'a', 'a', 'a', 'b', 'a']
+        assert [time for name, time in log if name == 'a'] == [
+            0.1, 0.1 + 0.1, 0.1 + 0.1 + 0.1, 0.1 + 0.1 + 0.1 + 0.1, 0.1 + 0.1 + 0.1 + 0.1 + 0.1,
+            0.1 + 0.1 + 0.1 + 0.1 + 0.1 + 0.1,
+        ]
+        assert cm.elapsed_time() == 0.65
+
+
+def test_run_until_raises_posted_events_at_the_end():
+    cm = CoroutineManager()
+    log = []
+
+    async def waiter():
+        await cm.wait_for_event('posted')
+        log.append(cm.elapsed_time())
+
+    async def sleeper():
+        await cm.sleep(1)
+
+    cm.start(waiter())
+    cm.start(sleeper())
+    cm.event_manager.post_event('posted')
+    cm.run_until(3)
+    assert log == [3]
+
+def test_run_until_idle():
+    cm = CoroutineManager()
+    log = []
+
+    async def worker():
+        await cm.sleep(5)
+        log.append(cm.elapsed_time())
+        cm.add_delayed_event(10, 'done')
+        await cm.wait_for_event('done')
+        log.append(cm.elapsed_time())
+
+    async def nested():
+        with pytest.raises(RuntimeError):
+            cm.run_until_idle()
+
+    cm.start(worker())
+    cm.start(nested())
+    cm.run_until_idle()
+    assert log == [5, 15]
+    assert cm.next_deadline() is None
+
+
+def test_budgeted_update():
+    cm = CoroutineManager()
+    log = []
+
+    async def sleeper(i):
+        await cm.sleep(1)
+        log.append(i)
+
+    for i in range(10):
+        cm.start(sleeper(i))
+    cm.update(1, max_resumes=4)
+    assert log == [0, 1, 2, 3]
+    assert cm.backlog() == 6
+    # The backlog is resumed first, in order.
+    cm.update(0, max_resumes=3)
+    assert log == list(range(7))
+    cm.update(0, deadline_ns=0)
+    assert cm.backlog() == 3
+    cm.update(0)
+    assert log == list(range(10))
+    assert cm.backlog() == 0
+
+    with pytest.raises(ValueError):
+        cm.update(0, max_resumes=-1)
+
+
+def test_priorities():
+    cm = CoroutineManager()
+    log = []
+
+    async def waiter(name):
+        await cm.wait_for_event('foo')
+        log.append(name)
+        await cm.sleep(1)
+        log.append(name)
+
+    cm.start(waiter('low'), priority=-1)
+    cm.start(waiter('default'))
+    critical = cm.start(waiter('critical'), priority=10)
+    cm.start(waiter('high'), priority=1)
+    assert critical.priority == 10
+
+    # All the waiters are woken up before any of them is resumed.
+    cm.event_manager.raise_event('foo')
+    assert log == ['critical', 'high', 'default', 'low']
+
+    log.clear()
+    cm.update(1, max_resumes=2)
+    assert log == ['critical', 'high']
+    assert cm.backlog() == 2
+    cm.update(0)
+    assert log == ['critical', 'high', 'default', 'low']
+
+    # Likewise for a batch raised from outside.
+    log.clear()
+    cm.start(waiter('low'), priority=-1)
+    cm.start(waiter('critical'), priority=10)
+    cm.event_manager.raise_events(['bar', 'foo'])
+    assert log == ['critical', 'low']
+
+
+def test_budgeted_update_backlog_is_kept_for_the_next_update():
+    cm = CoroutineManager()
+    log = []
+
+    async def waiter(i):
+        await cm.wait_for_event('foo')
+        log.append(i)
+
+    async def started():
+        log.append('started')
+
+    tasks = [cm.start(waiter(i)) for i in range(100)]
+    cm.add_delayed_event(0, 'foo')
+    cm.update(0, max_resumes=10)
+    assert log == list(range(10))
+    # The calls from outside of the coroutines do not resume the ones left over.
+    cm.event_manager.raise_event('unrelated')
+    cm.start(started())
+    tasks[-1].cancel()
+    assert len(log) == 10
+    assert cm.backlog() == 91
+    cm.update(0, max_resumes=10)
+    assert log == list(range(20))
+    cm.update(0)
+    assert log == list(range(99)) + ['started']
+    assert tasks[-1].cancelled
+    assert cm.backlog() == 0
+    # Once the backlog has been worked off, the coroutines are run right away again.
+    cm.start(started())
+    assert log[-1] == 'started' and len(log) == 101
+
+def test_gather_and_wait_for_all_keep_the_priority():
+    cm = CoroutineManager()
+    log = []
+
+    async def helper(name):
+        await cm.wait_for_event('foo')
+        log.append(name)
+
+    async def gathering():
+        await cm.gather([helper('gathered'), helper('gathered')])
+        log.append('gathering')
+
+    async def gathering_with_priority():
+        await cm.gather([helper('explicit')], priority=-2)
+
+    async def waiting_for_all():
+        await cm.wait_for_all(['foo', 'bar'])
+        log.append('waiting for all')
+
+    cm.start(helper('low'), priority=-1)
+    cm.start(gathering_with_priority(), priority=10)
+    cm.start(gathering(), priority=10)
+    cm.start(waiting_for_all(), priority=5)
+    cm.event_manager.raise_event('bar')
+    cm.event_manager.raise_event('foo')
+    assert log == ['gathered', 'gathered', 'gathering', 'waiting for all', 'low', 'explicit']
+
+def test_coroutine_exception_does_not_cut_off_other_waiters():
+    cm = CoroutineManager()
+    log = []
+
+    async def failing():
+        await cm.wait_for_event('go')
+        raise RuntimeError('failing')
+
+    async def waiter():
+        await cm.wait_for_event('go')
+        log.append('woken')
+
+    cm.start(failing())
+    cm.start(waiter())
+    cm.event_manager.subscribe('go', lambda event: log.append('subscriber'))
+    with pytest.raises(RuntimeError):
+        cm.event_manager.raise_event('go')
+    assert log == ['subscriber']
+    assert cm.backlog() == 1
+    cm.update(0)
+    assert log == ['subscriber', 'woken']
+
+
+def test_timer_slack():
+    cm = CoroutineManager(timer_slack=1)
+    log = []
+
+    async def sleeper(i):
+        await cm.sleep(0.1 * i)
+        log.append((i, cm.elapsed_time()))
+
+    for i in range(1, 10):
+        cm.start(sleeper(i))
+    timer = cm.add_delayed_event(0.5, 'foo')
+    exact = cm.add_delayed_event(0.5, 'bar', slack=0)
+    cm.event_manager.subscribe('foo', lambda event: log.append(event))
+    assert timer.deadline == 1 and exact.deadline == 0.5
+    # A single bucket, plus the exact timer.
+    assert len(cm._delayed_events) == 2
+    cm.update(0.5)
+    assert log == []
+    cm.update(0.5)
+    # The subscriber is called right away, while the woken up coroutines are resumed afterwards.
+    assert log == ['foo'] + [(i, 1) for i in range(1, 10)]
+    assert cm._delayed_events == [] and cm._timer_buckets == {}
+
+    with pytest.raises(ValueError):
+        cm.add_delayed_event(1, 'foo', slack=-1)
+    with pytest.raises(ValueError):
+        CoroutineManager(timer_slack=-1)
+
+
+def test_timer_slack_keeps_decimal_multiples():
+    for duration in [0.3, 0.6, 1.2, 2.4, 2.9]:
+        cm = CoroutineManager(timer_slack=0.1)
+        log = []
+
+        async def sleeper():
+            await cm.sleep(duration)
+            log.append(cm.elapsed_time())
+
+        cm.start(sleeper())
+        timer = cm.add_delayed_event(duration - 0.05, 'foo')
+        assert timer.deadline == duration
+        cm.update(duration)
+        assert log == [duration]
+
+def test_cancelled_bucketed_delayed_events_are_compacted():
+    cm = CoroutineManager(timer_slack=10)
+    timers = [cm.add_delayed_event(delay=i, event=i) for i in range(1, 1001)]
+    assert len(cm._delayed_events) == 100
+    for timer in timers[:900]:
+        timer.cancel()
+    assert len(cm._delayed_events) < 100
+    entries = [entry for bucket in cm._timer_buckets.values() for entry in bucket.entries]
+    assert len(entries) < 300
+    assert sum(entry[2].pending for entry in entries) == 100
+    arr = []
+    cm.event_manager.multisubscribe(selector=lambda event: True, subscriber=arr.append)
+    cm.update(1000)
+    assert arr == [901]
+    assert cm._num_cancelled_delayed_events == 0
+    assert cm._num_bucketed_delayed_events == 0
+
+
+def test_cancelled_timer_bucket_does_not_delay():
+    cm = CoroutineManager(timer_slack=1.0)
+    log = []
+
+    async def waiter():
+        log.append(await cm.wait_for_any(['x'], timeout=100))
+
+    cm.start(waiter())
+    assert cm.next_deadline() == 100.0
+    cm.event_manager.raise_event('x')
+    assert log == [('x', None)]
+    # The bucket containing only the cancelled timeout is dropped.
+    assert cm.next_deadline() is None
+    assert cm._timer_buckets == {} and cm._num_cancelled_delayed_events == 0
+    cm.run_until_idle()
+    assert cm.elapsed_time() == 0
+
+
+def test_cancel_timers_while_handling_timer_bucket():
+    cm = CoroutineManager(timer_slack=1.0)
+    timers = [cm.add_delayed_event(1, ('timer', i)) for i in range(300)]
+    log = []
+
+    def cancel_rest(event):
+        log.append(event)
+        for timer in timers[1:]:
+            timer.cancel()
+
+    cm.event_manager.subscribe(('timer', 0), cancel_rest)
+    cm.update(1)
+    assert log == [('timer', 0)]
+    assert cm._num_cancelled_delayed_events == 0
+    assert cm._num_bucketed_delayed_events == 0
+    assert cm._delayed_events == [] and cm._timer_buckets == {}
+
+
+def test_timer_slack_fifo_order():
+    cm = CoroutineManager()
+    log = []
+    for event in 'abcd':
+        cm.event_manager.subscribe(event, log.append)
+    cm.add_delayed_event(1, 'a')
+    cm.add_delayed_event(0.5, 'b', slack=1)
+    cm.add_delayed_event(1, 'c')
+    cm.add_delayed_event(0.7, 'd', slack=1)
+    cm.update(1)
+    assert log == ['a', 'b', 'c', 'd']
@@ -1,4 +1,10 @@
-from coman.event_manager import EventManager
+from coman.event_manager import EventManager, EventSet, UniqueEvent, TuplePattern, FieldPattern, ANY, Subscription
+from coman.instrumentation import Instrumentation
+
+import pytest
+import threading
+from collections import namedtuple
+from dataclasses import dataclass
 
 
 def make_functions(arr, em):
@@ -131,3 +137,564 @@ def test_multisubscribe():
         ('baz', 'hello'),
         ('quux', 'hello'),
     ]
+
+
+def test_multisubscribe_event_set():
+    arr = []
+    em = EventManager()
+
+    foo, bar, baz, quux = make_functions(arr, em)
+
+    u = em.unique_event()
+    em.multisubscribe(EventSet(['a', 'b', u]), foo)
+    em.multisubscribe(EventSet(['b', 'c']), bar)
+    em.multisubscribe(sel_string, baz)
+    em.raise_event('x')
+    assert arr == [('baz', 'x')]
+    arr.clear()
+    em.raise_event('b')
+    assert set(arr) == {('foo', 'b'), ('bar', 'b')}
+    arr.clear()
+    em.raise_event('a')
+    em.raise_event('c')
+    em.raise_event(u)
+    assert arr == []
+    assert em._indexed_multisubscriptions == {}
+
+    def resubscriber(event):
+        arr.append(('resubscriber', event))
+        em.multisubscribe(EventSet([event]), foo)
+
+    em.multisubscribe(EventSet([u, 'a']), resubscriber)
+    em.raise_event(u)
+    assert arr == [('resubscriber', u)]
+    em.raise_event('a')
+    assert arr == [('resubscriber', u)]
+    em.raise_event(u)
+    assert arr == [('resubscriber', u), ('foo', u)]
+
+
+def test_multisubscribe_event_set_nested_raise():
+    arr = []
+    em = EventManager()
+
+    def raiser(event):
+        arr.append(('raiser', event))
+        em.raise_event('b')
+
+    def once(event):
+        arr.append(('once', event))
+
+    em.multisubscribe(EventSet(['a']), raiser)
+    em.multisubscribe(EventSet(['a', 'b']), once)
+    em.raise_event('a')
+    assert arr == [('raiser', 'a'), ('once', 'b')]
+
+
+def test_raise_events_matches_sequential_raising():
+    def run(raise_all):
+        arr = []
+        em = EventManager()
+        foo, bar, baz, quux = make_functions(arr, em)
+
+        def multiquux(event):
+            arr.append(('multiquux', event))
+            em.multisubscribe(sel_greater_than_5, foo)
+
+        def indexed_resubscriber(event):
+            arr.append(('indexed', event))
+            em.multisubscribe(sel_string, bar)
+
+        em.subscribe(42, quux)
+        em.subscribe(7, foo)
+        em.multisubscribe(sel_greater_than_5, multiquux)
+        em.multisubscribe(sel_string, baz)
+        em.multisubscribe(sel_none, baz)
+        em.multisubscribe(EventSet([1, 'x']), indexed_resubscriber)
+        raise_all(em, [1, 7, 'x', 42, 42, 8, 'y', 0])
+        return arr
+
+    def raise_sequentially(em, events):
+        for event in events:
+            em.raise_event(event)
+
+    sequential = run(raise_sequentially)
+    batched = run(lambda em, events: em.raise_events(iter(events)))
+    assert batched == sequential
+    assert batched == [
+        ('indexed', 1),
+        ('foo', 7),
+        ('multiquux', 7),
+        ('baz', 'x'),
+        ('bar', 'x'),
+        ('quux', 42),
+        ('foo', 42),
+        ('baz', 42),
+    ]
+
+
+def test_raise_events_selector_calls():
+    calls = []
+    arr = []
+    em = EventManager()
+
+    def selector(event):
+        calls.append(event)
+        return event == 'b'
+
+    em.multisubscribe(selector, arr.append)
+    em.raise_events(['a', 'b', 'c', 'b'])
+    assert calls == ['a', 'b']
+    assert arr == ['b']
+
+
+def test_raise_events_subscriber_exception():
+    arr = []
+    em = EventManager()
+
+    def fail(event):
+        raise RuntimeError(event)
+
+    em.multisubscribe(lambda event: event == 'c', arr.append)
+    em.multisubscribe(lambda event: event == 'b', fail)
+    em.multisubscribe(lambda event: event == 'b', arr.append)
+    em.subscribe('b', fail)
+    with pytest.raises(RuntimeError):
+        em.raise_events(['a', 'b'])
+    # The multisubscriptions that have not been called are kept.
+    em.raise_event('c')
+    assert arr == ['c']
+
+    with pytest.raises(RuntimeError):
+        em.raise_event('b')
+    em.raise_event('b')
+    assert arr == ['c', 'b']
+    assert em._multisubscriptions == {}
+
+
+def test_raise_events_resubscribe_to_unmatched_selector():
+    arr = []
+    em = EventManager()
+
+    def selector(event):
+        return event == 'z'
+
+    em.multisubscribe(selector, lambda event: arr.append('old'))
+    em.subscribe('b', lambda event: em.multisubscribe(selector, lambda event: arr.append('new')))
+    em.raise_events(['a', 'b', 'c'])
+    assert len(em._multisubscriptions) == 1
+    em.raise_event('z')
+    assert arr == ['old', 'new']
+
+
+def test_raise_events_nested_raise():
+    def run(raise_all):
+        arr = []
+        em = EventManager()
+        em.multisubscribe(lambda event: event == 'c', lambda event: arr.append(('c', event)))
+        em.multisubscribe(lambda event: event in ('c', 'd'), lambda event: arr.append(('c or d', event)))
+        em.multisubscribe(lambda event: event == 'x', lambda event: arr.append(('x', event)))
+        em.subscribe('b', lambda event: em.raise_event('c'))
+        em.subscribe('c', lambda event: em.raise_event('x'))
+        raise_all(em, ['a', 'b', 'd', 'x'])
+        return arr, len(em._multisubscriptions)
+
+    def raise_sequentially(em, events):
+        for event in events:
+            em.raise_event(event)
+
+    sequential = run(raise_sequentially)
+    batched = run(lambda em, events: em.raise_events(events))
+    assert batched == sequential
+    assert batched == ([('x', 'x'), ('c', 'c'), ('c or d', 'c')], 0)
+
+
+def test_post_event_from_threads():
+    arr = []
+    em = EventManager()
+    num_threads = 4
+    num_events = 1000
+
+    for i in range(num_threads):
+        for j in range(num_events):
+            em.subscribe((i, j), arr.append)
+
+    def producer(i):
+        for j in range(num_events):
+            em.post_event((i, j))
+
+    threads = [threading.Thread(target=producer, args=(i,)) for i in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert arr == []
+    assert em.raise_posted_events() == num_threads * num_events
+    assert em.raise_posted_events() == 0
+    assert sorted(arr) == [(i, j) for i in range(num_threads) for j in range(num_events)]
+    for i in range(num_threads):
+        assert [event for event in arr if event[0] == i] == [(i, j) for j in range(num_events)]
+
+
+def test_post_callback():
+    arr = []
+    em = EventManager()
+    em.set_post_callback(lambda: arr.append('posted'))
+    em.subscribe('a', arr.append)
+    em.post_event('a')
+    assert arr == ['posted']
+    em.raise_posted_events()
+    assert arr == ['posted', 'a']
+
+
+def test_raise_posted_events_keeps_the_rest_when_a_subscriber_raises():
+    arr = []
+    em = EventManager()
+
+    def fail(event):
+        raise KeyError(event)
+
+    em.subscribe('a', fail)
+    em.subscribe('b', arr.append)
+    em.subscribe('c', arr.append)
+    em.post_event('a')
+    em.post_event('b')
+    em.post_event('c')
+    with pytest.raises(KeyError):
+        em.raise_posted_events()
+    assert arr == []
+    em.post_event('d')
+    em.subscribe('d', arr.append)
+    assert em.raise_posted_events() == 3
+    assert arr == ['b', 'c', 'd']
+
+
+def test_unique_event_hash():
+    em = EventManager()
+    a = em.unique_event()
+    assert hash(a) == hash(UniqueEvent(a._nonce))
+    assert a == UniqueEvent(a._nonce)
+    assert hash(a) != hash(('UniqueEvent', a._nonce))
+    assert not hasattr(a, '__dict__')
+
+
+@dataclass(frozen=True)
+class UnitDied:
+    unit: str
+    team: int
+
+
+def test_tuple_pattern():
+    em = EventManager()
+    log = []
+    em.multisubscribe(TuplePattern('unit_died', ANY, 3), lambda event: log.append(('team 3', event)))
+    em.multisubscribe(TuplePattern('unit_died'), lambda event: log.append(('any', event)))
+    em.multisubscribe(TuplePattern('unit_died', 'archer'), lambda event: log.append(('archer', event)))
+    assert TuplePattern('unit_died', ANY, 3)(('unit_died', 'knight', 3, 'poisoned'))
+    assert not TuplePattern('unit_died', ANY, 3)(('unit_died', 'knight'))
+
+    em.raise_event('unit_died')
+    em.raise_event(('unit_died', 'knight', 2))
+    em.raise_event(('unit_died', 'knight', 3, 'poisoned'))
+    em.raise_event(('unit_died', 'archer', 3))
+    assert log == [
+        ('any', ('unit_died', 'knight', 2)),
+        ('team 3', ('unit_died', 'knight', 3, 'poisoned')),
+        ('archer', ('unit_died', 'archer', 3)),
+    ]
+    assert em._pattern_multisubscriptions == {}
+
+
+def test_tuple_pattern_named_tuple():
+    Point = namedtuple('Point', ['x', 'y'])
+    em = EventManager()
+    log = []
+    em.multisubscribe(TuplePattern(ANY, 2), log.append)
+    em.raise_event(Point(1, 2))
+    assert log == [Point(1, 2)]
+
+
+def test_field_pattern():
+    em = EventManager()
+    log = []
+    em.multisubscribe(FieldPattern(UnitDied, team=3), lambda event: log.append(('team 3', event)))
+    em.multisubscribe(FieldPattern(UnitDied, team=3, unit='archer'), lambda event: log.append(('archer', event)))
+    em.multisubscribe(FieldPattern(UnitDied), lambda event: log.append(('any', event)))
+    assert FieldPattern(UnitDied, team=3)(UnitDied('knight', 3))
+    assert not FieldPattern(UnitDied, team=3)(('knight', 3))
+
+    em.raise_event(('unit_died', 'archer', 3))
+    em.raise_event(UnitDied('archer', 3))
+    assert sorted(log) == [
+        ('any', UnitDied('archer', 3)),
+        ('archer', UnitDied('archer', 3)),
+        ('team 3', UnitDied('archer', 3)),
+    ]
+    assert em._pattern_multisubscriptions == {}
+
+
+def test_pattern_resubscription():
+    em = EventManager()
+    log = []
+
+    def subscriber(event):
+        log.append(event)
+        if len(log) < 3:
+            em.multisubscribe(TuplePattern('tick'), subscriber)
+            em.raise_event(('tick', len(log)))
+
+    em.multisubscribe(TuplePattern('tick'), subscriber)
+    em.raise_events([('tick', 0), ('tock', 0)])
+    assert log == [('tick', 0), ('tick', 1), ('tick', 2)]
+
+
+def test_subscribe_persistent():
+    em = EventManager()
+    log = []
+    subscription = em.subscribe_persistent('foo', lambda event: log.append(1))
+    other = None
+
+    def unsubscribing(event):
+        log.append(2)
+        # Takes effect immediately, even for the following subscribers.
+        other.unsubscribe()
+
+    em.subscribe_persistent('foo', unsubscribing)
+    other = em.subscribe_persistent('foo', lambda event: log.append(3))
+    em.raise_event('foo')
+    em.raise_events(['foo', 'bar', 'foo'])
+    assert log == [1, 2, 1, 2, 1, 2]
+    assert not other.active
+    assert not other.unsubscribe()
+
+    assert subscription.unsubscribe()
+    em.raise_event('foo')
+    assert log == [1, 2, 1, 2, 1, 2, 2]
+    assert subscription.event == 'foo'
+
+
+def test_subscribe_persistent_while_raising():
+    em = EventManager()
+    log = []
+    added = []
+
+    def subscribing(event):
+        log.append('subscribing')
+        if len(added) == 0:
+            # Not called until the next time the event is raised.
+            added.append(em.subscribe_persistent('foo', lambda event: log.append('added')))
+
+    subscriptions = [em.subscribe_persistent('foo', lambda event, i=i: log.append(i)) for i in range(3)]
+    em.subscribe_persistent('foo', subscribing)
+    em.raise_event('foo')
+    assert log == [0, 1, 2, 'subscribing']
+    log.clear()
+    assert subscriptions[1].unsubscribe()
+    em.raise_event('foo')
+    assert log == [0, 2, 'subscribing', 'added']
+    for subscription in subscriptions + added:
+        subscription.unsubscribe()
+    log.clear()
+    em.raise_event('foo')
+    assert log == ['subscribing']
+
+
+def test_unsubscribe():
+    em = EventManager()
+    log = []
+    subscription = em.subscribe('foo', lambda event: log.append('plain'))
+    multisubscriptions = [
+        em.multisubscribe(lambda event: event == 'foo', lambda event: log.append('scanned')),
+        em.multisubscribe(EventSet(['foo', 'bar']), lambda event: log.append('indexed')),
+        em.multisubscribe(TuplePattern('foo'), lambda event: log.append('pattern')),
+    ]
+    assert subscription.unsubscribe()
+    assert not subscription.unsubscribe()
+    for multisubscription in multisubscriptions:
+        assert multisubscription.unsubscribe()
+    assert em._subscriptions == {}
+    assert em._indexed_multisubscriptions == {}
+    assert em._pattern_multisubscriptions == {}
+    em.raise_event('foo')
+    em.raise_event(('foo',))
+    assert log == []
+    assert em._multisubscriptions == {}
+
+    fired = em.subscribe('foo', log.append)
+    em.raise_event('foo')
+    assert not fired.active
+    assert not fired.unsubscribe()
+
+
+@pytest.mark.parametrize('interned', [False, True])
+def test_subscriber_exception_keeps_uncalled_subscriptions(interned):
+    em = EventManager()
+    if interned:
+        em.intern('foo')
+    log = []
+
+    def fail(event):
+        em.subscribe('foo', lambda event: log.append('new'))
+        raise RuntimeError(event)
+
+    em.subscribe('foo', fail)
+    kept = em.subscribe('foo', lambda event: log.append('kept'))
+    cancelled = em.subscribe('foo', lambda event: log.append('cancelled'))
+    with pytest.raises(RuntimeError):
+        em.raise_event('foo')
+    assert kept.active
+    assert cancelled.unsubscribe()
+    em.raise_event('foo')
+    assert log == ['kept', 'new']
+    assert em._subscriptions == {}
+
+
+@pytest.mark.parametrize('selector, event', [
+    (EventSet(['x', 'y']), 'x'),
+    (TuplePattern('a'), ('a', 1)),
+    (FieldPattern(UnitDied, team=1), UnitDied('u', 1)),
+])
+def test_subscriber_exception_keeps_uncalled_multisubscriptions(selector, event):
+    em = EventManager()
+    log = []
+
+    def fail(event):
+        em.multisubscribe(selector, lambda event: log.append('new'))
+        raise RuntimeError(event)
+
+    em.multisubscribe(selector, fail)
+    kept = em.multisubscribe(selector, lambda event: log.append('kept'))
+    cancelled = em.multisubscribe(selector, lambda event: log.append('cancelled'))
+    with pytest.raises(RuntimeError):
+        em.raise_event(event)
+    assert kept.active
+    assert cancelled.unsubscribe()
+    em.raise_event(event)
+    assert log == ['kept', 'new']
+    assert em._indexed_multisubscriptions == {} and em._pattern_multisubscriptions == {}
+
+def test_subscription_is_abstract():
+    with pytest.raises(TypeError):
+        Subscription(EventManager(), 'foo', print)
+
+
+def test_unsubscribe_while_raising():
+    em = EventManager()
+    log = []
+    subscriptions = []
+
+    def cancelling(event):
+        log.append(event)
+        for subscription in subscriptions:
+            subscription.unsubscribe()
+
+    em.subscribe('foo', cancelling)
+    subscriptions.append(em.subscribe('foo', log.append))
+    em.multisubscribe(lambda event: True, cancelling)
+    subscriptions.append(em.multisubscribe(lambda event: True, log.append))
+    em.raise_event('foo')
+    assert log == ['foo', 'foo']
+
+
+def test_interned_events():
+    em = EventManager()
+    log = []
+    early = em.subscribe(('foo', 1), lambda event: log.append(('early', event)))
+    foo = em.intern(('foo', 1))
+    assert em.intern(('foo', 1)) == foo
+    assert em.event_of(foo) == ('foo', 1)
+    bar = em.intern('bar')
+    assert bar == foo + 1
+
+    em.subscribe_id(foo, lambda event: log.append(('by id', event)))
+    em.subscribe(('foo', 1), lambda event: log.append(('by event', em.payload)))
+    em.multisubscribe(TuplePattern('foo'), lambda event: log.append(('pattern', event)))
+    assert em._subscriptions == {}
+    em.raise_id(foo, 'payload')
+    assert log == [
+        ('early', ('foo', 1)),
+        ('by id', ('foo', 1)),
+        ('by event', 'payload'),
+        ('pattern', ('foo', 1)),
+    ]
+    assert not early.active
+
+    log.clear()
+    subscription = em.subscribe_id(foo, log.append)
+    em.subscribe_id(bar, log.append)
+    assert subscription.unsubscribe()
+    em.raise_event(('foo', 1))
+    em.raise_id(bar)
+    assert log == ['bar']
+    assert em._id_subscriptions == [None, None]
+
+
+def test_multisubscriptions_grouped_by_selector():
+    em = EventManager()
+    calls = []
+    log = []
+
+    def selector(event):
+        calls.append(event)
+        return event == 'foo'
+
+    for i in range(5):
+        em.multisubscribe(selector, lambda event, i=i: log.append(i))
+    cancelled = em.multisubscribe(selector, lambda event: log.append('cancelled'))
+    assert cancelled.unsubscribe()
+    # Grouped by the declared key rather than by the selector.
+    em.multisubscribe(lambda event: calls.append(event) or event == 'bar', lambda event: log.append('a'), key='bar')
+    em.multisubscribe(lambda event: calls.append(event) or event == 'bar', lambda event: log.append('b'), key='bar')
+    assert len(em._multisubscriptions) == 2
+
+    em.raise_event('bar')
+    assert calls == ['bar', 'bar']
+    assert log == ['a', 'b']
+    em.raise_events(['baz', 'foo'])
+    assert calls == ['bar', 'bar', 'baz', 'foo']
+    assert log == ['a', 'b', 0, 1, 2, 3, 4]
+    assert em._multisubscriptions == {}
+
+
+def test_multisubscriptions_grouped_while_raising():
+    em = EventManager()
+    log = []
+
+    def selector(event):
+        return event == 'foo'
+
+    def resubscribe(event):
+        log.append('first')
+        # Joins the group which is retained after the scan.
+        em.multisubscribe(selector, lambda event: log.append('joined'))
+
+    em.multisubscribe(lambda event: event == 'bar', resubscribe)
+    em.multisubscribe(selector, lambda event: log.append('old'))
+    em.raise_event('bar')
+    assert len(em._multisubscriptions) == 1
+    em.raise_event('foo')
+    assert log == ['first', 'old', 'joined']
+
+
+class UnhashableSelector(list):
+    def __call__(self, event):
+        return event in self
+
+
+@pytest.mark.parametrize('instrumented', [False, True])
+def test_multisubscribe_unhashable_selector(instrumented):
+    em = EventManager()
+    if instrumented:
+        em._instrument(Instrumentation())
+    log = []
+    em.multisubscribe(UnhashableSelector(['foo']), lambda event: log.append(1))
+    em.multisubscribe(UnhashableSelector(['foo']), lambda event: log.append(2))
+    # Unhashable selectors are not grouped, even if they are equal.
+    assert len(em._multisubscriptions) == 2
+    with pytest.raises(TypeError):
+        em.multisubscribe(UnhashableSelector(['foo']), log.append, key=['foo'])
+    em.multisubscribe(UnhashableSelector(['foo']), lambda event: log.append(3), key='foo')
+    em.raise_event('foo')
+    assert log == [1, 2, 3]
+    assert em._multisubscriptions == {}
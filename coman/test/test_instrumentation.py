@@ -0,0 +1,107 @@
+from coman.coroutine_manager import CoroutineManager
+from coman.instrumentation import Instrumentation
+
+
+def test_instrumentation_counters():
+    cm = CoroutineManager()
+    resumed = []
+    subscriber_calls = []
+    updates = []
+    instrumentation = cm.enable_instrumentation(Instrumentation(
+        on_resume=lambda coro, duration_ns: resumed.append(coro.__qualname__),
+        on_subscriber_call=lambda subscriber, event, duration_ns: subscriber_calls.append(event),
+        on_update=lambda time_delta, duration_ns: updates.append(time_delta),
+    ))
+    assert cm.instrumentation is instrumentation
+
+    async def waiter():
+        await cm.wait_for_event('foo')
+        await cm.sleep(1)
+
+    def on_baz(event):
+        pass
+
+    cm.start(waiter())
+    cm.event_manager.subscribe('baz', on_baz)
+    cm.event_manager.multisubscribe(lambda event: event == 'bar', on_baz)
+    snapshot = instrumentation.snapshot()
+    assert snapshot.timer_heap_size == 0
+    cm.event_manager.raise_event('foo')
+    assert instrumentation.snapshot().timer_heap_size == 1
+    cm.event_manager.raise_event('baz')
+    cm.update(1)
+    cm.event_manager.post_event('qux')
+    assert instrumentation.snapshot().posted_events == 1
+    cm.update(0)
+
+    snapshot = instrumentation.snapshot()
+    name = waiter.__qualname__
+    assert snapshot.resumes[name] == 3
+    assert snapshot.resume_time_ns[name] >= 0
+    assert snapshot.subscriber_calls[on_baz.__qualname__] == 1
+    assert sum(snapshot.subscriber_calls.values()) == 2
+    # The selector has been evaluated for 'foo', 'baz' and 'qux'.
+    assert snapshot.selector_evaluations == 3
+    assert snapshot.updates == 2
+    assert snapshot.max_ready_queue_depth >= 1
+    assert snapshot.timer_heap_size == 0
+    assert snapshot.posted_events == 0
+    assert resumed == [name, name, name]
+    assert subscriber_calls == ['foo', 'baz']
+    assert updates == [1, 0]
+
+    instrumentation.reset()
+    assert instrumentation.snapshot().resumes == {}
+
+
+def test_instrumentation_reset():
+    cm = CoroutineManager()
+    instrumentation = cm.enable_instrumentation()
+
+    async def sleeper():
+        await cm.sleep(1)
+
+    def on_foo(event):
+        pass
+
+    cm.start(sleeper())
+    cm.event_manager.subscribe('foo', on_foo)
+    instrumentation.reset()
+    # The counters keep being updated after a reset.
+    cm.update(1)
+    cm.event_manager.raise_event('foo')
+    snapshot = instrumentation.snapshot()
+    assert snapshot.resumes == {sleeper.__qualname__: 1}
+    assert snapshot.subscriber_calls == {on_foo.__qualname__: 1}
+
+
+def test_instrumentation_disable():
+    cm = CoroutineManager()
+    instrumentation = cm.enable_instrumentation()
+    cm.disable_instrumentation()
+    assert cm.instrumentation is None
+    assert '_step' not in cm.__dict__
+    assert 'update' not in cm.__dict__
+    assert 'subscribe' not in cm.event_manager.__dict__
+
+    async def waiter():
+        await cm.wait_for_event('foo')
+
+    cm.start(waiter())
+    cm.event_manager.raise_event('foo')
+    cm.update(1)
+    snapshot = instrumentation.snapshot()
+    assert snapshot.resumes == {}
+    assert snapshot.updates == 0
+
+
+def test_instrumentation_timer_heap_size_with_slack():
+    cm = CoroutineManager(timer_slack=1)
+    instrumentation = cm.enable_instrumentation()
+    timers = [cm.add_delayed_event(0.1 * i, i) for i in range(1, 4)]
+    cm.add_delayed_event(0.5, 'exact', slack=0)
+    assert instrumentation.snapshot().timer_heap_size == 4
+    timers[0].cancel()
+    assert instrumentation.snapshot().timer_heap_size == 3
+    cm.update(1)
+    assert instrumentation.snapshot().timer_heap_size == 0
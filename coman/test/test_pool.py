@@ -0,0 +1,64 @@
+from coman.pool import CoroutineManagerPool, ShardError, default_shard_of
+
+import pytest
+
+
+async def relay(shard, agent_id, num_agents):
+    await shard.coroutine_manager.wait_for_event(('token', agent_id))
+    shard.report((agent_id, shard.index))
+    if agent_id + 1 < num_agents:
+        shard.raise_event(key=agent_id + 1, event=('token', agent_id + 1))
+
+
+async def sleeper(shard, duration):
+    await shard.coroutine_manager.sleep(duration)
+    shard.report(('slept', shard.index, duration))
+
+
+async def failing(shard):
+    await shard.coroutine_manager.sleep(1)
+    raise RuntimeError('failed')
+
+
+def test_default_shard_of():
+    assert default_shard_of(5, 3) == 2
+    assert default_shard_of(('unit', 3), 4) == default_shard_of(('unit', 3), 4)
+    assert 0 <= default_shard_of('key', 7) < 7
+
+
+def test_pool_forwards_events_between_shards():
+    num_agents = 6
+    with CoroutineManagerPool(num_shards=3) as pool:
+        for agent_id in range(num_agents):
+            pool.start(agent_id, relay, agent_id, num_agents)
+        pool.raise_event(key=0, event=('token', 0))
+        pool.update(0)
+        reports = pool.reports()
+        assert pool.reports() == []
+
+    # The token travels through all the agents (and shards) within a single update.
+    assert reports == [(agent_id, agent_id % 3) for agent_id in range(num_agents)]
+
+
+def test_pool_update_advances_all_shards():
+    with CoroutineManagerPool(num_shards=2) as pool:
+        for duration in range(1, 5):
+            pool.start(duration, sleeper, duration)
+        pool.update(2)
+        assert sorted(pool.reports()) == [('slept', 0, 2), ('slept', 1, 1)]
+        pool.update(2)
+        assert sorted(pool.reports()) == [('slept', 0, 4), ('slept', 1, 3)]
+
+
+def test_pool_reports_errors():
+    with CoroutineManagerPool(num_shards=2) as pool:
+        pool.start(1, failing)
+        pool.update(0.5)
+        with pytest.raises(ShardError, match='failed'):
+            pool.update(0.5)
+        pool.update(1)
+
+
+def test_pool_invalid_number_of_shards():
+    with pytest.raises(ValueError):
+        CoroutineManagerPool(num_shards=0)
@@ -0,0 +1,83 @@
+from coman.coroutine_manager import CoroutineManager
+from coman.realtime import RealTimeDriver
+
+import threading
+import time
+
+
+def test_realtime_driver_sleep():
+    cm = CoroutineManager()
+    driver = RealTimeDriver(cm)
+    log = []
+
+    async def ticker():
+        for _ in range(5):
+            await cm.sleep(0.01)
+            log.append(cm.elapsed_time())
+
+    cm.start(ticker())
+    start = time.monotonic()
+    driver.run(until=0.1)
+    duration = time.monotonic() - start
+    assert 0.09 <= duration < 1
+    # The delayed events are handled at their exact deadlines.
+    assert log == [0.01, 0.01 + 0.01, 0.01 + 0.01 + 0.01, 0.01 + 0.01 + 0.01 + 0.01, 0.01 + 0.01 + 0.01 + 0.01 + 0.01]
+    assert cm.elapsed_time() == 0.1
+    statistics = driver.statistics()
+    assert statistics.ticks >= 5
+    assert statistics.max_lateness_ns >= statistics.mean_lateness_ns >= 0
+    driver.reset_statistics()
+    assert driver.statistics().ticks == 0
+
+
+def test_realtime_driver_wakes_up_on_posted_events():
+    cm = CoroutineManager()
+    driver = RealTimeDriver(cm)
+    log = []
+
+    async def waiter():
+        log.append(await cm.wait_for_event('foo'))
+        driver.stop()
+
+    def post():
+        time.sleep(0.02)
+        cm.event_manager.post_event('foo')
+
+    cm.start(waiter())
+    thread = threading.Thread(target=post)
+    start = time.monotonic()
+    thread.start()
+    # There are no delayed events, so the driver sleeps until the event is posted.
+    driver.run()
+    thread.join()
+    assert time.monotonic() - start < 1
+    assert log == [('foo', None)]
+    assert not driver.running
+
+
+def test_realtime_driver_sleep_after_posted_event():
+    cm = CoroutineManager()
+    driver = RealTimeDriver(cm)
+    log = []
+
+    async def waiter():
+        await cm.wait_for_event('go')
+        log.append(cm.elapsed_time())
+        await cm.sleep(0.05)
+        log.append(cm.elapsed_time())
+        driver.stop()
+
+    def post():
+        time.sleep(0.1)
+        cm.event_manager.post_event('go')
+
+    cm.start(waiter())
+    thread = threading.Thread(target=post)
+    thread.start()
+    start = time.monotonic()
+    driver.run()
+    thread.join()
+    woken_at, slept_until = log
+    assert woken_at >= 0.09
+    assert slept_until == woken_at + 0.05
+    assert time.monotonic() - start >= 0.14
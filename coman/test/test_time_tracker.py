@@ -67,3 +67,11 @@ def test_future_time_point_has_passed():
     assert a.has_passed()
     assert b.has_passed()
     assert c.has_passed()
+
+
+def test_time_tracker_advance_to():
+    tt = TimeTracker()
+    tt.advance_to(0.3)
+    assert tt.elapsed_time() == 0.3
+    tt.advance_to(0.1)
+    assert tt.elapsed_time() == 0.3
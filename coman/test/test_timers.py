@@ -0,0 +1,77 @@
+from coman.timers import Timer, TimingWheel
+
+import random
+
+import pytest
+
+
+def make_timer(wheel, deadline, sequence):
+    timer = Timer(wheel, event=('event', sequence), deadline=deadline, sequence=sequence)
+    wheel.schedule(timer)
+    return timer
+
+
+def test_timing_wheel_invalid_parameters():
+    with pytest.raises(ValueError):
+        TimingWheel(resolution=0)
+    with pytest.raises(ValueError):
+        TimingWheel(levels=0)
+
+
+def test_timing_wheel_advance():
+    wheel = TimingWheel(resolution=1, levels=2, slot_bits=2)
+    timers = [make_timer(wheel, deadline, i) for i, deadline in enumerate([3, 0.5, 100, 17, 3, 16.5, 2])]
+    assert len(wheel) == 7
+    assert wheel.next_deadline() == 0.5
+
+    assert [t.event for t in wheel.advance(0.4)] == []
+    assert [t.event for t in wheel.advance(0.5)] == [('event', 1)]
+    assert wheel.next_deadline() == 2
+    assert [t.event for t in wheel.advance(3)] == [('event', 6), ('event', 0), ('event', 4)]
+    assert wheel.next_deadline() == 16.5
+    assert [t.event for t in wheel.advance(16.9)] == [('event', 5)]
+    assert [t.event for t in wheel.advance(50)] == [('event', 3)]
+    assert wheel.next_deadline() == 100
+    assert wheel.advance(1000) == [timers[2]]
+    assert len(wheel) == 0
+    assert all(timer._slot is None for timer in timers)
+    assert wheel.next_deadline() is None
+
+
+def test_timing_wheel_cancel():
+    wheel = TimingWheel(resolution=1, levels=2, slot_bits=2)
+    a = make_timer(wheel, 5, 0)
+    b = make_timer(wheel, 5, 1)
+    c = make_timer(wheel, 1000, 2)
+    wheel._cancel_timer(a)
+    wheel._cancel_timer(c)
+    assert len(wheel) == 1
+    assert wheel.advance(10000) == [b]
+
+
+def test_timing_wheel_random():
+    rng = random.Random(42)
+    wheel = TimingWheel(resolution=0.01, levels=3, slot_bits=3)
+    now = 0.0
+    pending = {}
+    sequence = 0
+    for _ in range(2000):
+        for _ in range(rng.randrange(5)):
+            deadline = now + rng.choice([0, rng.random(), rng.random() * 10, rng.random() * 1000])
+            pending[make_timer(wheel, deadline, sequence)] = None
+            sequence += 1
+        if len(pending) > 0 and rng.random() < 0.2:
+            timer = rng.choice(list(pending))
+            wheel._cancel_timer(timer)
+            del pending[timer]
+        now += rng.choice([0, rng.random() * 0.05, rng.random() * 5, rng.random() * 200])
+
+        expected = sorted(
+            (timer for timer in pending if timer.deadline <= now),
+            key=lambda timer: (timer.deadline, timer._sequence),
+        )
+        assert wheel.advance(now) == expected
+        for timer in expected:
+            del pending[timer]
+        assert len(wheel) == len(pending)
+        assert wheel.next_deadline() == min((timer.deadline for timer in pending), default=None)
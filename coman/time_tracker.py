@@ -70,6 +70,16 @@ class TimeTracker:
 
         self._elapsed_time += time_delta
 
+    def advance_to(self, time_point: float) -> None:
+        """Assume the time has reached `time_point` (in the same terms as `elapsed_time`).
+
+        Unlike with a sequence of calls to `update`, the elapsed time becomes exactly `time_point`, with
+        no rounding errors accumulated. Does nothing if `time_point` has already passed.
+        """
+
+        if time_point > self._elapsed_time:
+            self._elapsed_time = time_point
+
     def after(self, time_delta: float) -> 'FutureTimePoint':
         """Return a FutureTimePoint that will occur `time_delta` seconds after the current time."""
         return FutureTimePoint(self, self.elapsed_time() + time_delta)
@@ -0,0 +1,228 @@
+"""Module with the timer handles and the timing wheel used to schedule delayed events."""
+
+from coman.event_manager import Event
+
+import math
+from typing import Any, Dict, List, Optional, Protocol, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from coman.coroutine_manager import Task
+
+
+class _TimerOwner(Protocol):
+    def _cancel_timer(self, timer: 'Timer') -> None:
+        ...
+
+
+class Timer:
+    """A handle to a delayed event, as returned by `CoroutineManager.add_delayed_event`.
+
+    It can be used to cancel the delayed event before it is raised.
+    """
+
+    __slots__ = ('_event', '_deadline', '_sequence', '_owner', '_slot', '_bucket', '_pending')
+
+    def __init__(self, owner: _TimerOwner, event: Event, deadline: float, sequence: int) -> None:
+        """Construct a Timer. Should not be called explicitly.
+
+        Use `CoroutineManager.add_delayed_event` to create timers.
+        """
+
+        self._owner = owner
+        self._event = event
+        self._deadline = deadline
+        self._sequence = sequence
+        # The dictionary the timer is stored in, if it is scheduled in a TimingWheel.
+        self._slot: Optional[Dict['Timer', None]] = None
+        # The bucket of the delayed events the timer is in, if it is scheduled by a CoroutineManager with
+        # a slack (see `CoroutineManager.add_delayed_event`).
+        self._bucket: Any = None
+        self._pending = True
+
+    def __repr__(self) -> str:
+        return f'Timer(event={self._event!r}, deadline={self._deadline}, pending={self._pending})'
+
+    @property
+    def event(self) -> Event:
+        """Return the event that is raised when the timer expires."""
+        return self._event
+
+    @property
+    def deadline(self) -> float:
+        """Return the time point (as the time elapsed since the construction of the manager) of the expiry."""
+        return self._deadline
+
+    @property
+    def pending(self) -> bool:
+        """Return True if the timer has neither expired nor been cancelled yet."""
+        return self._pending
+
+    def cancel(self) -> bool:
+        """Cancel the timer, so that its event will not be raised.
+
+        Returns True if the timer was pending and False if it has already expired or been cancelled
+        (in which case nothing is done).
+        """
+
+        if not self._pending:
+            return False
+        self._pending = False
+        self._owner._cancel_timer(self)
+        return True
+
+
+class _SleepTimer(Timer):
+    # Used by CoroutineManager to put a sleeping coroutine into a TimingWheel. The task running
+    # the coroutine is stored instead of an event.
+
+    __slots__ = ('task',)
+
+    def __init__(self, owner: _TimerOwner, task: 'Task', deadline: float, sequence: int) -> None:
+        super().__init__(owner, None, deadline, sequence)
+        self.task = task
+
+
+class TimingWheel:
+    """A hierarchical timing wheel.
+
+    An alternative to the binary heap CoroutineManager uses by default to keep track of the delayed
+    events. Scheduling and cancelling a timer takes constant time, which pays off when lots of short
+    timeouts are created (and, possibly, cancelled before they expire).
+
+    The time is divided into ticks of `resolution` seconds. There are `levels` wheels of `2**slot_bits`
+    slots each, the slots of the k-th wheel spanning `2**(slot_bits*k)` ticks. Timers too far in the future
+    to fit into the wheels are kept in an overflow bucket and are redistributed once the time approaches
+    them. The resolution does not affect the precision: a timer is reported as expired as soon as its exact
+    deadline has passed, but the timers expiring within the same tick are kept (and scanned) together.
+
+    To use it, pass an instance to the constructor of CoroutineManager. A TimingWheel must not be shared
+    between several coroutine managers.
+    """
+
+    def __init__(self, resolution: float = 0.001, levels: int = 4, slot_bits: int = 8) -> None:
+        """Construct a timing wheel.
+
+        Parameters:
+            resolution -- the duration of a tick in seconds.
+            levels     -- the number of wheels.
+            slot_bits  -- the binary logarithm of the number of slots in each of the wheels.
+
+        Raises ValueError if any of the parameters is not positive.
+        """
+
+        if resolution <= 0 or levels <= 0 or slot_bits <= 0:
+            raise ValueError('The parameters of a TimingWheel must be positive')
+
+        self._resolution = resolution
+        self._levels = levels
+        self._slot_bits = slot_bits
+        self._slot_mask = (1 << slot_bits) - 1
+        self._current_tick = 0
+        self._wheels: List[List[Dict[Timer, None]]] = [
+            [{} for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        # Timers whose tick has already come (some might still be waiting for the exact deadline, though).
+        self._due: Dict[Timer, None] = {}
+        # Timers too far in the future to fit into the wheels.
+        self._overflow: Dict[Timer, None] = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def resolution(self) -> float:
+        """Return the duration of a tick in seconds."""
+        return self._resolution
+
+    def schedule(self, timer: Timer) -> None:
+        """Add a timer to the wheel. Takes constant time."""
+        self._place(timer, math.floor(timer._deadline / self._resolution))
+        self._size += 1
+
+    def _cancel_timer(self, timer: Timer) -> None:
+        if timer._slot is not None:
+            del timer._slot[timer]
+            timer._slot = None
+            self._size -= 1
+
+    def _place(self, timer: Timer, tick: int) -> None:
+        current_tick = self._current_tick
+        if tick <= current_tick:
+            slot = self._due
+        else:
+            # The timer goes to the wheel corresponding to the most significant digit (in base
+            # `2**slot_bits`) in which its tick differs from the current one.
+            level = ((tick ^ current_tick).bit_length() - 1) // self._slot_bits
+            if level >= self._levels:
+                slot = self._overflow
+            else:
+                slot = self._wheels[level][(tick >> (level * self._slot_bits)) & self._slot_mask]
+        slot[timer] = None
+        timer._slot = slot
+
+    def advance(self, now: float) -> List[Timer]:
+        """Advance the time to `now` and remove the expired timers from the wheel.
+
+        Returns the list of the timers whose deadlines are not later than `now`, sorted by deadline
+        (timers with equal deadlines are sorted in the order they were created in).
+        """
+
+        target_tick = math.floor(now / self._resolution)
+        if target_tick > self._current_tick:
+            self._advance_ticks(target_tick)
+
+        expired = [timer for timer in self._due if timer._deadline <= now]
+        for timer in expired:
+            del self._due[timer]
+            timer._slot = None
+        self._size -= len(expired)
+        expired.sort(key=lambda timer: (timer._deadline, timer._sequence))
+        return expired
+
+    def _advance_ticks(self, target_tick: int) -> None:
+        current_tick = self._current_tick
+        bits = self._slot_bits
+        mask = self._slot_mask
+        # All the timers from the slots the time passes through are taken out and placed anew.
+        # Those that have expired go to `self._due`, others cascade to the lower wheels.
+        displaced: List[Timer] = []
+        for level, wheel in enumerate(self._wheels):
+            shift = level * bits
+            current_digit = (current_tick >> shift) & mask
+            same_upper_digits = (current_tick >> (shift + bits)) == (target_tick >> (shift + bits))
+            # Unless the more significant digits stay the same, the whole wheel is passed through.
+            last_digit = (target_tick >> shift) & mask if same_upper_digits else mask
+            for digit in range(current_digit + 1, last_digit + 1):
+                slot = wheel[digit]
+                if len(slot) > 0:
+                    displaced.extend(slot)
+                    slot.clear()
+            if same_upper_digits:
+                # The other wheels are not affected.
+                break
+        else:
+            displaced.extend(self._overflow)
+            self._overflow.clear()
+
+        self._current_tick = target_tick
+        for timer in displaced:
+            self._place(timer, math.floor(timer._deadline / self._resolution))
+
+    def next_deadline(self) -> Optional[float]:
+        """Return the earliest deadline among the timers in the wheel or None if it is empty."""
+
+        if len(self._due) > 0:
+            return min(timer._deadline for timer in self._due)
+        current_tick = self._current_tick
+        # Every timer in a wheel is later than every timer in the lower wheels, and, within a wheel,
+        # the slots following the current one are ordered by time.
+        for level, wheel in enumerate(self._wheels):
+            current_digit = (current_tick >> (level * self._slot_bits)) & self._slot_mask
+            for digit in range(current_digit + 1, self._slot_mask + 1):
+                slot = wheel[digit]
+                if len(slot) > 0:
+                    return min(timer._deadline for timer in slot)
+        if len(self._overflow) > 0:
+            return min(timer._deadline for timer in self._overflow)
+        return None
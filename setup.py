@@ -8,6 +8,6 @@ setup(
     author              = 'Alexander Korzun',
     author_email        = 'sahhash33@gmail.com',
     license             = 'GPL',
-    packages            = find_packages(),
+    packages            = find_packages(exclude=['benchmarks', 'benchmarks.*']),
     package_data        = {'coman': ['py.typed']},
 )